@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# ==================== BUS ALLOCATION ====================
+# Packs unassigned people into the fleet in one pass:
+#   - people already on a bus keep their seat (it just counts against capacity)
+#   - roles are seated in priority order, so overflow hits the last role first
+#   - each class (per role) is a block; a block goes whole into the bus that
+#     fits it most tightly, and is only split when no bus has room for it
+# Work is per block, not per person, so thousands of rows plan in milliseconds.
+
+
+class BusPlan:
+    def __init__(self, assign, overflow, before, fleet):
+        self.assign = assign        # Series: row label -> bus
+        self.overflow = overflow    # Index of row labels that found no seat
+        self.before = before        # bus -> occupied seats before the plan
+        self.fleet = fleet          # bus -> capacity
+
+    def summary(self):
+        adding = self.assign.value_counts()
+        return pd.DataFrame([{'Bus': b, 'Capacity': cap, 'Before': self.before[b], 'Adding': int(adding.get(b, 0)),
+                              'After': self.before[b] + int(adding.get(b, 0))} for b, cap in self.fleet.items()])
+
+
+def plan_buses(df, fleet, roles, start=None, keep_classes=True, held=None):
+    """Dry run: who would go where. Nothing is written until the caller applies `plan.assign` (bulk.apply_plan).
+    `held`: seats per bus taken by people not in `df` (other partitions, see RosterStore.seats)."""
+    buses = list(fleet)
+    if start in buses: buses = buses[buses.index(start):]
+    occ = df['Bus_Number'].value_counts()
+    before = {b: int(occ.get(b, 0)) + (held or {}).get(b, 0) for b in fleet}
+    free = {b: max(fleet[b] - before[b], 0) for b in buses}
+
+    cand = df.loc[(df['Bus_Number'] == 'Unassigned') & df['Role'].isin(roles), ['Role', 'Class']]
+    pri = cand['Role'].map({r: i for i, r in enumerate(roles)}).astype(int)
+    if keep_classes:
+        # No class (staff, guests) -> one block per role
+        key = cand['Class'].astype(object).where(cand['Class'].notna(), '(' + cand['Role'].astype(str) + ')')
+    else: key = pd.Series('', index=cand.index)
+    groups = cand.groupby([pri, key], sort=False).groups
+    order = sorted(groups, key=lambda g: (g[0], -len(groups[g])))  # priority first, big blocks first
+
+    labels, seats, overflow = [], [], []
+    for g in order:
+        block = np.asarray(groups[g]); pos = 0
+        fits = [b for b in buses if free[b] >= len(block)] if keep_classes else []
+        if fits: targets = [min(fits, key=lambda b: free[b])]
+        elif keep_classes: targets = sorted(buses, key=lambda b: -free[b])  # split as few ways as possible
+        else: targets = buses                                               # plain fill in fleet order
+        for b in targets:
+            take = min(free[b], len(block) - pos)
+            if take <= 0: continue
+            labels.append(block[pos:pos + take]); seats.append(np.full(take, b, dtype=object))
+            free[b] -= take; pos += take
+            if pos == len(block): break
+        if pos < len(block): overflow.append(block[pos:])
+
+    assign = pd.Series(np.concatenate(seats) if seats else [], index=np.concatenate(labels) if labels else [], dtype=object)
+    return BusPlan(assign, pd.Index(np.concatenate(overflow) if overflow else []), before, dict(fleet))
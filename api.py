@@ -0,0 +1,236 @@
+"""Headless check-in API for turnstile scanners and the volunteer phone app.
+
+    EVENT_STORAGE=sqlite:roster.db python api.py --port 8502
+    python api.py --event fair26 --partition Juniors   # one event / partition of EVENT_CONFIG
+
+Same roster store, journal and flusher as app1.py (see engine.py), without
+Streamlit: a request is one lookup or one locked write, never a script rerun.
+
+    GET  /health
+    GET  /lookup?q=<ticket | phone | name>
+    POST /checkin  {"ticket": "...", "gate": "North 2"}
+    POST /kit      {"ticket": "...", "collected": true, "size": "M"}
+    POST /bus      {"tickets": ["...", ...], "bus": "Bus 1"}
+    GET  /metrics  (Prometheus text)
+
+Writes take an optional "request_id" (or an Idempotency-Key header): a retry
+with the same id gets the first answer back instead of being applied again.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import engine
+import snapshot
+from engine import EVENT, EVENTS, SheetRows, make_backend, open_store, start_flusher
+from events import EVERYONE
+from metrics import Metrics, Timed
+from roster import RosterUnavailable
+from schema import sheet_value, now
+from storage import SQLiteBackend
+
+JOURNAL_PATH = os.environ.get("EVENT_API_JOURNAL", "api_journal.db")  # not app1's: each process replays its own (per event / partition, see events.py)
+
+
+class ApiError(Exception):
+    def __init__(self, status, msg): super().__init__(msg); self.status = status
+
+
+# ==================== IDEMPOTENCY ====================
+class Replies:
+    """First answer per route and request id, kept next to the journal so a retry after a restart is still a replay."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS api_replies (id TEXT PRIMARY KEY, status INTEGER, body TEXT, ts REAL)")
+
+    def once(self, route, rid, fn):
+        # Held across fn() so two copies of the same request can't both apply; writes serialize on the store lock anyway.
+        # The same id sent to another route is another request
+        if not rid: return fn()
+        rid = f"{route} {rid}"
+        with self.lock:
+            r = self.db.execute("SELECT status, body FROM api_replies WHERE id = ?", (rid,)).fetchone()
+            if r: return r[0], {**json.loads(r[1]), 'replayed': True}
+            status, body = fn()
+            if status < 500: self.db.execute("INSERT INTO api_replies VALUES (?, ?, ?, ?)", (rid, status, json.dumps(body, default=str), time.time()))
+            return status, body
+
+
+# ==================== HANDLERS ====================
+# Each returns (HTTP status, JSON body) or raises ApiError.
+
+class CheckinService:
+    def __init__(self, store, flusher, metrics, event=EVENT, journal_path=JOURNAL_PATH, rows=None):
+        self.store, self.flusher, self.metrics, self.event, self.rows = store, flusher, metrics, event, rows
+        self.fleet, self.sizes = event.fleet, event.sizes
+        self.replies = Replies(journal_path)
+
+    def row(self, i):
+        df = self.store.df
+        return {'row': int(i), **{c: sheet_value(c, df.at[i, c]) for c in df.columns}}
+
+    def placed(self, *tickets):
+        # Another partition's ticket: say whose, so the scanner can send the person there. Before the
+        # store lock is taken: finding the owner may read the backend (SheetRows.locate)
+        scope = self.store.scope
+        if scope is None or not self.rows: return
+        for t in tickets:
+            if not t or self.store.index.ticket(str(t)): continue
+            other = self.rows.locate(str(t), skip=scope.name)
+            if other and other != scope.name: raise ApiError(404, f"ticket {t} belongs to {other}, not {scope.name}")
+
+    def one(self, ticket):
+        hits = self.store.index.ticket(str(ticket or ''))
+        if not hits: raise ApiError(404, f"no such ticket: {ticket}")
+        if len(hits) > 1: raise ApiError(409, f"{len(hits)} rows share ticket {ticket}")
+        return next(iter(hits))
+
+    def health(self, q, body):
+        s = self.store
+        return 200, {'event': self.event.key, 'partition': s.scope.name if s.scope else EVERYONE,
+                     'rows': len(s.df), 'entered': s.stats.entered, 'version': s.version, 'storage': self.event.storage,
+                     'pending': s.journal.pending_count(), 'sync_failures': self.flusher.failures}
+
+    def lookup(self, q, body):
+        text = (q.get('q') or [''])[0].strip()
+        if not text: raise ApiError(400, "q is required")
+        with self.store.lock: return 200, {'matches': [self.row(i) for i in self.store.index.search(text)]}
+
+    def checkin(self, q, body):
+        self.placed(body.get('ticket'))
+        with self.store.lock:
+            i = self.one(body.get('ticket'))
+            ok = self.store.check_in(i, now(), str(body.get('gate') or 'API'))
+            out = {'admitted': ok, **self.row(i)}
+        if ok: self.flusher.wake.set()
+        return 200, out
+
+    def kit(self, q, body):
+        size, collected = body.get('size'), body.get('collected', True)
+        if size is not None and size not in self.sizes: raise ApiError(400, f"size must be one of {self.sizes}")
+        if not isinstance(collected, bool): raise ApiError(400, "collected must be true or false")
+        self.placed(body.get('ticket'))
+        with self.store.lock:
+            i = self.one(body.get('ticket'))
+            df = self.store.df
+            cur = df.at[i, 'T_Shirt_Size']
+            want = size or cur
+            if collected and (not df.at[i, 'T_Shirt_Collected'] or (size and size != cur)):  # a shirt leaves the stock, as in bulk.hand_kits
+                if pd.isna(want): raise ApiError(400, f"ticket {body.get('ticket')} has no T-shirt size: send one")
+                if self.store.remaining().get(want, 0) <= 0: raise ApiError(409, f"no {want} T-shirts left")
+            vals = {'T_Shirt_Collected': collected, **({'T_Shirt_Size': size} if size else {})}
+            changed = bool(self.store.edit(i, vals))
+            out = {'changed': changed, 'remaining': self.store.remaining(), **self.row(i)}
+        if changed: self.flusher.wake.set()
+        return 200, out
+
+    def bus(self, q, body):
+        bus, tickets = body.get('bus'), body.get('tickets')
+        fleet = self.fleet
+        if not isinstance(tickets, list) or not all(isinstance(t, str) for t in tickets): raise ApiError(400, "tickets must be a list of ticket numbers")
+        if bus != 'Unassigned' and bus not in fleet: raise ApiError(400, f"bus must be Unassigned or one of {list(fleet)}")
+        self.placed(*tickets)
+        with self.store.lock:
+            rows = [self.one(t) for t in tickets]
+            moving = [i for i in rows if self.store.df.at[i, 'Bus_Number'] != bus]
+            seats = self.store.seats()  # event-wide
+            if bus in fleet and seats[bus] + len(moving) > fleet[bus]:
+                raise ApiError(409, f"{bus} has {fleet[bus] - seats[bus]} seat(s) left, {len(moving)} requested")
+            changed = self.store.edit(moving, {'Bus_Number': bus}) if moving else set()
+            left = fleet[bus] - self.store.seats()[bus] if bus in fleet else None
+        if changed: self.flusher.wake.set()
+        return 200, {'bus': bus, 'moved': len(changed), 'seats_left': left}
+
+    ROUTES = {('GET', '/health'): 'health', ('GET', '/lookup'): 'lookup',
+              ('POST', '/checkin'): 'checkin', ('POST', '/kit'): 'kit', ('POST', '/bus'): 'bus'}
+
+    def handle(self, method, url, body, rid=None):
+        path = urlparse(url)
+        name = self.ROUTES.get((method, path.path))
+        if name is None: return 404, {'error': f"no route {method} {path.path}"}
+        with self.metrics.span(f"api {name}"):
+            try:
+                fn = lambda: getattr(self, name)(parse_qs(path.query), body)
+                return self.replies.once(name, rid or body.get('request_id'), fn) if method == 'POST' else fn()
+            except ApiError as e: return e.status, {'error': str(e)}
+            except RosterUnavailable as e: return 503, {'error': str(e)}
+
+
+# ==================== HTTP SERVER ====================
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer whose connections are served by a fixed thread pool (keep-alive clients hold a worker)."""
+
+    def __init__(self, addr, handler, workers=32):
+        super().__init__(addr, handler)
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._serve, request, client_address)
+
+    def _serve(self, request, client_address):
+        try: self.finish_request(request, client_address)
+        except Exception: self.handle_error(request, client_address)
+        finally: self.shutdown_request(request)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, body, ctype="application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", ctype); self.send_header("Content-Length", str(len(data)))
+            self.end_headers(); self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/metrics': return self._reply(200, service.metrics.text().encode(), "text/plain")
+            self._reply(*service.handle('GET', self.path, {}))
+
+        def do_POST(self):
+            try: body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError: return self._reply(400, {'error': "body must be JSON"})
+            if not isinstance(body, dict): return self._reply(400, {'error': "body must be a JSON object"})
+            self._reply(*service.handle('POST', self.path, body, self.headers.get('Idempotency-Key')))
+
+        def log_message(self, *a): pass  # hundreds of scans a second; /metrics has the numbers
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8502)
+    ap.add_argument('--workers', type=int, default=32)
+    ap.add_argument('--event', choices=list(EVENTS), default=EVENT.key)
+    ap.add_argument('--partition', default=EVERYONE, help="serve only this partition of the event's roster")
+    a = ap.parse_args()
+    event = EVENTS[a.event]
+    if a.partition not in event.views: ap.error(f"--partition must be one of {event.views}")
+    metrics = Metrics()
+    inner = make_backend(event)
+    backend = Timed(inner, metrics, "sqlite" if isinstance(inner, SQLiteBackend) else "sheets")
+    journal = event.journal(JOURNAL_PATH, a.partition)
+    snap_path, rows = snapshot.path_for(journal), SheetRows(event, backend)
+    store = open_store(engine.warm_load(backend, snap_path, event, a.partition), journal, event.scope(a.partition), rows)
+    snaps = snapshot.Snapshots(snap_path, event.storage, a.partition)
+    service = CheckinService(store, start_flusher(store, backend, metrics, snaps, event), metrics, event, journal, rows)
+    server = PooledHTTPServer((a.host, a.port), make_handler(service), a.workers)
+    print(f"check-in API on http://{a.host}:{a.port} · {event.title} · {a.partition} · {len(store.df)} rows · {backend.name}", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: service.flusher.flush_now(); snaps.maybe_save(store, force=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,28 @@
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
 from datetime import datetime
 import time
+import os
 import pytz
 import streamlit.components.v1 as components
+import engine
+from engine import EVENTS, EVENT, SheetRows, typed, sheets_backend, make_backend, open_store, start_flusher
+from events import EVERYONE
+from schema import to_sheet, to_display, now
+from allocation import plan_buses
+from storage import SQLiteBackend, Remaining
+from metrics import Metrics, Timed
+from paging import page_of, PAGE_SIZES
+from importer import check_file, commit, issue, possible_duplicates
+from dupes import find_duplicates, merged_values, COLS as DUPE_COLS
+from docs import manifest_html, manifest_zip, absent_html, absent_zip
+import passes
+import snapshot
+import bulk
+import throughput
 
 # ==================== 1. CONFIG & STYLE (ULTRA PREMIUM) ====================
-st.set_page_config(page_title="Event OS Pro | Willian's 26", page_icon="🎆", layout="wide")
+st.set_page_config(page_title=f"Event OS Pro | {EVENT.title}", page_icon="🎆", layout="wide")
 
 st.markdown("""
     <style>
@@ -16,7 +31,7 @@ st.markdown("""
         background-color: #000000;
         background-image: 
             linear-gradient(rgba(0, 0, 0, 0.9), rgba(0, 0, 0, 0.95)),
-            url("https://images.unsplash.com/photo-1470225620780-dba8ba36b745?q=80&w=2070&auto=format&fit=crop");
+            url("https://images.unsplash.com/photo-1470225620780-dba8ba36b745?q=60&w=1280&auto=format&fit=crop");  /* under a 90% overlay, full size buys nothing */
         background-size: cover;
         background-attachment: fixed;
         color: #ffffff;
@@ -126,45 +141,167 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # ==================== 2. DATA ENGINE ====================
-conn = st.connection("gsheets", type=GSheetsConnection)
-BUS_CAPACITY = 45
+# Config, backend and store bootstrap are shared with the headless API (see engine.py).
+# Each event + view (whole roster or one partition, see events.py) is its own store.
+JOURNAL_PATH = os.environ.get("EVENT_JOURNAL", "journal.db")  # the first event's whole roster; the rest sit next to it
+METRICS_FILE = os.environ.get("EVENT_METRICS_FILE")  # Prometheus text file for a local scraper
+
+# 🔥 INSTRUMENTATION: server-wide timings + one set per session (see metrics.py) 🔥
+@st.cache_resource
+def get_metrics(): return Metrics()
+
+METRICS = get_metrics()
+if 'metrics' not in st.session_state: st.session_state.metrics = Metrics()
+
+def span(name): return METRICS.span(name, st.session_state.get('metrics'))
 
 # 🔥 SAFE UPDATE FUNCTION 🔥
-def safe_update(ws, data):
-    try:
-        conn.update(worksheet=ws, data=data)
-        return True
-    except Exception as e:
-        st.error(f"⚠️ Cloud Sync Error: {e}")
-        st.warning("Please check if the Service Account has 'Editor' permission in Google Sheet.")
-        return False
+def sync_error(e):
+    st.error(f"⚠️ Cloud Sync Error: {e}")
+    st.warning("Please check if the Service Account has 'Editor' permission in Google Sheet.")
 
-def load_data():
-    try:
-        df = conn.read(worksheet="Data", ttl=0)
-        req_cols = ['Name', 'Role', 'Spot Phone', 'Guardian Phone', 'Ticket_Number', 'Class', 'Roll', 'Entry_Status', 'Entry_Time', 'Bus_Number', 'T_Shirt_Size', 'T_Shirt_Collected', 'Notes']
-        for c in req_cols:
-            if c not in df.columns: df[c] = ''
-        for col in df.columns:
-            df[col] = df[col].astype(str).str.replace(r'\.0$', '', regex=True).replace(['nan', 'None', ''], 'N/A')
-        return df
-    except: return pd.DataFrame()
-
-# --- 🔥 NEW: LOAD STOCK FUNCTION 🔥 ---
-def load_stock():
-    try:
-        df_s = conn.read(worksheet="Stock", ttl=0)
-        stock = dict(zip(df_s['Size'], df_s['Quantity']))
-        return {s: int(float(stock.get(s, 0))) for s in ["S", "M", "L", "XL", "XXL"]}
-    except: return {"S":0, "M":0, "L":0, "XL":0, "XXL":0}
+# 🔥 SYNC: edits are already in the local journal, the flusher ships them in the background 🔥
+def sync_data():
+    flusher.wake.set()
+    return True
 
-if 'df' not in st.session_state: st.session_state.df = load_data()
-if 'stock' not in st.session_state: st.session_state.stock = load_stock()
+def flush_now(pull=False):
+    try:
+        flusher.flush_now(force=pull); return True
+    except Exception as e:
+        sync_error(e); return False
+
+# 🔥 Both sheets (and the revision they are at) are read at the same time: one round trip of waiting 🔥
+def load_all():
+    with span("load_all"): return engine.load_all(backend, event)
+
+def warm_load(ev, view):
+    with span("load_all"): return engine.warm_load(get_backend(ev.key), snapshot.path_for(ev.journal(JOURNAL_PATH, view)), ev, view)
+
+def sheet_backend(): return Timed(sheets_backend(event), METRICS, "sheets")
+
+@st.cache_resource
+def get_backend(key):
+    inner = make_backend(EVENTS[key])
+    return Timed(inner, METRICS, "sqlite" if isinstance(inner, SQLiteBackend) else "sheets")
+
+@st.cache_resource
+def get_rows(key): return SheetRows(EVENTS[key], get_backend(key))
+
+# 🔥 SHARED STORES: one per event + view for every device, loaded once per server, when first needed 🔥
+@st.cache_resource
+def get_store(key, view):
+    ev = EVENTS[key]
+    return open_store(warm_load(ev, view), ev.journal(JOURNAL_PATH, view), ev.scope(view), get_rows(key))
+
+@st.cache_resource
+def get_flusher(key, view):
+    ev = EVENTS[key]
+    snaps = snapshot.Snapshots(snapshot.path_for(ev.journal(JOURNAL_PATH, view)), ev.storage, view)
+    return start_flusher(get_store(key, view), get_backend(key), METRICS, snaps, ev)
+
+def open_view(view): return get_store(event.key, view), get_flusher(event.key, view)
+
+def ver(): return (event.key, view, store.version)  # cache key: versions of different stores overlap
+
+def gauges():
+    return (f"event_roster_rows {len(store.df)}\nevent_data_version {store.version}\n"
+            f"event_journal_pending {store.journal.pending_count()}\nevent_flush_failures {flusher.failures}\n")
+
+@st.cache_resource
+def start_metrics_export():
+    if METRICS_FILE: METRICS.export_every(METRICS_FILE, extra=gauges)
+    return True
+
+
+# 🔥 DOCUMENTS: built only when a download is clicked, cached per roster version 🔥
+DOCS = {'manifest': manifest_html, 'manifest_zip': manifest_zip, 'absent': absent_html, 'absent_zip': absent_zip,
+        'csv': lambda df: to_sheet(df).to_csv().encode('utf-8')}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_doc(kind, version, args, _df):
+    return DOCS[kind](_df, *args)
+
+def doc(kind, *args, where=None):
+    # Reads the roster at click time, so the file matches what the sheet holds now
+    def make():
+        with store.lock:
+            df = store.df if where is None else store.df[where(store.df)]
+            return build_doc(kind, ver(), args, df)
+    return make
+
+# 🔥 EVENT PASSES: rendered cards are reused until a row's pass text changes; printed versions survive restarts 🔥
+@st.cache_resource
+def get_passes(key, view):
+    ev = EVENTS[key]
+    return passes.PassCache(passes.event_text(ev)), passes.PrintLog(ev.journal(JOURNAL_PATH, view))
+
+PASS_GROUPS = {'Class': 'Class', 'Role': 'Role', 'Bus': 'Bus_Number'}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def pass_records(version, col, picked, unprinted, marked):
+    # Display text of the selected rows, sorted for the printer
+    with store.lock: df = store.df[store.df[col].astype(str).isin(picked)] if col and picked else store.df
+    recs = to_display(df[passes.FIELDS]).to_dict('records')
+    if unprinted: recs = get_passes(event.key, view)[1].unprinted(recs)
+    return sorted(recs, key=lambda r: (str(r[col or 'Class']), r['Name']))
+
+def pass_file(recs, by=None):
+    # Called at click time (download_button data): only changed rows are rendered again
+    with METRICS.span("passes"):
+        cards, _ = get_passes(event.key, view)[0].cards_for(recs)
+        if by is None: return passes.sheets(cards)
+        groups = {}
+        for r, c in zip(recs, cards): groups.setdefault(r[by], []).append(c)
+        return passes.sheets_zip(sorted(groups.items()))
+
+# 🔥 DUPLICATES: scored again only when a name / ticket / phone / class changed, off the store lock; "not duplicates" answers are shared by all admins 🔥
+@st.cache_data(max_entries=2, show_spinner="Looking for duplicates...")
+def dupe_queue(key, _df): return find_duplicates(_df)
+
+@st.cache_resource
+def get_dismissed(key): return set()  # frozenset of the two tickets
+
+# 🔥 BULK ACTIONS: every batch can be undone (see bulk.py) 🔥
+@st.cache_resource
+def get_undo(path): return bulk.UndoLog(path)
+
+def run_bulk(fn, *args):
+    # One batch, then the usual sync; BulkError = a check said no, nothing was written
+    try: changed, bid = fn(store, get_undo(JOURNAL), *args)
+    except bulk.BulkError as e: st.error(str(e)); return False
+    if changed and sync_data(): st.toast(f"Updated {len(changed)} row(s)" + (f" · batch #{bid}, undo it in Admin Data → Bulk Actions" if bid else ""), icon="✅")
+    elif not changed: st.info("Nothing to change.")
+    return bool(changed)
+
+# 🔥 PAGED TABLES: filtered / sorted / sliced server-side, only the visible page goes out 🔥
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_page(version, what, cols, q, sort, asc, page, size, _where):
+    df = store.df if _where is None else store.df[_where(store.df)]
+    return page_of(df, list(cols), q, sort, asc, page, size)
+
+def paged_table(key, what, cols, where=None):
+    # `what` names the subset `where` selects (part of the cache key)
+    f1, f2, f3, f4 = st.columns([2, 1.3, 0.7, 0.7])
+    q = f1.text_input("🔎 Filter", key=f"{key}_q", placeholder="Name / phone / ticket").strip()
+    sort = f2.selectbox("Sort by", ["—"] + cols, key=f"{key}_sort")
+    asc = f3.toggle("A→Z", True, key=f"{key}_asc")
+    size = f4.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_size")
+    with store.lock:
+        out, n, pages, page = cached_page(ver(), what, tuple(cols), q, None if sort == "—" else sort, asc,
+                                          st.session_state.get(f"{key}_page", 1), size, where)
+    st.dataframe(out, use_container_width=True, hide_index=True)
+    if pages > 1:
+        st.session_state[f"{key}_page"] = page  # clamp after the data shrank
+        p1, p2 = st.columns([1, 3])
+        p1.number_input("Page", 1, pages, key=f"{key}_page")
+        p2.caption(f"{n} rows · page {page} of {pages}")
+    else: st.caption(f"{n} rows")
 
 # ==================== 3. LOGIN ====================
 if 'logged_in' not in st.session_state: st.session_state.logged_in = False
 if not st.session_state.logged_in:
-    st.title("🔐 Willian's 26 | Admin")
+    st.title(f"🔐 {EVENT.title} | Admin")
     c1, c2 = st.columns(2)
     with c1:
         u = st.text_input("Username")
@@ -177,7 +314,17 @@ if not st.session_state.logged_in:
 
 # ==================== 4. TIMER & MENU ====================
 st.sidebar.title("⚡ Menu")
-target_iso = "2026-02-03T07:00:00+06:00"
+
+# Which event, and which part of its roster, this device serves (see events.py)
+event = EVENTS[st.sidebar.selectbox("🎪 Event", list(EVENTS), format_func=lambda k: EVENTS[k].title, key="event")] if len(EVENTS) > 1 else EVENT
+view = st.sidebar.selectbox("🧭 Serving", event.views, key=f"view_{event.key}") if event.partitions else EVERYONE
+FLEET, SIZES = event.fleet, event.sizes
+JOURNAL = event.journal(JOURNAL_PATH, view)
+
+# Data is only touched once someone is logged in; the login page costs no Sheets reads
+backend = get_backend(event.key)
+store, flusher = open_view(view)
+start_metrics_export()
 
 timer_html = f"""
 <!DOCTYPE html>
@@ -205,11 +352,11 @@ timer_html = f"""
         <div class="label">EVENT COUNTDOWN</div>
         <div id="countdown" class="time">-- : -- : --</div>
         <div class="sub-labels">HOURS &nbsp;&nbsp; MIN &nbsp;&nbsp; SEC</div>
-        <div class="date-box">📅 3RD FEB 2026</div>
+        <div class="date-box">📅 {event.date_label.upper()}</div>
     </div>
 <script>
 function updateTimer() {{
-    const target = new Date("{target_iso}").getTime();
+    const target = new Date("{event.start}").getTime();
     setInterval(function() {{
         const now = new Date().getTime();
         const diff = target - now;
@@ -228,27 +375,55 @@ updateTimer();
 </body>
 </html>
 """
-with st.sidebar: components.html(timer_html, height=155)
+# Once the event has started the countdown has nothing left to count: a plain box, no iframe + script per rerun
+if datetime.now(pytz.utc) < datetime.fromisoformat(event.start):
+    with st.sidebar: components.html(timer_html, height=155)
+else: st.sidebar.markdown(f"<div class='stock-box' style='color:#00ff88; font-weight:bold;'>🎉 EVENT STARTED · {event.date_label.upper()}</div>", unsafe_allow_html=True)
+
+st.session_state.seen_ver = store.version
+
+# 🔥 LIVE VIEW: pick up other devices' writes without "Refresh Data" 🔥
+@st.fragment(run_every=5)
+def live_watch():
+    st.caption(f"🟢 Live · data v{store.version}")
+    if st.session_state.seen_ver != store.version: st.rerun(scope="app")
+
+menu = st.sidebar.radio("Go To", ["🔍 Search & Entry", "⚡ Scan Mode", "➕ Add Staff/Teacher", "📜 View Lists", "🚫 Absent List", *(["🚌 Bus Manager"] if FLEET else []), "📊 Dashboard", "📝 Admin Data", "🩺 System Health"])
 
-menu = st.sidebar.radio("Go To", ["🔍 Search & Entry", "➕ Add Staff/Teacher", "📜 View Lists", "🚫 Absent List", "🚌 Bus Manager", "📊 Dashboard", "📝 Admin Data"])
+# Gate pages are left alone so an operator's form isn't redrawn mid-edit
+if menu not in ("🔍 Search & Entry", "⚡ Scan Mode"):
+    with st.sidebar: live_watch()
 
-if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear(); st.session_state.df = load_data(); st.session_state.stock = load_stock(); st.rerun()
+if flusher.last_error: st.sidebar.warning(f"⚠️ Sync retrying ({flusher.failures}x): {flusher.last_error}")
+elif store.journal.pending_count(): st.sidebar.caption(f"⏳ {store.journal.pending_count()} change(s) waiting for sync")
+
+if store.conflicts: st.sidebar.caption(f"⚔️ {len(store.conflicts)} edit conflict(s), see System Health")
+
+# Same as what the flusher does every few seconds, right now: merge what changed, push ours
+if st.sidebar.button("🔄 Refresh Data") and flush_now(pull=True): st.rerun()
+if not store.loaded:
+    # The first read failed: nothing can be looked up or written until one succeeds
+    st.error("⚠️ The roster couldn't be read from storage yet. Retrying in the background; 🔄 Refresh Data to try now.")
+    st.stop()
+
+# Which gate / desk this device is, stamped on every check-in it makes (Dashboard → Gate Throughput)
+gate = st.sidebar.text_input("📍 Gate / device", "Main Gate", key="gate").strip() or None
+
+page_t = time.perf_counter()  # page render time, recorded after the tab chain
 
 # --- TAB 1: SEARCH & ENTRY ---
 if menu == "🔍 Search & Entry":
     st.title("🔍 Search & Entry")
     q = st.text_input("🔎 Search by Ticket / Name / Phone:").strip()
     if q:
-        df = st.session_state.df
-        mask = df['Name'].str.contains(q, case=False, regex=False) | \
-               df['Ticket_Number'].str.contains(q, case=False, regex=False) | \
-               df['Spot Phone'].str.contains(q, case=False, regex=False)
-        res = df[mask]
+        df = store.df
+        hits = store.index.search(q)
         
-        if not res.empty:
-            idx = res.index[0]
-            row = df.loc[idx]
+        if hits:
+            idx = hits[0]
+            if len(hits) > 1:
+                idx = st.selectbox(f"🔀 {len(hits)} matches — pick one", hits, format_func=lambda i: f"{df.at[i, 'Name']} · {df.at[i, 'Ticket_Number']} · {df.at[i, 'Class']}")
+            row = to_display(df.loc[[idx]]).iloc[0]  # display text, e.g. Entry_Status 'Done' / 'N/A'
             
             # 🔥 ROLE BASED PREMIUM CARDS 🔥
             role = row['Role']
@@ -261,7 +436,6 @@ if menu == "🔍 Search & Entry":
             is_ent = row['Entry_Status'] == 'Done'
             is_kit = row['T_Shirt_Collected'] == 'Yes'
             sz = row['T_Shirt_Size']
-            rem = st.session_state.stock.get(sz, 0)
             
             col1, col2 = st.columns([1, 1.5])
             with col1:
@@ -296,129 +470,17 @@ if menu == "🔍 Search & Entry":
                 
                 if row['Bus_Number'] != "Unassigned":
                     if st.button(f"❌ Unassign {row['Bus_Number']}", type="secondary", key=f"un_{idx}"):
-                        st.session_state.df.at[idx, 'Bus_Number'] = 'Unassigned'
-                        if safe_update("Data", st.session_state.df):
+                        store.edit(idx, {'Bus_Number': 'Unassigned'})
+                        if sync_data():
                             st.success(f"Removed from {row['Bus_Number']}!"); time.sleep(0.5); st.rerun()
 
                 # --- 🔥 NEW: UDVASH STYLE FOLDABLE CARD GENERATOR 🔥 ---
                 st.markdown("---")
                 st.subheader("🪪 Print Event Pass")
                 
-                card_html = f"""
-                <html>
-                <head>
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        display: flex;
-                        justify-content: center;
-                        padding-top: 20px;
-                        background-color: #f0f0f0;
-                    }}
-                    .card-container {{
-                        width: 320px;
-                        height: 640px;
-                        background: white;
-                        border: 1px solid #ccc;
-                        box-shadow: 0 0 10px rgba(0,0,0,0.1);
-                    }}
-                    .front, .back {{
-                        height: 320px;
-                        padding: 20px;
-                        box-sizing: border-box;
-                    }}
-                    .back {{
-                        border-top: 2px dashed #888;
-                        transform: rotate(180deg);
-                        display: flex;
-                        flex-direction: column;
-                        justify-content: flex-end;
-                        align-items: center;
-                    }}
-                    .header {{
-                        text-align: center;
-                        font-weight: bold;
-                        font-size: 16px;
-                        border-bottom: 2px solid #333;
-                        padding-bottom: 10px;
-                        margin-bottom: 15px;
-                    }}
-                    .info-section {{
-                        display: flex;
-                        gap: 15px;
-                        margin-bottom: 20px;
-                    }}
-                    .photo-box {{
-                        width: 80px;
-                        height: 95px;
-                        border: 1px solid #aaa;
-                        background-color: #eee;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        font-size: 12px;
-                        color: #666;
-                    }}
-                    .details table {{ font-size: 13px; font-weight: bold; color: #333; width: 100%; }}
-                    .details td {{ padding: 3px 0; }}
-                    .details td:first-child {{ width: 50px; color: #666; font-weight: normal; }}
-                    .footer-info {{
-                        font-size: 12px;
-                        color: #444;
-                        margin-top: 10px;
-                    }}
-                    .back-text {{
-                        font-size: 11px;
-                        text-align: center;
-                        color: #333;
-                        line-height: 1.5;
-                        padding-bottom: 10px;
-                    }}
-                </style>
-                </head>
-                <body>
-                    <div class="card-container">
-                        <div class="front">
-                            <div class="header">Willian's 26 Event Pass</div>
-                            <div class="info-section">
-                                <div class="photo-box">Photo</div>
-                                <div class="details">
-                                    <table cellspacing="0" cellpadding="0">
-                                        <tr><td>Name</td><td>: {row['Name']}</td></tr>
-                                        <tr><td>Ticket</td><td>: {row['Ticket_Number']}</td></tr>
-                                        <tr><td>Role</td><td>: {row['Role']}</td></tr>
-                                        <tr><td>Class</td><td>: {row['Class']}</td></tr>
-                                        <tr><td>Bus</td><td>: {row['Bus_Number']}</td></tr>
-                                    </table>
-                                </div>
-                            </div>
-                            <div class="footer-info">
-                                <b>Event Date:</b> 3rd Feb 2026<br>
-                                <b>Time:</b> 10:00 AM To 5:00 PM<br>
-                                <b>Venue:</b> Willes Little Flower Campus
-                            </div>
-                        </div>
-                        
-                        <div class="back">
-                            <div class="back-text">
-                                <b>If this card is found, please return to:</b><br><br>
-                                Willian's 26 Organizing Committee<br>
-                                Dhaka, Bangladesh<br>
-                                Phone: {row['Spot Phone']}<br>
-                                www.willians26.com
-                            </div>
-                        </div>
-                    </div>
-                    <script>
-                        window.onload = function() {{ window.print(); }}
-                    </script>
-                </body>
-                </html>
-                """
-                
                 st.download_button(
                     label=f"🖨️ Download Printable Card for {row['Name']}",
-                    data=card_html,
+                    data=passes.single(row, passes.event_text(event)),
                     file_name=f"ID_Card_{row['Ticket_Number']}.html",
                     mime="text/html",
                     type="primary"
@@ -430,17 +492,17 @@ if menu == "🔍 Search & Entry":
                     st.subheader("✏️ Update Details")
                     c_n, c_r = st.columns([1.5, 1])
                     new_name = c_n.text_input("Name", row['Name'])
-                    role_opts = ["Student", "Volunteer", "Teacher", "College Staff", "Organizer", "Principal", "College Head"]
+                    role_opts = event.roles
                     new_role = c_r.selectbox("Role", role_opts, index=role_opts.index(row['Role']) if row['Role'] in role_opts else 0)
                     c_p, c_t = st.columns(2)
                     new_phone = c_p.text_input("Phone", row['Spot Phone'])
                     new_ticket = c_t.text_input("Ticket", row['Ticket_Number'])
-                    new_size = st.selectbox("Size", ["S", "M", "L", "XL", "XXL"], index=["S", "M", "L", "XL", "XXL"].index(sz) if sz in ["S", "M", "L", "XL", "XXL"] else 2)
+                    new_size = st.selectbox("Size", SIZES, index=SIZES.index(sz) if sz in SIZES else SIZES.index(event.default_size))
                     st.markdown("---")
                     c_a, c_b = st.columns(2)
                     new_ent = c_a.toggle("✅ Entry", is_ent)
                     new_kit = c_b.toggle("👕 Kit", is_kit)
-                    buses = ["Unassigned", "Bus 1", "Bus 2", "Bus 3", "Bus 4"]
+                    buses = ["Unassigned"] + list(FLEET)
                     new_bus = st.selectbox("🚌 Bus", buses, index=buses.index(row['Bus_Number']) if row['Bus_Number'] in buses else 0)
                     
                     if st.button("💾 Save Changes", type="primary"):
@@ -448,185 +510,380 @@ if menu == "🔍 Search & Entry":
                         else:
                             can_assign = True
                             if new_bus != "Unassigned" and new_bus != row['Bus_Number']:
-                                if len(df[df['Bus_Number'] == new_bus]) >= BUS_CAPACITY: st.error("Bus Full!"); can_assign = False
+                                if store.seats()[new_bus] >= FLEET[new_bus]: st.error("Bus Full!"); can_assign = False
                             if can_assign:
-                                # --- 🔥 NEW STOCK LOGIC 🔥 ---
-                                if new_kit:
-                                    if is_kit and sz != new_size: st.session_state.stock[sz]+=1; st.session_state.stock[new_size]-=1
-                                    elif not is_kit: st.session_state.stock[new_size]-=1
-                                elif not new_kit and is_kit: st.session_state.stock[sz]+=1
-                                # -----------------------------
-
-                                st.session_state.df.at[idx, 'Name'] = new_name
-                                st.session_state.df.at[idx, 'Role'] = new_role
-                                st.session_state.df.at[idx, 'Spot Phone'] = new_phone
-                                st.session_state.df.at[idx, 'Ticket_Number'] = new_ticket
-                                st.session_state.df.at[idx, 'T_Shirt_Size'] = new_size
-                                st.session_state.df.at[idx, 'Entry_Status'] = 'Done' if new_ent else 'N/A'
-                                st.session_state.df.at[idx, 'T_Shirt_Collected'] = 'Yes' if new_kit else 'No'
-                                st.session_state.df.at[idx, 'Bus_Number'] = new_bus
-                                if new_ent and row['Entry_Time'] == 'N/A': st.session_state.df.at[idx, 'Entry_Time'] = datetime.now().strftime("%H:%M:%S")
+                                # Stock follows from T_Shirt_Collected (see inventory.py), nothing else to write
+                                upd = {'Name': new_name, 'Role': new_role, 'Spot Phone': new_phone, 'Ticket_Number': new_ticket,
+                                       'T_Shirt_Size': new_size, 'Entry_Status': new_ent, 'T_Shirt_Collected': new_kit, 'Bus_Number': new_bus}
+                                if new_ent and row['Entry_Time'] == 'N/A': upd.update({'Entry_Time': now(), 'Entry_Gate': gate})
+                                store.edit(idx, upd)
                                 
                                 # 🔥 SAFE UPDATE 🔥
-                                if safe_update("Data", st.session_state.df):
-                                    s_d = [{"Size": k, "Quantity": v} for k, v in st.session_state.stock.items()]
-                                    safe_update("Stock", pd.DataFrame(s_d))
+                                if sync_data():
                                     st.success("Updated!"); time.sleep(0.5); st.rerun()
-        else: st.warning("Not Found")
+        else:
+            st.warning("Not Found" if view == EVERYONE else f"Not found in {view}")
+            if view != EVERYONE:
+                # Someone from another partition: looked up on demand (open partitions first, then the backend)
+                if st.button("🔀 Look for this ticket in other partitions"): st.session_state.elsewhere = (q, get_rows(event.key).locate(q, skip=view))
+                found = st.session_state.get('elsewhere')
+                if found and found[0] == q:
+                    if found[1] is None: st.info(f"No ticket {q} in {event.title}.")
+                    elif found[1] == view: st.info(f"{q} is in {view} on the sheet but not here yet. Try 🔄 Refresh Data.")
+                    else:
+                        st.info(f"{q} is served by **{found[1]}**.")
+                        st.button(f"➡️ Serve {found[1]} on this device", on_click=lambda k, v: st.session_state.update({k: v}), args=(f"view_{event.key}", found[1]))
+
+# --- TAB: SCAN MODE ---
+# Scanner / keyboard-wedge check-in. Everything lives in a fragment, so a scan
+# reruns only this box (no CSS, countdown or entry card is re-sent).
+elif menu == "⚡ Scan Mode":
+    st.title("⚡ Scan Mode")
+    if 'scan_log' not in st.session_state: st.session_state.scan_log = []
+
+    def do_scan():
+        code = st.session_state.scan_code.strip()
+        st.session_state.scan_code = ''  # ready for the next ticket
+        if not code: return
+        owner, fl = store, flusher
+        hits = store.index.ticket(code)
+        if not hits and view != EVERYONE:
+            # Another partition's ticket: admitted through that partition's store, opened on demand
+            other = get_rows(event.key).locate(code, skip=view)
+            if other and other != view:
+                owner, fl = open_view(other); hits = owner.index.ticket(code)
+        if len(hits) != 1: res = ('error', f"❌ {code}: " + ("no such ticket" if not hits else f"{len(hits)} rows share this ticket, use Search & Entry"))
+        else:
+            idx = next(iter(hits))
+            r = owner.df.loc[idx]
+            who = f"{r['Name']} · {r['Role']}" + (f" · Class {r['Class']}" if pd.notna(r['Class']) else '') + f" · {r['Bus_Number']}"
+            if owner is not store: who += f" · from {owner.scope.name if owner.scope else EVERYONE}"
+            if owner.check_in(idx, now(), gate):
+                fl.wake.set(); res = ('success', f"✅ {code}: {who}")
+            else:
+                t = owner.df.at[idx, 'Entry_Time']
+                res = ('warning', f"⛔ {code}: already entered" + (f" at {t:%H:%M:%S}" if pd.notna(t) else '') + f" — {who}")
+        st.session_state.scan_log = [res] + st.session_state.scan_log[:9]
+
+    @st.fragment
+    def scanner():
+        st.text_input("Scan ticket", key="scan_code", on_change=do_scan, placeholder="Ticket number + Enter")
+        log = st.session_state.scan_log
+        if log: getattr(st, log[0][0])(log[0][1])
+        st.caption(f"Entered {store.stats.entered}/{store.stats.total}")
+        for _, msg in log[1:]: st.caption(msg)
+    scanner()
 
 # --- TAB: ADD STAFF ---
 elif menu == "➕ Add Staff/Teacher":
     st.title("➕ Add Manual Entry")
     with st.form("add"):
         c1, c2 = st.columns(2); name = c1.text_input("Name"); ph = c2.text_input("Phone")
-        c3, c4 = st.columns(2); role = c3.selectbox("Role", ["Teacher", "College Staff", "Guest", "Volunteer", "Principal", "College Head"]); cls = c4.text_input("Class", "N/A")
+        staff = [r for r in event.roles if r not in ("Student", "Organizer")]
+        c3, c4 = st.columns(2); role = c3.selectbox("Role", staff, index=staff.index("Teacher") if "Teacher" in staff else 0); cls = c4.text_input("Class", "N/A")
         if st.form_submit_button("Add"):
             if name and ph:
-                new = {'Name':name, 'Role':role, 'Spot Phone':ph, 'Ticket_Number':f"MAN-{int(time.time())}", 'Class':cls, 'Roll':'N/A', 'Entry_Status':'N/A', 'Entry_Time':'N/A', 'Bus_Number':'Unassigned', 'T_Shirt_Size':'L', 'T_Shirt_Collected':'No', 'Notes':'Manual'}
-                st.session_state.df = pd.concat([st.session_state.df, pd.DataFrame([new])], ignore_index=True)
-                if safe_update("Data", st.session_state.df):
-                    st.success("Added!"); time.sleep(1); st.rerun()
+                new = {'Name':name, 'Role':role, 'Spot Phone':ph, 'Class':cls, 'Roll':'N/A', 'Entry_Status':False, 'Entry_Time':None, 'Bus_Number':'Unassigned', 'T_Shirt_Size':event.default_size, 'T_Shirt_Collected':False, 'Notes':'Manual'}
+                with store.lock:  # ticket issued and added in one step, so two devices can't get the same one
+                    issue(store, [new], "MAN")
+                    store.append([new])
+                if sync_data():
+                    st.success(f"Added! Ticket {new['Ticket_Number']}"); time.sleep(1); st.rerun()
+
+    # --- 🔥 BULK IMPORT: late registrations from CSV / XLSX in one write 🔥 ---
+    st.markdown("---")
+    st.subheader("📥 Bulk Import")
+    st.caption("Columns: Name, Role, Phone (Spot Phone), Guardian Phone, Class, Roll, Size (T_Shirt_Size), Ticket, Notes. Blank tickets get IMP-xxxxx.")
+    up = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"])
+    if up and st.session_state.get('import_file') != up.file_id:
+        try:
+            with st.spinner("Checking..."):
+                rows, errs, n_read = check_file(up, up.name, store.tickets(), roles=event.roles, sizes=SIZES, default_size=event.default_size)
+                with store.lock: dups = possible_duplicates(store.df, rows)
+            st.session_state.import_file, st.session_state.import_res = up.file_id, (rows, errs, n_read, dups)
+        except Exception as e: st.error(f"Could not read the file: {e}")
+    if up and st.session_state.get('import_file') == up.file_id:
+        rows, errs, n_read, dups = st.session_state.import_res
+        c1, c2, c3, c4 = st.columns(4); c1.metric("Rows Read", n_read); c2.metric("Ready", len(rows)); c3.metric("Problems", len(errs)); c4.metric("Possible Duplicates", len(dups))
+        if len(errs):
+            st.dataframe(errs.head(500), hide_index=True, use_container_width=True)
+            st.download_button("⬇️ Problem Report", errs.to_csv(index=False), "import_problems.csv", "text/csv")
+        if len(dups):
+            st.warning("These look like people who are already registered. They will still be imported; merge them later from Admin Data → Duplicate Queue.")
+            st.dataframe(dups.drop(columns=['a', 'b']).head(200), hide_index=True, use_container_width=True)
+        if rows and st.button(f"✅ Import {len(rows)} Rows", type="primary"):
+            try:
+                added = commit(store, rows)
+                st.session_state.import_file = None
+                if sync_data(): st.success(f"Imported {added} rows!")
+            except ValueError as e: st.error(str(e)); st.session_state.import_file = None
 
 # --- TAB: VIEW LISTS ---
 elif menu == "📜 View Lists":
     st.title("📜 View Lists")
     filter_type = st.radio("Filter By:", ["Class", "Role"], horizontal=True)
-    view_df = pd.DataFrame()
+    stats = store.stats
     if filter_type == "Class":
-        cls_list = sorted([c for c in st.session_state.df['Class'].unique() if c not in ['', 'N/A']])
+        cls_list = stats.present(stats.cls)
         sel = st.selectbox("Select Class", ["All"] + cls_list)
-        view_df = st.session_state.df if sel == "All" else st.session_state.df[st.session_state.df['Class'] == sel]
+        where = None if sel == "All" else (lambda d: d['Class'] == sel)
+        n_all, n_in = (stats.total, stats.entered) if sel == "All" else (stats.cls[sel], stats.cls_in[sel])
     else:
-        role_list = sorted([r for r in st.session_state.df['Role'].unique() if r not in ['', 'N/A']])
-        sel_role = st.selectbox("Select Role", ["All"] + role_list)
-        view_df = st.session_state.df if sel_role == "All" else st.session_state.df[st.session_state.df['Role'] == sel_role]
+        role_list = stats.present(stats.role)
+        sel = st.selectbox("Select Role", ["All"] + role_list)
+        where = None if sel == "All" else (lambda d: d['Role'] == sel)
+        n_all, n_in = (stats.total, stats.entered) if sel == "All" else (stats.role[sel], stats.role_in[sel])
     c1, c2, c3 = st.columns(3)
-    c1.metric("Total", len(view_df)); c2.metric("Checked In", len(view_df[view_df['Entry_Status']=='Done'])); c3.metric("Pending", len(view_df)-len(view_df[view_df['Entry_Status']=='Done']))
-    st.dataframe(view_df[['Name', 'Role', 'Class', 'Spot Phone', 'Entry_Status']], use_container_width=True)
+    c1.metric("Total", n_all); c2.metric("Checked In", n_in); c3.metric("Pending", n_all-n_in)
+    paged_table("lists", f"{filter_type}:{sel}", ['Name', 'Role', 'Class', 'Spot Phone', 'Entry_Status'], where)
 
 # --- TAB: ABSENT LIST ---
 elif menu == "🚫 Absent List":
     st.title("🚫 Absentee Manager")
-    abs_df = st.session_state.df[st.session_state.df['Entry_Status'] != 'Done']
-    c1, c2 = st.columns(2); c1.metric("Total Absent", len(abs_df)); c2.metric("Registered", len(st.session_state.df))
-    cls_list = sorted([c for c in abs_df['Class'].unique() if c not in ['', 'N/A']])
+    stats = store.stats
+    c1, c2 = st.columns(2); c1.metric("Total Absent", stats.total - stats.entered); c2.metric("Registered", stats.total)
+    cls_list = [c for c in stats.present(stats.cls) if stats.cls[c] > stats.cls_in[c]]
     sel = st.selectbox("Filter Class", ["All"] + cls_list)
-    v_abs = abs_df if sel == "All" else abs_df[abs_df['Class'] == sel]
-    st.dataframe(v_abs[['Name', 'Class', 'Role', 'Spot Phone']], use_container_width=True)
-    if st.button("🖨️ Print Absent List"):
-        html = f"<html><body><h1>Absent List - {sel}</h1><table><tr><th>Name</th><th>Class</th><th>Phone</th></tr>"
-        for _, r in v_abs.iterrows(): html += f"<tr><td>{r['Name']}</td><td>{r['Class']}</td><td>{r['Spot Phone']}</td></tr>"
-        html += "</table></body></html>"
-        st.download_button("⬇️ PDF Ready", html, "Absent.html", "text/html")
+    absent = lambda d: ~d['Entry_Status'] if sel == "All" else ~d['Entry_Status'] & (d['Class'] == sel)
+    paged_table("absent", sel, ['Name', 'Class', 'Role', 'Spot Phone'], absent)
+    c1, c2 = st.columns(2)
+    c1.download_button("⬇️ PDF Ready", doc('absent', sel, where=absent), "Absent.html", "text/html", on_click="ignore")
+    c2.download_button("🗂️ All Classes (.zip)", doc('absent_zip', where=lambda d: ~d['Entry_Status']), "Absent_Lists.zip", "application/zip", on_click="ignore")
 
 # --- TAB: BUS MANAGER ---
 elif menu == "🚌 Bus Manager":
     st.title("🚌 Fleet Manager")
-    buses = ["Bus 1", "Bus 2", "Bus 3", "Bus 4"]
-    cols = st.columns(4)
+    buses = list(FLEET)
+    cols = st.columns(len(buses))
+    seats = store.seats()  # event-wide: other partitions' riders too
     for i, b in enumerate(buses):
-        df_b = st.session_state.df[st.session_state.df['Bus_Number'] == b]
-        cnt = len(df_b)
-        cols[i].metric(b, f"{cnt}/{BUS_CAPACITY}", f"{BUS_CAPACITY-cnt} Free"); cols[i].progress(min(cnt/BUS_CAPACITY, 1.0))
+        cnt, cap = seats[b], FLEET[b]
+        cols[i].metric(b, f"{cnt}/{cap}", f"{cap-cnt} Free"); cols[i].progress(min(cnt/cap, 1.0))
     st.markdown("---")
     
     # --- 🔥 NEW: CLASS WISE BULK ASSIGN 🔥 ---
     with st.container(border=True):
         st.subheader("🚀 Class-wise Bulk Assignment")
         c_l, c_r = st.columns(2)
-        classes = sorted([c for c in st.session_state.df['Class'].unique() if c not in ['', 'N/A']])
+        classes = store.stats.present(store.stats.cls)
         target_cls = c_l.selectbox("Select Class", classes)
         target_bus = c_r.selectbox("Target Bus", buses)
         
-        pending_students = st.session_state.df[(st.session_state.df['Class'] == target_cls) & (st.session_state.df['Bus_Number'] == 'Unassigned')]
+        pending_students = store.df[(store.df['Class'] == target_cls) & (store.df['Bus_Number'] == 'Unassigned')]
         
         if st.button(f"Assign {len(pending_students)} Students from {target_cls} to {target_bus}"):
-            current_bus_count = len(st.session_state.df[st.session_state.df['Bus_Number'] == target_bus])
-            free_space = BUS_CAPACITY - current_bus_count
-            
-            if free_space >= len(pending_students):
-                st.session_state.df.loc[pending_students.index, 'Bus_Number'] = target_bus
-                if safe_update("Data", st.session_state.df):
-                    st.success(f"Successfully Assigned {len(pending_students)} Students!"); time.sleep(1); st.rerun()
-            else:
-                st.error(f"Not enough space! Need {len(pending_students)}, Available {free_space}")
+            if run_bulk(bulk.move_bus, pending_students.index, target_bus, FLEET): time.sleep(1); st.rerun()
     # -------------------------------------------
 
     with st.expander("🗑️ Bulk Unassign Tools"):
         st.subheader("Option: Empty a Bus")
         target_bus_e = st.selectbox("Select Bus to Empty:", buses)
         if st.button(f"🗑️ Empty {target_bus_e}"): 
-             mask = st.session_state.df['Bus_Number'] == target_bus_e
-             if mask.sum() > 0:
-                 st.session_state.df.loc[mask, 'Bus_Number']='Unassigned'
-                 if safe_update("Data", st.session_state.df):
-                     st.success(f"Emptied {target_bus_e}!"); time.sleep(1); st.rerun()
+             if store.stats.bus[target_bus_e] > 0:
+                 if run_bulk(bulk.move_bus, bulk.select(store, 'Bus', [target_bus_e]), 'Unassigned', FLEET): time.sleep(1); st.rerun()
              else: st.warning("Bus is already empty.")
 
     st.subheader("🖨️ Print Manifest")
-    if st.button("📄 Generate PDF Ready"):
-        html = "<html><head><style>@page{size:A4;margin:10mm;} body{font-family:Arial;font-size:12px;} table{width:100%;border-collapse:collapse;} th,td{border:1px solid black;padding:5px;} .page{page-break-after:always;}</style></head><body>"
-        for b in buses:
-            b_df = st.session_state.df[st.session_state.df['Bus_Number'] == b]
-            if not b_df.empty:
-                html += f"<div class='page'><h1>{b} List ({len(b_df)})</h1><table><tr><th>SL</th><th>Name</th><th>Role</th><th>Phone</th><th>Sign</th></tr>"
-                for i, (_, r) in enumerate(b_df.iterrows(), 1): html += f"<tr><td>{i}</td><td>{r['Name']}</td><td>{r['Role']}</td><td>{r['Spot Phone']}</td><td></td></tr>"
-                html += "</table></div>"
-        html += "</body></html>"
-        st.download_button("⬇️ Download", html, "Manifest.html", "text/html")
+    c1, c2 = st.columns(2)
+    c1.download_button("⬇️ Download", doc('manifest', buses), "Manifest.html", "text/html", on_click="ignore")
+    c2.download_button("🗂️ One file per bus (.zip)", doc('manifest_zip', buses), "Manifests.zip", "application/zip", on_click="ignore")
 
     st.subheader("🚀 Auto Assign (Role Based)")
-    c1, c2 = st.columns(2); role = c1.selectbox("Role", ["Student", "Volunteer", "Teacher"]); start = c2.selectbox("Start", buses)
-    if st.button("Assign"):
-        mask = st.session_state.df['Role'] == role; idxs = st.session_state.df[mask].index
-        b_i = buses.index(start); cnt=0
-        for i in idxs:
-            while b_i<4:
-                if len(st.session_state.df[st.session_state.df['Bus_Number']==buses[b_i]]) < BUS_CAPACITY:
-                    st.session_state.df.at[i, 'Bus_Number'] = buses[b_i]; cnt+=1; break
-                else: b_i+=1
-        if safe_update("Data", st.session_state.df):
-            st.success(f"Assigned {cnt}!"); st.rerun()
+    c1, c2 = st.columns(2)
+    roles = c1.multiselect("Roles (first = seated first)", store.stats.present(store.stats.role), ["Student"] if store.stats.role["Student"] else None)
+    start = c2.selectbox("Start", buses)
+    keep = st.checkbox("Keep classes together", True)
+    plan_key = f"bus_plan:{event.key}:{view}"  # labels are this store's
+    if st.button("🔍 Preview"):
+        with store.lock: st.session_state[plan_key] = plan_buses(store.df, FLEET, roles, start, keep, store.elsewhere()[0])
+    plan = st.session_state.get(plan_key)
+    if plan is not None:
+        st.dataframe(plan.summary(), hide_index=True, use_container_width=True)
+        if len(plan.overflow): st.warning(f"⚠️ {len(plan.overflow)} people don't fit in the selected buses and stay Unassigned.")
+        if st.button(f"✅ Assign {len(plan.assign)}", type="primary", disabled=not len(plan.assign)):
+            if run_bulk(bulk.apply_plan, plan.assign, FLEET): del st.session_state[plan_key]; st.rerun()
 
 # --- TAB: DASHBOARD ---
 elif menu == "📊 Dashboard":
     st.title("📊 Event Stats")
+    if view != EVERYONE: st.caption(f"Counts are for {view}; T-shirt stock and bus seats are event-wide.")
     
     # --- 🔥 NEW: STOCK DASHBOARD 🔥 ---
     st.subheader("👕 T-Shirt Stock Live")
-    s_cols = st.columns(5)
-    for i, size in enumerate(["S", "M", "L", "XL", "XXL"]):
-        total_q = st.session_state.stock.get(size, 0)
+    s_cols = st.columns(len(SIZES))
+    left = store.remaining()
+    for i, size in enumerate(SIZES):
+        total_q = left[size]
         with s_cols[i]:
             st.markdown(f"""
             <div class="stock-box">
                 <div style="font-size:12px; color:#aaa;">SIZE {size}</div>
-                <div style="font-size:24px; font-weight:bold; color:#00ff88;">{total_q}</div>
-                <div style="font-size:10px;">Remaining</div>
+                <div style="font-size:24px; font-weight:bold; color:{'#00ff88' if total_q > 0 else '#ff4b4b'};">{total_q}</div>
+                <div style="font-size:10px;">Remaining of {store.stock.get(size, 0)}</div>
             </div>
             """, unsafe_allow_html=True)
+    with st.expander("📒 Kit Ledger"):
+        snap = store.ledger.last_snapshot()
+        if snap: st.caption(f"Snapshot at event #{snap[0]}: " + ", ".join(f"{k} {v}" for k, v in snap[2].items()) + " collected")
+        st.dataframe(store.ledger.recent(50), hide_index=True, use_container_width=True)
     st.markdown("---")
     # ---------------------------------
     
-    if not st.session_state.df.empty:
-        df = st.session_state.df
+    stats = store.stats
+    if stats.total:
         grp1 = ['Student', 'Organizer', 'Volunteer']
-        cnt1 = len(df[df['Role'].isin(grp1)])
+        cnt1 = stats.in_group(grp1)
         grp2 = ['Teacher', 'College Staff', 'Principal', 'College Head']
-        cnt2 = len(df[df['Role'].isin(grp2)])
+        cnt2 = stats.in_group(grp2)
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Total Registered", len(df))
+        c1.metric("Total Registered", stats.total)
         c2.metric("Students + Team", cnt1)
         c3.metric("Faculty & Staff", cnt2)
-        c4.metric("Checked In", len(df[df['Entry_Status']=='Done']))
+        c4.metric("Checked In", stats.entered)
         st.markdown("### T-Shirt Distribution")
-        st.bar_chart(df['T_Shirt_Size'].value_counts())
+        st.bar_chart(pd.Series({sz: stats.size[sz] for sz in stats.present(stats.size)}, name="count"))
+
+        # --- 🔥 GATE THROUGHPUT (redrawn every 5s from the arrival counters, see throughput.py) 🔥 ---
+        @st.fragment(run_every=5)
+        def gate_board():
+            st.markdown("### 🚦 Gate Throughput")
+            t, w = now(), throughput.WINDOW
+            sm = throughput.summary(stats, t)
+            g1, g2, g3, g4 = st.columns(4)
+            g1.metric(f"Per minute (last {w} min)", f"{sm['rate']:.1f}")
+            g2.metric("Still outside", sm['left'])
+            g3.metric("Clear in", "—" if sm['eta_min'] is None else f"{sm['eta_min']:.0f} min")
+            g4.metric("Clear by", "—" if sm['clear_at'] is None else f"{sm['clear_at']:%H:%M}")
+            if sm['last'] is None: return st.caption("No timed check-ins yet.")
+            st.caption(f"Last check-in minute {sm['last']:%H:%M} · updated {t:%H:%M:%S}")
+            view = st.radio("Arrivals per minute by", ["All", "gate", "class"], horizontal=True, key="tp_by")
+            st.line_chart(throughput.per_minute(stats.arrivals, None if view == "All" else view))
+            c1, c2 = st.columns(2)
+            c1.dataframe(throughput.by_gate(stats, t), hide_index=True, use_container_width=True)
+            c2.dataframe(throughput.by_class(stats, t), hide_index=True, use_container_width=True)
+            with st.expander("📈 Arrival curves by class"): st.line_chart(throughput.class_curves(stats.arrivals))
+        gate_board()
     else: st.warning("⚠️ No data available.")
 
 # --- TAB: ADMIN DATA ---
 elif menu == "📝 Admin Data":
-    st.title("📝 Full DB"); st.dataframe(st.session_state.df)
-    st.download_button("Download CSV", st.session_state.df.to_csv(), "data.csv")
+    st.title("📝 Full DB")
+    paged_table("admin", "all", list(store.df.columns))
+    st.download_button("Download CSV", doc('csv'), "data.csv", "text/csv", on_click="ignore")
+    st.caption(f"Storage: {backend.name} · {event.title} · {view}")
+    # --- 🔥 DUPLICATE QUEUE 🔥 ---
+    with st.expander("🧬 Duplicate Queue"):
+        if view != EVERYONE: st.caption(f"Merging removes rows, so it works on the whole roster: switch 🧭 Serving to {EVERYONE}.")
+        elif st.toggle("Scan roster for duplicates", key="dupe_scan"):
+            with store.lock: ids = store.df[DUPE_COLS].copy()
+            q = dupe_queue((event.key, int(pd.util.hash_pandas_object(ids).sum())), ids)
+            dismissed = get_dismissed(event.key)
+            q = q[q.apply(lambda r: frozenset((r['Ticket_Number_a'], r['Ticket_Number_b'])) not in dismissed, axis=1).astype(bool)] if len(q) else q
+            st.caption(f"{len(q)} pair(s) to review, best match first")
+            for a, b, score, reason, name_a, name_b, tk_a, tk_b, ph_a, ph_b, cl_a, cl_b in q.head(15)[['a', 'b', 'score', 'reason', 'Name_a', 'Name_b', 'Ticket_Number_a', 'Ticket_Number_b', 'Spot Phone_a', 'Spot Phone_b', 'Class_a', 'Class_b']].itertuples(index=False):
+                with st.container(border=True):
+                    st.markdown(f"**{reason}** · score {score}")
+                    ca, cb = st.columns(2)
+                    ca.markdown(f"🅰️ {name_a}<br>{tk_a} · {ph_a} · Class {cl_a}", unsafe_allow_html=True)
+                    cb.markdown(f"🅱️ {name_b}<br>{tk_b} · {ph_b} · Class {cl_b}", unsafe_allow_html=True)
+                    k1, k2, k3 = st.columns(3)
+                    keep = a if k1.button("Keep 🅰️, merge 🅱️", key=f"ka_{a}_{b}") else b if k2.button("Keep 🅱️, merge 🅰️", key=f"kb_{a}_{b}") else None
+                    if k3.button("Not duplicates", key=f"nd_{a}_{b}"): dismissed.add(frozenset((tk_a, tk_b))); st.rerun()
+                    if keep is not None:
+                        drop = b if keep == a else a
+                        with store.lock:
+                            if keep in store.df.index and drop in store.df.index:
+                                store.edit(keep, merged_values(store.df.loc[keep], store.df.loc[drop])); store.remove([drop], f"Merged into {store.df.at[keep, 'Ticket_Number']}")
+                        if sync_data(): st.success("Merged!"); st.rerun()
+
+    with st.expander("🧰 Bulk Actions"):
+        c1, c2 = st.columns([1, 3])
+        by = c1.selectbox("Select by", list(bulk.SELECT_BY) + ["Tickets"], key="bulk_by")
+        if by == "Tickets": picked = c2.text_area("Ticket numbers (one per line or comma separated)", key="bulk_tickets").replace(',', '\n').split()
+        else: picked = c2.multiselect(by, sorted(store.df[bulk.SELECT_BY[by]].dropna().unique().astype(str)), key=f"bulk_pick_{by}")
+        rows = bulk.select(store, by, picked) if picked else store.df.index[:0]
+        c1, c2 = st.columns([1, 3])
+        action = c1.selectbox("Action", ["Mark entered", "Hand out kits", "Move to bus"], key="bulk_action")
+        bus_to = c2.selectbox("Bus", ["Unassigned"] + list(FLEET), key="bulk_bus") if action == "Move to bus" else None
+        st.caption(f"{len(rows)} row(s) selected")
+        if st.button(f"▶️ {action}: {len(rows)} selected", disabled=not len(rows)):
+            ops = {"Mark entered": (bulk.mark_entry, rows, now(), gate), "Hand out kits": (bulk.hand_kits, rows),
+                   "Move to bus": (bulk.move_bus, rows, bus_to, FLEET)}
+            if run_bulk(*ops[action]): st.rerun()
+        st.markdown("**↩️ Undo log**")
+        log = get_undo(JOURNAL).recent()
+        st.dataframe(log, hide_index=True, use_container_width=True)
+        open_ids = log.loc[log['Undone'] == '', 'Batch'].tolist()
+        u1, u2 = st.columns([1, 3])
+        bid = u1.selectbox("Batch", open_ids, key="bulk_undo", label_visibility="collapsed")
+        if u2.button("↩️ Undo batch", disabled=bid is None):
+            try:
+                done, skipped = bulk.revert(store, get_undo(JOURNAL), bid)
+                if sync_data(): st.toast(f"Restored {done} row(s)" + (f", skipped {skipped} changed since" if skipped else ""), icon="↩️"); st.rerun()
+            except bulk.BulkError as e: st.error(str(e))
+
+    with st.expander("🪪 Batch Event Passes"):
+        c1, c2, c3 = st.columns([1, 2, 1])
+        by = c1.selectbox("Filter by", ["Everyone"] + list(PASS_GROUPS), key="pass_by")
+        col = PASS_GROUPS.get(by)
+        picked = c2.multiselect(by, sorted(store.df[col].dropna().unique().astype(str)), key=f"pass_pick_{by}") if col else []
+        unprinted = c3.toggle("Not yet printed", key="pass_new", help="New attendees and passes whose details changed since they were printed")
+        recs = pass_records(ver(), col, tuple(picked), unprinted, get_passes(event.key, view)[1].marked)
+        st.caption(f"{len(recs)} pass(es), {passes.PER_PAGE} per A4 page")
+        d1, d2, d3 = st.columns(3)
+        d1.download_button("🖨️ One printable file", lambda: pass_file(recs), "Event_Passes.html", "text/html", on_click="ignore", disabled=not recs)
+        d2.download_button(f"🗂️ One file per {(by if col else 'class').lower()} (.zip)", lambda: pass_file(recs, col or 'Class'), "Event_Passes.zip", "application/zip", on_click="ignore", disabled=not recs)
+        if d3.button(f"✅ Mark {len(recs)} as printed", disabled=not recs):
+            get_passes(event.key, view)[1].mark(recs); st.success("Marked!"); st.rerun()
+
+    with st.expander("👕 T-Shirt Allocation"):
+        # Shirts bought per size; what's left is this minus what has been collected
+        a_cols = st.columns(len(SIZES))
+        alloc = {sz: a_cols[i].number_input(sz, 0, value=int(store.stock.get(sz, 0)), key=f"alloc_{sz}") for i, sz in enumerate(SIZES)}
+        if st.button("💾 Save Allocation") and alloc != store.stock:
+            store.set_stock(alloc)
+            if sync_data(): st.success("Allocation saved!")
+    if isinstance(backend.inner, SQLiteBackend) and view == EVERYONE:  # whole-roster copies only
+        c1, c2 = st.columns(2)
+        if c1.button("☁️ Export to Google Sheet"):
+            try:
+                with store.lock: df, stock = store.df.copy(), dict(store.stock)
+                gs = sheet_backend(); gs.write_roster(df); gs.write_stock(stock)
+                st.success(f"Exported {len(df)} rows to the sheet.")
+            except Exception as e: sync_error(e)
+        # Seed the local database before the event (replaces what is in it)
+        if c2.button("📥 Load from Google Sheet") and flush_now():
+            try:
+                gs = sheet_backend()
+                df = typed(gs.read_roster(), event); stock = gs.read_stock()
+                if isinstance(stock, Remaining): stock = engine.migrate_stock(gs, stock, df, event.sizes)
+                backend.write_roster(df); backend.write_stock(stock)
+                df, stock, store.remote_rev = load_all(); store.load(df, stock); st.rerun()
+            except Exception as e: sync_error(e)
+
+# --- TAB: SYSTEM HEALTH ---
+elif menu == "🩺 System Health":
+    st.title("🩺 System Health")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Rows", len(store.df)); c2.metric("Data Version", store.version)
+    c3.metric("Waiting for Sync", store.journal.pending_count()); c4.metric("Sync Failures", flusher.failures)
+    st.caption(f"{event.title} · serving {view} · journal {JOURNAL}" + (f" · {len(store.outside)} seat / kit holder(s) in other partitions" if view != EVERYONE else ""))
+    if flusher.last_ok: st.caption(f"Storage: {backend.name} · last successful sync {datetime.fromtimestamp(flusher.last_ok):%H:%M:%S} · revision {store.remote_rev}")
+    snap = snapshot.info(snapshot.path_for(JOURNAL))
+    if snap: st.caption(f"Warm-restart snapshot: {snap['rows']} rows at revision {snap['rev']} · saved {datetime.fromtimestamp(snap['saved_at']):%H:%M:%S}")
+    if store.conflicts:
+        st.subheader("⚔️ Edit Conflicts")
+        st.caption("Cells changed on the sheet while this server still had its own edit to send. Ours was kept; theirs is shown here.")
+        st.dataframe(pd.DataFrame(list(store.conflicts)[::-1]), hide_index=True, use_container_width=True)
+    st.subheader("Server (all sessions)")
+    st.dataframe(METRICS.summary(), hide_index=True, use_container_width=True)
+    st.subheader("This session")
+    st.dataframe(st.session_state.metrics.summary(), hide_index=True, use_container_width=True)
+    st.download_button("⬇️ metrics.txt", METRICS.text() + gauges(), "metrics.txt", "text/plain")
+    if METRICS_FILE: st.caption(f"Also rewritten every 15 s at {METRICS_FILE}")
+
+ms = (time.perf_counter() - page_t) * 1000
+for m in (METRICS, st.session_state.metrics): m.record(f"page {menu}", ms)
 
 # --- SIDEBAR FOOTER (CREDITS) ---
 st.sidebar.markdown("---")
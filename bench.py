@@ -0,0 +1,252 @@
+"""Benchmarks on synthetic rosters, against an in-memory stand-in for Google Sheets.
+
+    python bench.py                          # 5k / 20k / 100k rows, no latency
+    python bench.py --rows 20000 --latency 0.3 --repeat 5 --out bench_output.jsonl
+
+One JSON object per scenario and roster size is printed (and appended to
+--out), so runs can be diffed or plotted before event day.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import numpy as np
+import pandas as pd
+from schema import REQ_COLS, SIZES, normalize, now
+from roster import RosterStore
+from journal import push_pending
+from storage import GSheetsBackend
+from allocation import plan_buses
+from docs import manifest_html
+import throughput
+from events import Scope
+
+ROLES = ['Student'] * 16 + ['Teacher', 'Volunteer', 'College Staff', 'Organizer']
+CLASSES = [str(c) for c in range(3, 13)]
+FLEET = {f"Bus {i}": 45 for i in range(1, 5)}
+DAY = "2026-02-03"
+
+
+# ==================== SYNTHETIC ROSTER ====================
+def synthetic_roster(n, seed=0, entered=0.3):
+    """`n` rows in the `REQ_COLS` layout, typed the way gspread hands them back
+    (numeric cells as floats, blanks as NaN)."""
+    rng = np.random.default_rng(seed)
+    role = rng.choice(ROLES, n)
+    student = role == 'Student'
+    ent = rng.random(n) < entered
+    secs = rng.integers(7 * 3600, 11 * 3600, n)
+    df = pd.DataFrame({
+        'Name': [f"Attendee {i} {w}" for i, w in zip(range(n), rng.choice(['Rahman', 'Hossain', 'Akter', 'Islam', 'Khan'], n))],
+        'Role': role,
+        'Spot Phone': (1700000000 + rng.permutation(n)).astype(float),
+        'Guardian Phone': np.where(student, 1800000000 + np.arange(n), np.nan),
+        'Ticket_Number': [f"W26-{i:06d}" for i in range(n)],
+        'Class': np.where(student, rng.choice(CLASSES, n).astype(float), np.nan),
+        'Roll': np.where(student, rng.integers(1, 120, n), np.nan),
+        'Entry_Status': np.where(ent, 'Done', None),
+        'Entry_Time': np.where(ent, [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in secs], None),
+        'Entry_Gate': np.where(ent, rng.choice(['Main Gate', 'North Gate', 'Desk'], n), None),
+        'Bus_Number': 'Unassigned',
+        'T_Shirt_Size': rng.choice(SIZES, n),
+        'T_Shirt_Collected': np.where(rng.random(n) < 0.2, 'Yes', 'No'),
+        'Notes': None,
+    }, columns=REQ_COLS)
+    return df.replace({None: np.nan})
+
+
+# ==================== FAKE GSHEETS CONNECTION ====================
+# Same surface the app uses (read / update / client._select_worksheet().batch_update,
+# client._open_spreadsheet().get_lastUpdateTime), each call sleeping `latency`
+# seconds like a round trip to Google, and failing with probability `fail_rate`.
+
+def _a1(ref):
+    m = re.fullmatch(r"([A-Z]+)(\d+)", ref)
+    col = 0
+    for ch in m[1]: col = col * 26 + ord(ch) - 64
+    return int(m[2]), col
+
+
+class FakeWorksheet:
+    def __init__(self, conn, name):
+        self.conn, self.name = conn, name
+        self.row_count = len(conn.sheets[name][1]) + 1
+
+    def add_rows(self, n):
+        self.conn.wait(); self.row_count += n
+
+    def batch_update(self, batch, **kw):
+        self.conn.wait(); self.conn.calls['batch_update'] += 1
+        with self.conn.lock:
+            cols, grid = self.conn.sheets[self.name]
+            for b in batch:
+                (r0, c0), _ = map(_a1, b['range'].split(':'))
+                vals = b['values']
+                need = r0 - 2 + len(vals)
+                if need > len(grid): grid = np.vstack([grid, np.full((need - len(grid), len(cols)), np.nan, dtype=object)])
+                grid[r0 - 2:need, c0 - 1:c0 - 1 + len(vals[0])] = vals
+            self.conn.sheets[self.name] = (cols, grid); self.conn.rev += 1
+
+
+class FakeSpreadsheet:
+    def __init__(self, conn): self.conn = conn
+    def get_lastUpdateTime(self):
+        self.conn.wait(); return str(self.conn.rev)
+
+
+class FakeClient:
+    def __init__(self, conn): self.conn = conn
+    def _select_worksheet(self, worksheet=None, **kw): return FakeWorksheet(self.conn, worksheet)
+    def _open_spreadsheet(self, **kw): return FakeSpreadsheet(self.conn)
+
+
+class FakeGSheetsConnection:
+    """Sheets are kept as (header, object grid) so cell writes are plain array stores."""
+
+    def __init__(self, sheets, latency=0.0, fail_rate=0.0, seed=0):
+        self.sheets, self.rev, self.lock = {}, 0, threading.Lock()
+        for k, v in sheets.items(): self._put(k, v)
+        self.latency, self.fail_rate, self.rng = latency, fail_rate, random.Random(seed)
+        self.client = FakeClient(self)
+        self.calls = {'read': 0, 'update': 0, 'batch_update': 0, 'failed': 0}
+
+    def _put(self, name, df): self.sheets[name] = (list(df.columns), df.to_numpy(dtype=object, copy=True))
+
+    def wait(self):
+        if self.latency: time.sleep(self.latency)
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            self.calls['failed'] += 1; raise ConnectionError("injected Sheets failure")
+
+    def read(self, worksheet=None, ttl=None, **kw):
+        self.wait(); self.calls['read'] += 1
+        with self.lock: cols, grid = self.sheets[worksheet]; grid = grid.copy()
+        return pd.DataFrame(grid, columns=cols).replace('', np.nan).dropna(how='all')
+
+    def update(self, worksheet=None, data=None, **kw):
+        self.wait(); self.calls['update'] += 1
+        with self.lock: self._put(worksheet, data); self.rev += 1
+
+    def set_cell(self, worksheet, row, col, value):
+        # Someone typing straight into the sheet (row = sheet row label, col = header name)
+        with self.lock:
+            cols, grid = self.sheets[worksheet]
+            grid[row, cols.index(col)] = value; self.rev += 1
+
+
+def fake_connection(n, latency=0.0, seed=0, fail_rate=0.0):
+    stock = pd.DataFrame({'Size': SIZES, 'Allocation': [n // 4] * len(SIZES)})
+    return FakeGSheetsConnection({'Data': synthetic_roster(n, seed), 'Stock': stock}, latency, fail_rate, seed)
+
+
+# ==================== SCENARIOS ====================
+# Each takes a fresh (store, backend) pair and returns a callable to time.
+
+def _store(backend):
+    store = RosterStore()
+    store.load(normalize(backend.read_roster(), DAY), backend.read_stock())
+    return store
+
+def sc_load_data(store, backend):
+    return lambda: normalize(backend.read_roster(), DAY)
+
+def sc_store_load(store, backend):
+    df = normalize(backend.read_roster(), DAY)
+    return lambda: RosterStore().load(df.copy())
+
+def sc_partition_load(store, backend):
+    # A device serving two of the ten classes: it indexes and counts only those rows
+    df, scope = normalize(backend.read_roster(), DAY), Scope('Juniors', 'Class', CLASSES[:2])
+    return lambda: RosterStore(scope).load(df.copy())
+
+def sc_search(store, backend):
+    df = store.df
+    qs = [df['Ticket_Number'].iloc[len(df) // 2], df['Name'].iloc[-1], '0' + str(df['Spot Phone'].iloc[7]), 'att', 'rahm']
+    return lambda: [store.index.search(q) for q in qs]
+
+def sc_save(store, backend):
+    labels = iter(store.df.index[~store.df['Entry_Status']])
+    def run():
+        store.edit(next(labels), {'Entry_Status': True, 'Entry_Time': now(), 'T_Shirt_Collected': True})
+        push_pending(store, backend)
+    return run
+
+def sc_class_assign(store, backend):
+    classes = itertools.cycle(CLASSES)
+    def run():
+        c = next(classes)
+        pending = store.df[(store.df['Class'] == c) & (store.df['Bus_Number'] == 'Unassigned')]
+        store.edit(pending.index, {'Bus_Number': 'Bus 1'})
+        push_pending(store, backend)
+    return run
+
+def sc_auto_assign(store, backend):
+    fleet = {b: len(store.df) // 4 + 1 for b in FLEET}
+    return lambda: plan_buses(store.df, fleet, ['Student', 'Teacher', 'Volunteer'])
+
+def sc_manifest(store, backend):
+    fleet = {b: len(store.df) // 4 + 1 for b in FLEET}
+    plan = plan_buses(store.df, fleet, ['Student', 'Teacher', 'Volunteer', 'College Staff', 'Organizer'])
+    for b in fleet: store.edit(plan.assign.index[plan.assign == b], {'Bus_Number': b})
+    return lambda: manifest_html(store.df, list(fleet))
+
+def sc_dashboard(store, backend):
+    # A gate check-in, then what the Dashboard page reads: the store's counters, patched by the edit
+    labels = iter(store.df.index[~store.df['Entry_Status']])
+    def run():
+        store.check_in(next(labels), now(), "North")
+        s = store.stats
+        return (s.total, s.entered, [s.role[r] for r in s.present(s.role)], s.in_group(['Teacher', 'College Staff']),
+                {z: s.size[z] for z in s.present(s.size)}, store.remaining())
+    return run
+
+def sc_gate_throughput(store, backend):
+    # One Dashboard refresh of the gate board, from the live counters
+    t = store.df['Entry_Time'].max()
+    return lambda: (throughput.summary(store.stats, t), throughput.by_gate(store.stats, t), throughput.by_class(store.stats, t),
+                    throughput.per_minute(store.stats.arrivals, 'gate'), throughput.class_curves(store.stats.arrivals))
+
+SCENARIOS = {
+    'load_data': sc_load_data, 'store_load': sc_store_load, 'partition_load': sc_partition_load, 'search': sc_search, 'save_changes': sc_save, 'class_bulk_assign': sc_class_assign,
+    'auto_assign': sc_auto_assign, 'manifest': sc_manifest, 'dashboard': sc_dashboard,
+    'gate_throughput': sc_gate_throughput,
+}
+
+
+def bench(rows, latency=0.0, repeat=5, only=None):
+    for name, make in SCENARIOS.items():
+        if only and name not in only: continue
+        conn = fake_connection(rows, latency)
+        backend = GSheetsBackend(conn)
+        store = _store(backend)
+        run = make(store, backend)
+        times = []
+        for _ in range(repeat):
+            t = time.perf_counter(); run(); times.append((time.perf_counter() - t) * 1000)
+        yield {'scenario': name, 'rows': rows, 'latency_s': latency, 'repeat': repeat,
+               'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3),
+               'max_ms': round(max(times), 3), 'calls': dict(conn.calls)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, nargs='+', default=[5000, 20000, 100000])
+    ap.add_argument('--latency', type=float, default=0.0, help="seconds per fake Sheets call")
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--only', nargs='+', choices=list(SCENARIOS))
+    ap.add_argument('--out', help="append results here as JSON lines")
+    a = ap.parse_args()
+    out = open(a.out, 'a') if a.out else None
+    for n in a.rows:
+        for res in bench(n, a.latency, a.repeat, a.only):
+            line = json.dumps(res)
+            print(line, flush=True)
+            if out: out.write(line + '\n')
+    if out: out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+from schema import TZ, to_sheet
+
+# ==================== BULK OPERATIONS ====================
+# Batch edits picked by a selector (class / role / bus / ticket list). A batch
+# is a few RosterStore.edit calls, one per distinct new value: each is one
+# vectorized set_cells and one journal entry, and the flusher sends them all
+# in the next batch_update.
+#
+# Every batch goes to an UndoLog with the cells' text before and after.
+# Undo writes the "before" values back the same way, grouped by value, and
+# skips rows that someone changed since (they no longer match "after").
+
+SELECT_BY = {'Class': 'Class', 'Role': 'Role', 'Bus': 'Bus_Number'}
+
+
+class BulkError(ValueError):
+    pass
+
+
+def select(store, by, picked):
+    """Row labels for `picked` values of a SELECT_BY column, or by='Tickets' for a list of ticket numbers."""
+    if by == 'Tickets':
+        hits = [store.index.ticket(str(t).strip()) for t in picked if str(t).strip()]
+        return pd.Index(sorted(set().union(*hits)) if hits else [], dtype='int64')
+    df = store.df
+    return df.index[df[SELECT_BY[by]].isin(picked).to_numpy(dtype=bool)]
+
+
+# --- the batch itself ---
+def apply(store, undo, name, parts):
+    """Run `parts` ((labels, values) pairs) as one batch under the store lock, recorded in
+    `undo` (an UndoLog, or None). Returns (changed labels, batch id)."""
+    with store.lock:
+        labels = sorted(set().union(*(set(idx) for idx, _ in parts))) if parts else []
+        cols = list(dict.fromkeys(c for _, v in parts for c in v))
+        before = to_sheet(store.df.loc[labels, cols]) if undo else None
+        touched = set()
+        for idx, values in parts:
+            if len(idx): touched |= store.edit(idx, values)
+        bid = None
+        if touched and undo:
+            rows = sorted(touched)
+            bid = undo.record(name, before.loc[rows], to_sheet(store.df.loc[rows, cols + ['Ticket_Number']]))
+    return touched, bid
+
+
+def revert(store, undo, bid):
+    """Undo batch `bid`. Returns (rows restored, rows skipped because they changed since)."""
+    name, before, after = undo.get(bid)
+    with store.lock:
+        live = [i for i in after.index if i in store.df.index]
+        cur = to_sheet(store.df.loc[live, after.columns])
+        same = cur.index[(cur.to_numpy() == after.loc[live].to_numpy()).all(axis=1)]  # and still the same ticket on that row
+        back = before.loc[same]
+        for vals, grp in back.groupby(list(back.columns), dropna=False, sort=False):
+            store.edit(grp.index, dict(zip(back.columns, vals if isinstance(vals, tuple) else (vals,))))
+        undo.mark_undone(bid)
+    return len(same), len(after) - len(same)
+
+
+# --- checked operations ---
+def mark_entry(store, undo, labels, when, gate=None):
+    # Only people not in yet: an earlier entry time is never overwritten
+    with store.lock:
+        todo = labels[~store.df.loc[labels, 'Entry_Status'].to_numpy(dtype=bool)]
+        return apply(store, undo, f"Mark {len(todo)} entered", [(todo, {'Entry_Status': True, 'Entry_Time': when, 'Entry_Gate': gate})])
+
+
+def hand_kits(store, undo, labels):
+    """Mark kits collected for everyone in `labels` with a size who hasn't got one, if stock covers every size."""
+    with store.lock:
+        df = store.df.loc[labels]
+        todo = df.index[~df['T_Shirt_Collected'].to_numpy(dtype=bool) & df['T_Shirt_Size'].notna().to_numpy()]
+        need, left = df.loc[todo, 'T_Shirt_Size'].value_counts(), store.remaining()
+        short = {s: int(n) - left.get(s, 0) for s, n in need.items() if n > left.get(s, 0)}
+        if short: raise BulkError("Not enough stock: " + ", ".join(f"{s} short by {n}" for s, n in short.items()))
+        return apply(store, undo, f"Hand out {len(todo)} kits", [(todo, {'T_Shirt_Collected': True})])
+
+
+def move_bus(store, undo, labels, bus, fleet):
+    """Move `labels` to `bus` ('Unassigned' or a bus in `fleet`), if the seats are there."""
+    return assign_buses(store, undo, pd.Series(bus, index=labels, dtype=object), fleet, f"Move {{n}} to {bus}")
+
+
+def assign_buses(store, undo, assign, fleet, name="Assign {n} to buses"):
+    """`assign`: label -> bus. One edit per bus; every bus is checked for seats first."""
+    with store.lock:
+        cur = store.df.loc[assign.index, 'Bus_Number'].astype(object).to_numpy()
+        assign = assign[cur != assign.to_numpy()]
+        seats = store.seats()  # event-wide, other partitions' riders included
+        for bus, n in assign.value_counts().items():
+            if bus != 'Unassigned' and bus not in fleet: raise BulkError(f"No such bus: {bus}")
+            if bus in fleet and seats[bus] + n > fleet[bus]:
+                raise BulkError(f"{bus} has {fleet[bus] - seats[bus]} seat(s) left, {n} requested")
+        parts = [(idxs, {'Bus_Number': bus}) for bus, idxs in assign.groupby(assign).groups.items()]
+        return apply(store, undo, name.format(n=len(assign)), parts)
+
+
+def apply_plan(store, undo, assign, fleet, name="Auto-assign {n}"):
+    """Apply a plan_buses preview, if everyone in it is still unassigned: check-ins and other
+    edits since don't matter, and assign_buses checks the seats are still there."""
+    with store.lock:
+        here = assign.index[assign.index.isin(store.df.index)]
+        moved = len(assign) - len(here) + int((store.df.loc[here, 'Bus_Number'] != 'Unassigned').sum())
+        if moved: raise BulkError(f"{moved} of them got a bus or left the roster since the preview. Preview again.")
+        return assign_buses(store, undo, assign, fleet, name)
+
+
+# ==================== UNDO LOG ====================
+def _pack(f): return json.dumps({'idx': [int(i) for i in f.index], **{c: f[c].tolist() for c in f.columns}})
+
+def _unpack(s):
+    d = json.loads(s); idx = d.pop('idx')
+    return pd.DataFrame(d, index=pd.Index(idx, dtype='int64'))
+
+
+class UndoLog:
+    """Before / after text of every batch, next to the journal (survives restarts)."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS bulk_batches (id INTEGER PRIMARY KEY, ts REAL, name TEXT, rows INTEGER, before TEXT, after TEXT, undone REAL)")
+
+    def record(self, name, before, after):
+        with self.lock:
+            return self.db.execute("INSERT INTO bulk_batches (ts, name, rows, before, after) VALUES (?, ?, ?, ?, ?)",
+                                   (time.time(), name, len(before), _pack(before), _pack(after))).lastrowid
+
+    def get(self, bid):
+        with self.lock: r = self.db.execute("SELECT name, before, after, undone FROM bulk_batches WHERE id = ?", (bid,)).fetchone()
+        if r is None: raise BulkError(f"No batch #{bid}")
+        if r[3]: raise BulkError(f"Batch #{bid} was already undone")
+        return r[0], _unpack(r[1]), _unpack(r[2])
+
+    def mark_undone(self, bid):
+        with self.lock: self.db.execute("UPDATE bulk_batches SET undone = ? WHERE id = ?", (time.time(), bid))
+
+    def recent(self, n=20):
+        with self.lock: rows = self.db.execute("SELECT id, ts, name, rows, undone FROM bulk_batches ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+        out = pd.DataFrame(rows, columns=['Batch', 'Time', 'What', 'Rows', 'Undone'])
+        for c in ['Time', 'Undone']: out[c] = pd.to_datetime(out[c], unit='s', utc=True).dt.tz_convert(TZ).dt.strftime('%H:%M:%S').fillna('')
+        return out
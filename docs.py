@@ -0,0 +1,79 @@
+import io
+import zipfile
+import pandas as pd
+from schema import to_display
+
+# ==================== PRINTABLE DOCUMENTS ====================
+# Bus manifests and absent lists. Rows are built column-wise with vectorised
+# string ops (no iterrows / html +=) and emitted as chunks, so a document is
+# one join at the end and a zip streams each file straight into the archive.
+# app1 caches the finished bytes per data version.
+
+CHUNK = 2000  # table rows per chunk
+
+MANIFEST_HEAD = "<html><head><meta charset='utf-8'><style>@page{size:A4;margin:10mm;} body{font-family:Arial;font-size:12px;} table{width:100%;border-collapse:collapse;} th,td{border:1px solid black;padding:5px;} .page{page-break-after:always;}</style></head><body>"
+PLAIN_HEAD = "<html><head><meta charset='utf-8'></head><body>"
+TAIL = "</body></html>"
+
+
+def _col(s):
+    # display text, HTML-escaped, as one string Series
+    s = pd.Series(s, dtype="string[pyarrow]")
+    return s.str.replace('&', '&amp;', regex=False).str.replace('<', '&lt;', regex=False).str.replace('>', '&gt;', regex=False)
+
+def _rows(df, cols, serial=False):
+    """Yield <tr> rows for `cols` of `df`, CHUNK rows at a time."""
+    t = to_display(df[cols])
+    parts = [_col(t[c].to_numpy()) for c in cols]  # positional, so the serial column lines up
+    if serial: parts.insert(0, pd.Series(range(1, len(df) + 1)).astype("string[pyarrow]"))
+    if not parts or not len(df): return
+    row = '<tr><td>' + parts[0]
+    for p in parts[1:]: row = row + '</td><td>' + p
+    row = (row + '</td></tr>').tolist()
+    for i in range(0, len(row), CHUNK): yield ''.join(row[i:i + CHUNK])
+
+def _table(head, rows):
+    yield '<table><tr>' + ''.join(f'<th>{h}</th>' for h in head) + '</tr>'
+    yield from rows
+    yield '</table>'
+
+
+# --- chunk generators ---
+def manifest_chunks(df, buses):
+    yield MANIFEST_HEAD
+    for b in buses:
+        b_df = df[df['Bus_Number'] == b]
+        if b_df.empty: continue
+        yield f"<div class='page'><h1>{b} List ({len(b_df)})</h1>"
+        yield from _table(['SL', 'Name', 'Role', 'Phone', 'Sign'], _rows(b_df.assign(Sign=''), ['Name', 'Role', 'Spot Phone', 'Sign'], serial=True))
+        yield "</div>"
+    yield TAIL
+
+def absent_chunks(df, title):
+    yield PLAIN_HEAD + f"<h1>Absent List - {title}</h1>"
+    yield from _table(['Name', 'Class', 'Phone'], _rows(df, ['Name', 'Class', 'Spot Phone']))
+    yield TAIL
+
+
+# --- finished files ---
+def render(chunks): return ''.join(chunks).encode('utf-8')
+
+def zip_files(files):
+    """files: iterable of (file name, chunk generator) -> zip bytes, each file streamed in."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, chunks in files:
+            with zf.open(name, 'w') as f:
+                for c in chunks: f.write(c.encode('utf-8'))
+    return buf.getvalue()
+
+def manifest_html(df, buses): return render(manifest_chunks(df, buses))
+
+def manifest_zip(df, buses):
+    return zip_files((f"Manifest_{b.replace(' ', '_')}.html", manifest_chunks(df, [b])) for b in buses if (df['Bus_Number'] == b).any())
+
+def absent_html(df, title): return render(absent_chunks(df, title))
+
+def absent_zip(df):
+    classes = sorted(df['Class'].dropna().unique())
+    return zip_files((f"Absent_Class_{c}.html", absent_chunks(df[df['Class'] == c], c)) for c in classes)
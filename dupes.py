@@ -0,0 +1,79 @@
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+import pandas as pd
+from lookup import _clean, norm_phone
+
+# ==================== DUPLICATE DETECTION ====================
+# Blocking first, scoring second: rows are only compared when they share a
+# normalized ticket, phone or name key, so 50k rows are a few thousand
+# comparisons, not a billion. Pairs are then scored with a fuzzy name match
+# and handed to the admin as a merge queue (best first).
+
+BLOCK_MAX = 25    # a key shared by more rows than this says nothing (blank-ish / generic)
+MIN_SCORE = 60
+HONORIFICS = {'md', 'mst', 'mohammad', 'mohammed', 'muhammad', 'mohd', 'sk', 'mr', 'mrs', 'ms', 'dr'}
+COLS = ['Name', 'Ticket_Number', 'Spot Phone', 'Guardian Phone', 'Class', 'Role']
+
+
+def name_norm(s):
+    toks = re.sub(r'[^a-z0-9 ]', ' ', _clean(s)).split()
+    return ' '.join(t for t in toks if t not in HONORIFICS)
+
+
+def _keys(df):
+    names = df['Name'].map(name_norm, na_action='ignore').fillna('')
+    k = pd.DataFrame({
+        'ticket': df['Ticket_Number'].map(_clean, na_action='ignore'),
+        'phone': df['Spot Phone'].map(norm_phone, na_action='ignore'),
+        # same tokens in any order; and first/last token stems within a class (catches typos)
+        'name': names.map(lambda n: ' '.join(sorted(n.split()))),
+        'stem': names.map(lambda n: n.split()[0][:3] + '|' + n.split()[-1][:3] if n else '') + '|' + df['Class'].astype(str),
+    }, index=df.index)
+    return k.replace('', pd.NA), names
+
+
+def _pairs(keys, only=None):
+    reasons = {}
+    for key in keys.columns:
+        for members in keys.groupby(key, sort=False).indices.values():
+            if len(members) < 2 or len(members) > BLOCK_MAX: continue
+            labels = keys.index[members]
+            for a, b in combinations(sorted(labels), 2):
+                if only is None or a in only or b in only: reasons.setdefault((a, b), set()).add(key)
+    return reasons
+
+
+def find_duplicates(df, only=None, min_score=MIN_SCORE):
+    """Scored duplicate pairs in `df`; with `only`, just pairs touching those labels.
+    Returns a frame (a, b, score, reason, ...) sorted best first."""
+    df = df[COLS]
+    keys, names = _keys(df)
+    rows = []
+    for (a, b), why in (_pairs(keys, only) if len(df) > 1 else {}).items():
+        sim = SequenceMatcher(None, names[a], names[b]).ratio() if names[a] and names[b] else 0.0
+        same_cls = df.at[a, 'Class'] == df.at[b, 'Class'] if pd.notna(df.at[a, 'Class']) else pd.isna(df.at[b, 'Class'])
+        if 'ticket' in why: score, reason = 100, "Same ticket"
+        elif 'phone' in why and sim >= 0.8: score, reason = round(70 + 30 * sim), "Same phone, similar name"
+        elif 'phone' in why and same_cls and sim >= 0.6: score, reason = round(50 + 30 * sim), "Same phone and class"
+        elif sim >= 0.9 and same_cls: score, reason = round(40 + 40 * sim), "Same name" + (" and class" if pd.notna(df.at[a, 'Class']) else "")
+        else: continue
+        if score >= min_score: rows.append((a, b, score, reason))
+    out = pd.DataFrame(rows, columns=['a', 'b', 'score', 'reason'])
+    for side in ['a', 'b']:
+        for c in ['Name', 'Ticket_Number', 'Spot Phone', 'Class']:
+            out[f"{c}_{side}"] = df.loc[out[side], c].to_numpy() if len(out) else []
+    return out.sort_values(['score', 'a'], ascending=[False, True], ignore_index=True)
+
+
+def merged_values(keep, drop):
+    """Cells to write on `keep` (a row Series) so it carries everything `drop` knew."""
+    out = {c: drop[c] for c in keep.index
+           if c not in ('Entry_Status', 'T_Shirt_Collected', 'Entry_Time', 'Bus_Number', 'Notes') and pd.isna(keep[c]) and pd.notna(drop[c])}
+    if drop['Entry_Status'] and not keep['Entry_Status']: out['Entry_Status'] = True
+    if pd.notna(drop['Entry_Time']) and (pd.isna(keep['Entry_Time']) or drop['Entry_Time'] < keep['Entry_Time']): out['Entry_Time'] = drop['Entry_Time']
+    if drop['T_Shirt_Collected'] and not keep['T_Shirt_Collected']: out['T_Shirt_Collected'] = True
+    if keep['Bus_Number'] == 'Unassigned' and drop['Bus_Number'] != 'Unassigned': out['Bus_Number'] = drop['Bus_Number']
+    note = f"Merged {drop['Ticket_Number']}"
+    out['Notes'] = note if pd.isna(keep['Notes']) else f"{keep['Notes']}; {note}"
+    return out
@@ -0,0 +1,160 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from roster import RosterStore
+from lookup import _clean
+from schema import normalize
+from journal import Journal, SheetFlusher, sync, pull_remote
+from storage import GSheetsBackend, SQLiteBackend, Remaining
+from inventory import KitLedger
+import events
+import snapshot
+from events import EVERYONE
+
+# ==================== EVENT ENGINE ====================
+# What app1 (the Streamlit UI) and api.py (the headless check-in service)
+# share: event config, the storage backend, and a roster store with its
+# journal and background flusher. Each process owns its store and journal;
+# they meet at the backend, where every flusher round merges what the other
+# one wrote (journal.pull_remote). A restart starts from the process's last
+# snapshot (snapshot.py) and catches up the same way.
+#
+# Events come from EVENT_CONFIG (see events.py). Each event + partition a
+# process serves is its own store, journal and snapshot over the event's
+# backend; SheetRows keeps that event's stores in the process appending to
+# different sheet rows, and answers cross-partition lookups.
+
+# EVENT_STORAGE=sqlite:<path> runs the venue entirely on a local database (export to the sheet from Admin Data)
+STORAGE = os.environ.get("EVENT_STORAGE", "gsheets")
+EVENTS = events.load(os.environ.get("EVENT_CONFIG", "events.json"), STORAGE)
+EVENT = next(iter(EVENTS.values()))  # the first one; the only one without EVENT_CONFIG
+
+
+def typed(raw, event=EVENT): return normalize(raw, event.day)
+
+def load_data(read, event=EVENT):
+    try:
+        # Typed once here (see schema.py); converted back to sheet text only when written
+        return typed(read.result(), event)
+    except Exception:
+        df = normalize(pd.DataFrame()); df.attrs['sheet_cols'] = None  # header unknown
+        return df
+
+def clean_stock(stock, sizes=EVENT.sizes): return {s: int(float(stock.get(s, 0))) for s in sizes}
+
+def load_stock(read, sizes=EVENT.sizes):
+    try: return clean_stock(read.result(), sizes)
+    except Exception: return dict.fromkeys(sizes, 0)
+
+def migrate_stock(backend, left, df, sizes=EVENT.sizes):
+    """Allocation from an older Stock sheet (storage.Remaining: shirts left per size) and the
+    typed roster `df`: what was left plus what was collected. Written back in the new layout, once."""
+    got = df.loc[df['T_Shirt_Collected'].to_numpy(dtype=bool), 'T_Shirt_Size'].value_counts()
+    alloc = {s: n + int(got.get(s, 0)) for s, n in clean_stock(left, sizes).items()}
+    backend.write_stock(alloc)
+    return alloc
+
+def read_stock(backend, event=EVENT):
+    # The flusher's re-read: an older sheet is migrated against the whole roster
+    stock = backend.read_stock()
+    if isinstance(stock, Remaining): return migrate_stock(backend, stock, typed(backend.read_roster(), event), event.sizes)
+    return clean_stock(stock, event.sizes)
+
+def load_all(backend, event=EVENT):
+    """Roster, stock and the revision they are at, read at the same time: one round trip of waiting."""
+    with ThreadPoolExecutor(3) as ex:
+        rev, data, stock = ex.submit(backend.revision), ex.submit(backend.read_roster), ex.submit(backend.read_stock)
+        df = load_data(data, event)
+        ok = df.attrs['sheet_cols'] is not None and rev.exception() is None
+        if ok and stock.exception() is None and isinstance(stock.result(), Remaining):
+            return df, migrate_stock(backend, stock.result(), df, event.sizes), rev.result()
+        return df, load_stock(stock, event.sizes), rev.result() if ok else None
+
+
+def warm_load(backend, snapshot_path, event=EVENT, view=EVERYONE):
+    """load_all, unless there is a snapshot for this storage and view: then that, and the
+    flusher's first round (it pulls right away) merges what changed since its revision."""
+    return snapshot.load(snapshot_path, event.storage, view) or load_all(backend, event)
+
+
+def sheets_backend(event=EVENT):
+    import streamlit as st
+    from streamlit_gsheets import GSheetsConnection
+    name = event.storage.partition(":")[2] if event.storage.startswith("gsheets:") else "gsheets"
+    return GSheetsBackend(st.connection(name, type=GSheetsConnection), event.worksheet, event.stock_sheet)
+
+def make_backend(event=EVENT):
+    if event.storage.startswith("sqlite:"): return SQLiteBackend(event.storage[len("sqlite:"):] or "roster.db")
+    return sheets_backend(event)
+
+
+class SheetRows:
+    """One event's stores in this process: the next free sheet row (every store's appends
+    take rows from here, so two partitions never write the same row), the tickets they
+    issued (so two partitions never issue the same one) and which views are open, so a
+    ticket outside a device's partition is found without reading the backend."""
+
+    def __init__(self, event, backend):
+        self.event, self.backend = event, backend
+        self.lock, self.end = threading.Lock(), 0
+        self.stores = {}  # view -> RosterStore
+        self.claimed = set()  # cleaned tickets added here; the other stores only see them after a pull
+        self.owners = {}      # cleaned ticket -> view, for tickets locate() had to read the backend for
+
+    def claim(self, tickets):
+        """Reserve cleaned `tickets` for one of the event's stores. False, reserving none, if any was claimed already."""
+        with self.lock:
+            if not self.claimed.isdisjoint(tickets): return False
+            self.claimed.update(tickets)
+            return True
+
+    def seen(self, end):
+        with self.lock: self.end = max(self.end, end)
+
+    def take(self, n, floor=0):
+        with self.lock:
+            start = self.end = max(self.end, floor)
+            self.end += n
+            return start
+
+    def locate(self, ticket, skip=None):
+        """The view that owns `ticket` (its partition, else EVERYONE), from an open store that has
+        the row, else from the backend (a full read on Sheets, so the answer is kept). None if nobody has it."""
+        for view, store in list(self.stores.items()):
+            hits = store.index.ticket(ticket) if view != skip else ()
+            if hits:
+                with store.lock: return self.event.owner(store.df.loc[sorted(hits)])[0]
+        key = _clean(ticket)
+        if key in self.owners: return self.owners[key]
+        t = str(ticket).strip()
+        df = typed(self.backend.find('Ticket_Number', t), self.event)
+        df = df[(df['Ticket_Number'].str.lower() == t.lower()).fillna(False).to_numpy(dtype=bool)]
+        if not len(df): return None
+        owner = self.owners[key] = self.event.owner(df)[0]
+        return owner
+
+
+def open_store(loaded, journal_path, scope=None, rows=None):
+    """A store over `loaded` (load_all's result), journaled to `journal_path`, with
+    whatever the last run left in that journal replayed on top. With `scope` it keeps
+    that partition only; `rows` is the event's SheetRows."""
+    store = RosterStore(scope, rows)
+    df, stock, store.remote_rev = loaded
+    store.load(df, stock)
+    store.journal = Journal(journal_path)
+    store.ledger = KitLedger(journal_path)
+    if store.loaded: store.replay(store.journal.pending())  # edits that never reached the backend before the last shutdown; else on adopt()
+    if rows: rows.stores[scope.name if scope else EVERYONE] = store
+    return store
+
+def start_flusher(store, backend, metrics, snapshots=None, event=EVENT):
+    def push(force=False):
+        with metrics.span("flush"): sync(store, backend, pull, force)
+        if snapshots: snapshots.maybe_save(store)
+    def pull():
+        # Other servers / people editing the sheet: merged in as they happen, no Refresh needed
+        with metrics.span("pull"): return pull_remote(store, backend, lambda raw: typed(raw, event), lambda: read_stock(backend, event))
+    f = SheetFlusher(push)
+    f.start(); f.wake.set()
+    return f
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+from schema import SIZES, ROLES
+
+# ==================== EVENTS & PARTITIONS ====================
+# What used to be hard-coded (date, pass text, fleet, sizes, roles, the
+# "Data" worksheet) is per event. EVENT_CONFIG names a JSON file with a list
+# of events, each with any of DEFAULT's keys; without it there is one event,
+# DEFAULT. Several events run side by side on their own storage / worksheets.
+#
+# An event's roster can be split into partitions, e.g.
+#   "partitions": {"Juniors": {"by": "Class", "values": ["6", "7"]},
+#                  "Seniors": {"by": "Class", "values": ["8", "9", "10"]}}
+# `by` is a roster column that is filled in before the event (Class, Role,
+# Bus_Number, or a column of the sheet's own); not the check-in columns,
+# which are empty for everyone still waiting to get in.
+# A device serving a partition loads, indexes and counts only those rows
+# (RosterStore.scope); EVERYONE is the whole roster. Each event + partition
+# pair has its own journal next to the configured one (Event.journal).
+
+EVERYONE = "Everyone"
+CHECKIN_COLS = ['Entry_Status', 'Entry_Time', 'Entry_Gate']  # set at the gate: no use for choosing who a device serves
+BUS_CAPACITY = 45
+
+DEFAULT = {
+    'key': "willians26", 'title': "Willian's 26",
+    'start': "2026-02-03T07:00:00+06:00",  # countdown target; its date dates bare HH:MM:SS entry times
+    'date_label': "3rd Feb 2026", 'hours': "10:00 AM To 5:00 PM", 'venue': "Willes Little Flower Campus",
+    'return_to': ["Willian's 26 Organizing Committee", "Dhaka, Bangladesh"], 'website': "www.willians26.com",
+    'fleet': {f"Bus {i}": BUS_CAPACITY for i in range(1, 5)},  # bus -> seats
+    'sizes': SIZES, 'roles': ROLES,
+    'storage': None,  # EVENT_STORAGE form (gsheets, gsheets:<connection>, sqlite:<path>); None = EVENT_STORAGE
+    'worksheet': "Data", 'stock_sheet': "Stock",
+    'partitions': {},
+}
+
+
+def _slug(s): return re.sub(r'\W+', '_', str(s)).strip('_').lower()
+
+
+class Scope:
+    """The rows one partition serves: those whose `col` is one of `values`."""
+
+    def __init__(self, name, col, values):
+        self.name, self.col, self.values = name, col, [str(v).strip() for v in values]
+
+    def mask(self, df):
+        if not len(df): return df.index.isin([])
+        if self.col not in df.columns: raise ValueError(f"partition {self.name!r}: the roster has no {self.col!r} column")
+        return df[self.col].isin(self.values).to_numpy(dtype=bool)
+
+
+class Event:
+    def __init__(self, cfg, primary=False):
+        unknown = set(cfg) - set(DEFAULT)
+        if unknown: raise ValueError(f"event {cfg.get('key')!r}: unknown setting(s) {sorted(unknown)}")
+        c = {**DEFAULT, **cfg}
+        self.key, self.title, self.start = str(c['key']), c['title'], c['start']
+        self.day = self.start[:10]
+        self.date_label, self.hours, self.venue = c['date_label'], c['hours'], c['venue']
+        self.return_to, self.website = list(c['return_to']), c['website']
+        self.fleet = {str(b): int(n) for b, n in c['fleet'].items()}
+        self.sizes, self.roles = list(c['sizes']), list(c['roles'])
+        self.storage, self.worksheet, self.stock_sheet = c['storage'], c['worksheet'], c['stock_sheet']
+        self.partitions = {n: Scope(n, p['by'], p['values']) for n, p in c['partitions'].items()}
+        for n, p in self.partitions.items():
+            if p.col in CHECKIN_COLS: raise ValueError(f"event {self.key!r}: partition {n!r} is by {p.col!r}, which stays empty until people check in")
+        if EVERYONE in self.partitions: raise ValueError(f"event {self.key!r}: {EVERYONE!r} is the whole roster, not a partition")
+        self.primary = primary
+
+    @property
+    def views(self): return [EVERYONE, *self.partitions]
+
+    @property
+    def default_size(self): return 'L' if 'L' in self.sizes else self.sizes[len(self.sizes) // 2]
+
+    def scope(self, name):
+        """The Scope for a view name; None for EVERYONE (no filtering)."""
+        return None if name == EVERYONE else self.partitions[name]
+
+    def owner(self, df):
+        """Partition per row of `df` (typed roster rows): the first one that takes it, else EVERYONE."""
+        out = [EVERYONE] * len(df)
+        for name, p in reversed(self.partitions.items()):
+            for j in p.mask(df).nonzero()[0]: out[j] = name
+        return out
+
+    def journal(self, path, view=EVERYONE):
+        """This event's / partition's file next to `path`; the first event's whole roster keeps `path` itself."""
+        tags = ([] if self.primary else [self.key]) + ([] if view == EVERYONE else [view])
+        base, ext = os.path.splitext(path)
+        return base + ''.join('-' + _slug(t) for t in tags) + ext
+
+
+def load(path, storage):
+    """Events by key, in file order (the first is the primary one). `storage` is the default EVENT_STORAGE."""
+    try:
+        with open(path) as f: cfgs = json.load(f)
+    except FileNotFoundError: cfgs = [{}]
+    if isinstance(cfgs, dict): cfgs = cfgs.get('events', [cfgs])
+    out, homes = {}, {}
+    for n, cfg in enumerate(cfgs):
+        ev = Event({'storage': storage, **cfg}, primary=not n)
+        if ev.key in out: raise ValueError(f"{path}: two events with key {ev.key!r}")
+        home = ev.storage if ev.storage.startswith('sqlite:') else (ev.storage, ev.worksheet)  # a database holds one roster
+        if home in homes: raise ValueError(f"{path}: {ev.key!r} and {homes[home]!r} would share a roster ({ev.storage}, {ev.worksheet})")
+        out[ev.key], homes[home] = ev, ev.key
+    return out
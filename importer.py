@@ -0,0 +1,135 @@
+import re
+import numpy as np
+import pandas as pd
+from lookup import _clean, norm_phone
+from schema import REQ_COLS, ROLES, SIZES
+from dupes import find_duplicates, COLS as DUPE_COLS
+
+# ==================== BULK IMPORT ====================
+# Late registrations from a CSV / XLSX: read in chunks, checked column-wise
+# against the roster schema, then added with ONE RosterStore.append (one
+# journal entry, one block range in the next batch_update).
+# Line numbers in errors are the file's own (header = line 1).
+
+CHUNK = 1000
+ALIASES = {'phone': 'Spot Phone', 'mobile': 'Spot Phone', 'ticket': 'Ticket_Number', 'size': 'T_Shirt_Size',
+           't-shirt': 'T_Shirt_Size', 'guardian': 'Guardian Phone', 'bus': 'Bus_Number', 'note': 'Notes'}
+IMPORT_COLS = ['Name', 'Role', 'Spot Phone', 'Guardian Phone', 'Ticket_Number', 'Class', 'Roll', 'T_Shirt_Size', 'Notes']
+
+
+def read_chunks(f, name, size=CHUNK):
+    """Yield raw text frames of `size` rows from an uploaded .csv / .xlsx."""
+    if name.lower().endswith(('.xlsx', '.xlsm')):
+        try: from openpyxl import load_workbook
+        except ImportError: raise ImportError("Reading .xlsx needs openpyxl (pip install openpyxl), or upload a .csv")
+        rows = load_workbook(f, read_only=True, data_only=True).active.iter_rows(values_only=True)
+        head = ['' if h is None else str(h) for h in next(rows, ())]
+        buf = []
+        for r in rows:
+            buf.append(['' if v is None else str(v) for v in r])
+            if len(buf) == size: yield pd.DataFrame(buf, columns=head); buf = []
+        if buf: yield pd.DataFrame(buf, columns=head)
+    else: yield from pd.read_csv(f, dtype=str, keep_default_na=False, chunksize=size)
+
+
+def _columns(cols):
+    # Sheet names as-is, a few friendly aliases, case and spacing ignored
+    known = {c.lower().replace('_', ' '): c for c in REQ_COLS}
+    out = {}
+    for c in cols:
+        k = str(c).strip().lower().replace('_', ' ')
+        out[c] = known.get(k) or ALIASES.get(k.split()[0] if k else k)
+    return out
+
+
+def check_chunk(raw, first_line, taken, seen, roles=ROLES, sizes=SIZES, default_size='L'):
+    """Validate one chunk. `taken` = tickets already in the roster, `seen` = tickets earlier in
+    this file (updated); roles / sizes are the event's. Returns (clean rows as dicts, errors as (line, column, problem, value))."""
+    ren = {c: m for c, m in _columns(raw.columns).items() if m in IMPORT_COLS}
+    df = raw[list(ren)].rename(columns=ren)
+    df = df.loc[:, ~df.columns.duplicated()].reindex(columns=IMPORT_COLS)
+    df = df.apply(lambda s: s.astype('string').str.strip().replace('', pd.NA))
+    df = df[df.notna().any(axis=1)]  # blank lines
+    lines = pd.Series(np.arange(first_line, first_line + len(raw)), index=raw.index).loc[df.index]
+    bad, errors = pd.Series(False, index=df.index), []
+
+    def fail(mask, col, problem):
+        nonlocal bad
+        mask = mask.fillna(False).astype(bool)
+        for i in df.index[mask]: errors.append((int(lines[i]), col, problem, '' if pd.isna(df.at[i, col]) else str(df.at[i, col])))
+        bad |= mask
+
+    fail(df['Name'].isna(), 'Name', "missing")
+    role = df['Role'].str.lower().map({r.lower(): r for r in roles})
+    fail(df['Role'].isna(), 'Role', "missing")
+    fail(df['Role'].notna() & role.isna(), 'Role', "unknown role (" + ", ".join(roles) + ")")
+    df['Role'] = role
+    for col in ['Spot Phone', 'Guardian Phone']:
+        n = df[col].map(norm_phone, na_action='ignore').str.len()
+        fail(df[col].notna() & ~n.between(7, 15), col, "not a phone number")
+    fail(df['Spot Phone'].isna(), 'Spot Phone', "missing")
+    size = df['T_Shirt_Size'].str.upper().map({s.upper(): s for s in sizes})
+    fail(df['T_Shirt_Size'].notna() & size.isna(), 'T_Shirt_Size', "size must be one of " + "/".join(sizes))
+    df['T_Shirt_Size'] = size.fillna(default_size)  # the Add form's default
+    fail((df['Role'] == 'Student') & df['Class'].isna(), 'Class', "students need a class")
+    fail(df['Class'].notna() & ~df['Class'].str.fullmatch(r'[\w\- ]{1,20}'), 'Class', "not a class")
+    fail(df['Roll'].notna() & ~df['Roll'].str.fullmatch(r'\d{1,6}'), 'Roll', "not a roll number")
+
+    tk = df['Ticket_Number'].map(_clean, na_action='ignore')
+    dup = tk.notna() & (tk.isin(taken) | tk.isin(seen) | tk.duplicated(keep='first'))
+    fail(dup, 'Ticket_Number', "ticket already used")
+    seen.update(tk[tk.notna() & ~bad])
+
+    ok = df[~bad].astype(object).where(df[~bad].notna(), None)
+    rows = [{k: v for k, v in r.items() if v is not None} for r in ok.to_dict('records')]
+    return rows, errors
+
+
+def check_file(f, name, taken, **event):
+    """Whole upload -> (clean rows, errors DataFrame, rows read). `event`: check_chunk's roles / sizes / default_size."""
+    rows, errors, seen, read, line = [], [], set(), 0, 2
+    for raw in read_chunks(f, name):
+        r, e = check_chunk(raw, line, taken, seen, **event)
+        rows += r; errors += e; read += len(raw); line += len(raw)
+    return rows, pd.DataFrame(errors, columns=['Line', 'Column', 'Problem', 'Value']).sort_values('Line', kind='stable', ignore_index=True), read
+
+
+def possible_duplicates(df, rows):
+    """Checked rows that look like someone already in the roster (or like each other)."""
+    if not rows: return find_duplicates(df.iloc[:0])
+    start = int(df.index.max()) + 1 if len(df) else 0
+    new = pd.DataFrame(rows, index=range(start, start + len(rows))).reindex(columns=DUPE_COLS)
+    both = pd.concat([df[DUPE_COLS].astype(object), new.astype(object)])
+    return find_duplicates(both, only=set(new.index))
+
+
+def next_tickets(taken, n, prefix):
+    """`n` ticket IDs PREFIX-00001... past the highest one in use (`taken` = cleaned tickets)."""
+    pat = re.compile(rf"{re.escape(prefix.lower())}-(\d+)")
+    top = max((int(m[1]) for t in taken if (m := pat.fullmatch(t))), default=0)
+    return [f"{prefix}-{k:05d}" for k in range(top + 1, top + n + 1)]
+
+
+def issue(store, rows, prefix):
+    """Give `rows` without a ticket PREFIX-n ones, after checking the others are free, event-wide
+    (RosterStore.tickets). Call under the store lock and append them right after."""
+    for _ in range(3):
+        taken = store.tickets()
+        mine = [_clean(r['Ticket_Number']) for r in rows if 'Ticket_Number' in r]
+        if not taken.isdisjoint(mine): raise ValueError("Some tickets were taken since this file was checked, check it again")
+        need = [r for r in rows if 'Ticket_Number' not in r]
+        new = next_tickets(taken, len(need), prefix)
+        # Another partition's store may be issuing from the same numbers right now: first claim wins, the other goes again
+        if store.rows is None or store.rows.claim(mine + [_clean(t) for t in new]): break
+    else: raise ValueError("Tickets are being issued on another device right now, try again")
+    for r, t in zip(need, new): r['Ticket_Number'] = t
+
+
+def commit(store, rows, prefix="IMP"):
+    """Add validated rows in one append; tickets are checked and issued under the store lock."""
+    if not rows: return 0
+    rows = [{'Bus_Number': 'Unassigned', 'Notes': 'Import', **r} for r in rows]
+    with store.lock:
+        issue(store, rows, prefix)
+        store.append(rows)
+    return len(rows)
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+from schema import SIZES, TZ
+from stats import STAT_COLS, stat_tuples
+
+# ==================== T-SHIRT INVENTORY ====================
+# Remaining stock is derived, never stored: allocation (the Stock sheet)
+# minus shirts collected per size (RosterStats.kit, patched on every edit).
+# So a handout is a single roster write and every device sees the same number.
+#
+# KitLedger is the audit trail: one append-only row per collect (+1) /
+# return (-1), with a snapshot of the collected counts every SNAP_EVERY
+# events so the history can be checked without replaying all of it.
+
+SNAP_EVERY = 100
+
+
+def _v(v): return None if pd.isna(v) else str(v)
+
+def remaining(allocation, collected):
+    # Sizes in the allocation count too (an event can have its own, see events.py)
+    return {s: int(allocation.get(s, 0)) - collected[s] for s in dict.fromkeys([*SIZES, *allocation])}
+
+
+_SIZE, _KIT = 1 + STAT_COLS.index('T_Shirt_Size'), 1 + STAT_COLS.index('T_Shirt_Collected')
+
+def kit_events(before, after):
+    """Collect/return events between two states of the same rows (frames or stat tuples, see stats.py)."""
+    out = []
+    for b, a in zip(stat_tuples(before), stat_tuples(after)):
+        i, s0, k0, s1, k1 = a[0], b[_SIZE], b[_KIT], a[_SIZE], a[_KIT]
+        if k0 == k1 and (not k1 or s0 == s1): continue
+        if k0: out.append((int(i), s0, -1))  # returned (or swapped for another size)
+        if k1: out.append((int(i), s1, 1))
+    return out
+
+
+class KitLedger:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kit_ledger (seq INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, row INTEGER, ticket TEXT, size TEXT, delta INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kit_snapshots (seq INTEGER PRIMARY KEY, ts REAL, collected TEXT)")
+
+    def record(self, events, tickets, collected):
+        """events: [(row label, size, ±1)]; tickets: row label -> ticket; collected: counts after the events."""
+        if not events: return
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT INTO kit_ledger (ts, row, ticket, size, delta) VALUES (?, ?, ?, ?, ?)",
+                                [(now, i, _v(tickets.get(i)), _v(s), d) for i, s, d in events])
+            last = self.db.execute("SELECT MAX(seq) FROM kit_ledger").fetchone()[0]
+            if last // SNAP_EVERY != (last - len(events)) // SNAP_EVERY:
+                self.db.execute("INSERT OR REPLACE INTO kit_snapshots VALUES (?, ?, ?)", (last, now, json.dumps({s: collected[s] for s in dict.fromkeys([*SIZES, *collected])})))
+
+    def recent(self, n=50):
+        with self.lock:
+            df = pd.read_sql_query("SELECT seq, ts, ticket, size, delta FROM kit_ledger ORDER BY seq DESC LIMIT ?", self.db, params=(n,))
+        df['ts'] = pd.to_datetime(df['ts'], unit='s', utc=True).dt.tz_convert(TZ).dt.strftime('%H:%M:%S')
+        df['event'] = df.pop('delta').map({1: 'collect', -1: 'return'})
+        return df
+
+    def last_snapshot(self):
+        with self.lock: r = self.db.execute("SELECT seq, ts, collected FROM kit_snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+        return (r[0], r[1], json.loads(r[2])) if r else None
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+# ==================== WRITE-AHEAD JOURNAL ====================
+# Every roster/stock mutation is appended here (local SQLite) before the UI
+# says "Updated!". A background SheetFlusher pushes the pending changes to
+# the storage backend (Google Sheets or local SQLite, see storage.py) in
+# batches and deletes the journal rows once the backend has them. Whatever is left in the journal after a crash is replayed on startup.
+#
+# Ops are absolute ("set these cells to X", "stock is now Y"), so replaying
+# one that already reached the sheet is harmless.
+#
+# The other direction: each flush round first asks the backend for its
+# revision (a metadata call) and only reads anything when it moved; what was
+# read is merged into the store (RosterStore.merge) rather than reloaded.
+
+PULL_EVERY = 5.0  # seconds between revision checks while we have nothing to send
+
+class Journal:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS ops (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, payload TEXT, ts REAL)")
+
+    def append(self, kind, payload):
+        with self.lock:
+            cur = self.db.execute("INSERT INTO ops (kind, payload, ts) VALUES (?, ?, ?)", (kind, json.dumps(payload, default=str), time.time()))
+            return cur.lastrowid
+
+    def last_seq(self):
+        with self.lock: return self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM ops").fetchone()[0]
+
+    def pending(self):
+        with self.lock: rows = self.db.execute("SELECT kind, payload FROM ops ORDER BY seq").fetchall()
+        return [(k, json.loads(p)) for k, p in rows]
+
+    def pending_count(self):
+        with self.lock: return self.db.execute("SELECT COUNT(*) FROM ops").fetchone()[0]
+
+    def done(self, upto, kinds):
+        # The sheet now has everything up to `upto` for these kinds
+        q = f"DELETE FROM ops WHERE seq <= ? AND kind IN ({','.join('?' * len(kinds))})"
+        with self.lock: self.db.execute(q, (upto, *kinds))
+
+
+def _caught_up(store, wrote):
+    # `wrote`: (revision before, after) of our own write, if the backend can tell. Only when the
+    # store was at `before` did nobody else write in between, so it is at `after` now; otherwise
+    # the next pull fetches from where it was, whatever landed around our write included
+    if wrote and wrote[0] == store.remote_rev: store.remote_rev = wrote[1]
+
+
+def push_pending(store, backend):
+    """Send everything the store has not synced yet to `backend` (see storage.py):
+    one upsert for the roster, plus the stock if it changed. Raises on failure
+    after putting the changes back so the next attempt retries them.
+    Returns whether anything was written."""
+    j = store.journal
+    with store.lock:
+        if not store.loaded: return False  # never read: nothing to place writes against (pull_remote adopts the roster first)
+        mark = j.last_seq() if j else 0
+        cols, had = list(store.df.columns), store.changes.sheet_cols
+        if store.scope is not None and had is not None and cols[:len(had)] == had and len(cols) > len(had):
+            # A partition only holds some rows, so it can't rewrite the sheet; new trailing columns it can add
+            backend.add_columns(cols, cols[len(had):])
+            store.changes.sheet_cols = cols
+        if store.changes.needs_full_write(store.df):
+            # Schema change: full rewrite under the lock. Labels stay as they are (rows we skip are
+            # written blank), so journal ops replayed after a crash here still land on their rows
+            if store.scope is not None: raise RuntimeError(f"{store.scope.name} holds part of the roster and can't rewrite the sheet")
+            df = store.df
+            _caught_up(store, backend.write_roster(df))
+            store.changes.clear(df); store.seen_raw = None
+            snap, payload = None, None
+        else:
+            snap = store.changes.take()
+            payload = backend.prepare(store.df, snap) if snap else None
+        stock = dict(store.stock) if store.stock_dirty else None
+        store.stock_dirty = False
+    try:
+        if payload is not None:
+            wrote = backend.upsert(payload)
+            with store.lock: _caught_up(store, wrote)
+    except Exception:
+        with store.lock:
+            store.changes.restore(snap)
+            if stock is not None: store.stock_dirty = True
+        raise
+    if j: j.done(mark, ('edit', 'append', 'remove'))
+    if stock is not None:
+        try:
+            wrote = backend.write_stock(stock)
+            with store.lock: _caught_up(store, wrote)
+        except Exception:
+            with store.lock: store.stock_dirty = True
+            raise
+        if j: j.done(mark, ('stock',))
+    return bool(snap) or snap is None or stock is not None
+
+
+def _changed_rows(old, new):
+    # Labels of `new` (a whole raw read) whose text differs from `old` (the previous one), rows past
+    # its end included. None when columns or rows moved: then only a full merge can tell
+    if list(old.columns) != list(new.columns) or len(new) < len(old) or not new.index[:len(old)].equals(old.index): return None
+    a, b = old.to_numpy(dtype=object), new.iloc[:len(old)].to_numpy(dtype=object)
+    same = ((a == b) | (pd.isna(a) & pd.isna(b))).all(axis=1)
+    return old.index[~same].append(new.index[len(old):])
+
+
+def pull_remote(store, backend, typed, stock=None):
+    """Bring the store up to the backend's current revision: nothing is read when the
+    revision hasn't moved; otherwise only the changed rows (SQLite) or the roster
+    (Sheets) is fetched and merged. `typed` turns raw rows into roster rows, `stock()`
+    re-reads the allocation. Returns the rows merged, or None when our own rewrite
+    (schema change, removed rows) has to go out first."""
+    rev = backend.revision()
+    store.pulled_at = time.time()
+    if rev == store.remote_rev: return 0
+    raw, full = backend.read_changes(store.remote_rev)
+    while True:
+        # A whole read (Sheets) is first compared as text with the last one, outside the lock: only
+        # the rows that differ (our own writes since, anyone else's) are typed and merged
+        seen = store.seen_raw
+        part = _changed_rows(seen, raw) if full and seen is not None else None
+        remote = typed(raw if part is None else raw.loc[part]) if part is None or len(part) else None
+        alloc = stock() if stock else None
+        with store.lock:
+            if not store.loaded:
+                store.adopt(remote)
+                if alloc is not None and not store.stock_dirty: store.stock = alloc
+                store.remote_rev, store.seen_raw = rev, raw if full else None
+                return len(remote)
+            if store.changes.needs_full_write(store.df) and len(store.df): return None  # our rewrite goes out first
+            if part is not None:
+                hit = (store.merge(remote, False) if remote is not None else set()) if store.seen_raw is seen else None
+                if hit is None:
+                    store.seen_raw = None; continue  # rows moved, or the store was reloaded: merge the whole read
+            else:
+                hit = store.merge(remote, full)
+                if hit is None and full:
+                    # Rows moved (deleted / inserted / re-ticketed on the backend): start over from theirs,
+                    # with our unsynced edits moved to the rows that now carry their tickets
+                    store.rebase(remote); hit = remote.index
+            if hit is not None:
+                if alloc is not None and not store.stock_dirty: store.stock = alloc
+                store.remote_rev, store.seen_raw = rev, raw if full else None
+                return len(hit)
+        raw, full = backend.read_roster(), True
+
+
+def sync(store, backend, pull=None, force=False):
+    """One flusher round. With `pull` (pull_remote bound to its readers), other writers'
+    changes are merged before ours are pushed. When the backend can tell that nothing
+    else landed around our own write, the next round doesn't fetch it back (_caught_up)."""
+    due = force or store.changes or store.stock_dirty or not store.loaded or time.time() - store.pulled_at >= PULL_EVERY
+    if pull and due: pull()
+    push_pending(store, backend)
+
+
+class SheetFlusher(threading.Thread):
+    """Background worker: waits for a wake-up (or `interval`), lets edits pile up
+    for `coalesce` seconds and pushes them in one go. Backs off exponentially
+    while the sheet is unreachable."""
+
+    def __init__(self, push, interval=2.0, coalesce=0.3, max_backoff=60.0):
+        super().__init__(daemon=True, name="sheet-flusher")
+        self.push, self.interval, self.coalesce, self.max_backoff = push, interval, coalesce, max_backoff
+        self.wake = threading.Event()
+        self.flush_lock = threading.Lock()  # one push at a time (worker or flush_now)
+        self.last_error, self.last_ok, self.failures = None, None, 0
+
+    def run(self):
+        delay = self.interval
+        while True:
+            if self.wake.wait(delay): time.sleep(self.coalesce)
+            self.wake.clear()
+            try:
+                self.flush_now()
+                delay = self.interval
+            except Exception:
+                delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+
+    def flush_now(self, **kw):
+        with self.flush_lock:
+            try:
+                self.push(**kw)
+                self.last_error, self.last_ok, self.failures = None, time.time(), 0
+            except Exception as e:
+                self.last_error = e; self.failures += 1
+                raise
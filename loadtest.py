@@ -0,0 +1,216 @@
+"""End-to-end load test: many simulated gate sessions running the real app1.py at once.
+
+    python loadtest.py                                   # 15 sessions, 60 s, 2k rows
+    python loadtest.py --sessions 30 --latency 0.3 --fail-rate 0.05 --out loadtest_output.jsonl
+
+Every session is a Streamlit AppTest of app1.py in its own thread, so they
+share one server's cached store, journal and flusher, the way browser tabs
+do. Each logs in, then loops over a mix of searches, scans and Save Changes
+against bench.py's fake Sheets (with latency and injected failures), while
+another thread edits the fake sheet directly like a second device would.
+
+At the end the flusher is left to drain and the fake sheet is checked
+against what the sessions were told: every acknowledged check-in / kit must
+be on the sheet, no ticket may be admitted twice, and every direct sheet
+edit must survive. One JSON object is printed (and appended to --out).
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import Counter, defaultdict
+from bench import fake_connection
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app1.py")
+MIX = {'search': 5, 'scan': 3, 'save': 2}
+
+
+def rss_mb():
+    # Resident memory now (Linux), else the peak so far
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError: return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def pct(xs, p): return round(statistics.quantiles(xs, n=100, method='inclusive')[p - 1] * 1000, 1) if len(xs) > 1 else (round(xs[0] * 1000, 1) if xs else None)
+
+
+def share_runtime():
+    # AppTest is built for one run at a time. Two things it sets up per run are shared by a real
+    # server: the Runtime (installed and cleared around each run; with sessions in threads one run
+    # would clear it under another, so keep answering with the last one) and the script cache
+    # (compiling app1.py in several threads at once trips CPython 3.11's parser).
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+    held = []
+    def instance(cls):
+        if cls._instance is not None: held[:] = [cls._instance]
+        elif not held: raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or held[0]
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(held))
+
+
+# ==================== ONE SIMULATED DEVICE ====================
+class Session:
+    def __init__(self, n, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.n, self.at = n, AppTest.from_file(APP, default_timeout=timeout)
+        self.at.run()
+        self.at.text_input[0].input('admin'); self.at.text_input[1].input('1234'); self.at.button[0].click(); self.at.run()
+        self.at.sidebar.text_input(key="gate").set_value(f"Gate {n}"); self.at.run()
+        self.page = None
+
+    def errors(self): return [e.value for e in self.at.exception]
+
+    def goto(self, page):
+        if self.page != page: self.at.sidebar.radio[0].set_value(page); self.at.run(); self.page = page
+
+    def search(self, q):
+        self.goto("🔍 Search & Entry")
+        next(t for t in self.at.text_input if t.label.startswith("🔎")).input(q); self.at.run()
+
+    def scan(self, ticket):
+        """True = admitted by this scan."""
+        self.goto("⚡ Scan Mode")
+        self.at.text_input(key="scan_code").input(ticket); self.at.run()
+        return any(s.value.lstrip("✅ ").startswith(f"{ticket}:") for s in self.at.success[:1])  # AppTest may lift the ✅ into the icon
+
+    def save(self, ticket, think):
+        """Search & Entry: open the card, think, tick Entry + Kit, save. True = saved."""
+        self.search(ticket)
+        time.sleep(think)  # the card is on screen while others keep scanning
+        for t in self.at.toggle:
+            if t.label in ("✅ Entry", "👕 Kit"): t.set_value(True)
+        next(b for b in self.at.button if b.label == "💾 Save Changes").click(); self.at.run()
+        return not self.at.error and not self.errors()
+
+
+# ==================== THE RUN ====================
+def run(a):
+    warnings.filterwarnings('ignore'); logging.disable(logging.WARNING)
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ['EVENT_JOURNAL'] = os.path.join(tmp, "journal.db")  # before the first rerun reads it
+    os.environ['EVENT_STORAGE'] = 'gsheets'
+    conn = fake_connection(a.rows, a.latency, a.seed)
+    import streamlit as st
+    st.connection = lambda *x, **k: conn  # engine.sheets_backend() gets the fake
+    share_runtime()
+
+    base = rss_mb()
+    first = Session(0, a.timeout)  # loads the roster, starts the flusher
+    warm = rss_mb()
+    sessions = [first] + [Session(i, a.timeout) for i in range(1, a.sessions)]
+    per_session = (rss_mb() - warm) / max(1, a.sessions - 1)
+    conn.fail_rate = a.fail_rate
+
+    cols, grid = conn.sheets['Data']
+    tickets = [str(t) for t in grid[:, cols.index('Ticket_Number')]]
+    hot = tickets[:a.hot]  # every session keeps hitting these: collisions on purpose
+    lat, errors = defaultdict(list), []
+    admitted, saved = Counter(), set()
+    notes = {}  # sheet row -> last value the "other device" wrote
+    lock, stop = threading.Lock(), threading.Event()
+
+    def device(s, rng):
+        ops, weights = zip(*MIX.items())
+        while not stop.is_set():
+            op = rng.choices(ops, weights)[0]
+            t = rng.choice(hot) if rng.random() < a.hot_share else rng.choice(tickets)
+            t0 = time.perf_counter()
+            try:
+                if op == 'search': s.search(rng.choice([t, t[-4:], f"Attendee {t[-3:]}"]))
+                elif op == 'scan':
+                    if s.scan(t):
+                        with lock: admitted[t] += 1
+                else:
+                    if s.save(t, a.think):
+                        with lock: saved.add(t)
+                exc = s.errors()
+            except Exception as e: exc = [repr(e)]
+            with lock:
+                if exc: errors.extend(exc)
+                else: lat[op].append(time.perf_counter() - t0 - (a.think if op == 'save' else 0))
+            if exc: s.page = None; time.sleep(0.5)  # start over from the menu, like a person would
+
+    def other_device(rng):
+        while not stop.wait(a.edit_every):
+            row, v = rng.randrange(len(tickets)), f"note {rng.randrange(10**6)}"
+            conn.set_cell('Data', row, 'Notes', v); notes[row] = v
+
+    threads = [threading.Thread(target=device, args=(s, random.Random(a.seed + i)), daemon=True) for i, s in enumerate(sessions)]
+    threads.append(threading.Thread(target=other_device, args=(random.Random(a.seed - 1),), daemon=True))
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    time.sleep(a.duration); stop.set()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0
+    peak = rss_mb()
+
+    # Drain: no more failures, wait for the journal to empty and one more pull round
+    conn.fail_rate = 0.0
+    db = sqlite3.connect(os.environ['EVENT_JOURNAL'])
+    deadline = time.time() + a.drain
+    while time.time() < deadline and db.execute("SELECT COUNT(*) FROM ops").fetchone()[0]: time.sleep(0.5)
+    pending = db.execute("SELECT COUNT(*) FROM ops").fetchone()[0]
+    time.sleep(a.settle)
+
+    cols, grid = conn.sheets['Data']
+    row_of = {str(t): i for i, t in enumerate(grid[:, cols.index('Ticket_Number')])}
+    cell = lambda t, c: grid[row_of[t], cols.index(c)]
+    lost_entries = sorted(t for t in set(admitted) | saved if cell(t, 'Entry_Status') != 'Done')
+    lost_kits = sorted(t for t in saved if cell(t, 'T_Shirt_Collected') != 'Yes')
+    lost_notes = sorted(r for r, v in notes.items() if grid[r, cols.index('Notes')] != v)
+    done = sum(len(v) for v in lat.values())
+    return {
+        'sessions': a.sessions, 'rows': a.rows, 'duration_s': round(wall, 1), 'latency_s': a.latency, 'fail_rate': a.fail_rate,
+        'actions': done, 'actions_per_s': round(done / wall, 2), 'failed_actions': len(errors),
+        'latency_ms': {op: {'n': len(v), 'p50': pct(v, 50), 'p95': pct(v, 95), 'p99': pct(v, 99), 'max': round(max(v) * 1000, 1)} for op, v in lat.items() if v},
+        'rss_mb': {'before': round(base, 1), 'first_session': round(warm, 1), 'per_extra_session': round(per_session, 2), 'peak': round(peak, 1)},
+        'sheets_calls': dict(conn.calls), 'journal_pending_after_drain': pending,
+        'admitted': sum(admitted.values()), 'double_admissions': sorted(t for t, n in admitted.items() if n > 1),
+        'saves': len(saved), 'lost_entries': lost_entries, 'lost_kits': lost_kits,
+        'sheet_edits': len(notes), 'lost_sheet_edits': lost_notes,
+        'exceptions': dict(Counter(e[:120] for e in errors).most_common(5)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sessions', type=int, default=15)
+    ap.add_argument('--duration', type=float, default=60, help="seconds of load")
+    ap.add_argument('--rows', type=int, default=2000)
+    ap.add_argument('--latency', type=float, default=0.2, help="seconds per fake Sheets call")
+    ap.add_argument('--fail-rate', type=float, default=0.05, help="share of fake Sheets calls that fail")
+    ap.add_argument('--hot', type=int, default=20, help="tickets every session keeps coming back to")
+    ap.add_argument('--hot-share', type=float, default=0.3, help="share of actions on the hot tickets")
+    ap.add_argument('--think', type=float, default=0.5, help="seconds a card stays open before Save")
+    ap.add_argument('--edit-every', type=float, default=1.0, help="seconds between direct sheet edits")
+    ap.add_argument('--drain', type=float, default=60, help="max seconds to wait for the journal to empty")
+    ap.add_argument('--settle', type=float, default=6, help="seconds after draining, for a last pull")
+    ap.add_argument('--timeout', type=float, default=60, help="AppTest timeout per rerun")
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', help="append the result here as a JSON line")
+    a = ap.parse_args()
+    r = run(a)
+    line = json.dumps(r)
+    print(line, flush=True)
+    if a.out:
+        with open(a.out, 'a') as f: f.write(line + '\n')
+    sys.exit(1 if r['lost_entries'] or r['lost_kits'] or r['lost_sheet_edits'] or r['double_admissions'] else 0)  # usable as a gate in CI
+
+
+if __name__ == '__main__':
+    main()
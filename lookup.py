@@ -0,0 +1,120 @@
+import re
+import numpy as np
+from bisect import bisect_left, insort
+
+# ==================== SEARCH INDEX ====================
+# Built once per roster load and patched in place on every edit, so a gate
+# lookup never scans the whole roster:
+#   - exact hash maps for ticket and phone  -> O(1)
+#   - trigram postings over name/ticket/phone -> substring search on a few candidates
+#   - sorted name tokens                      -> prefix search for 1-2 letter queries
+
+INDEX_COLS = {'Name', 'Ticket_Number', 'Spot Phone'}
+
+def _clean(s):
+    s = ' '.join(str(s).lower().split())
+    return '' if s in ('n/a', 'nan', 'none', '<na>') else s
+
+def norm_phone(s):
+    # 017..., 17..., +88017... and 8801... all map to the same key
+    d = re.sub(r'\D', '', str(s))
+    if d.startswith('880'): d = d[3:]
+    return d.lstrip('0')
+
+def _grams(s): return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def _bulk_grams(labels, fields):
+    """_grams of every row's fields at once: trigram -> set of row labels.
+    Each string becomes a row of code points; three adjacent ones pack into one uint64."""
+    codes, rows = [], []
+    for vals in fields:
+        for j in range(0, len(vals), 8192):  # in chunks: one long name pads only its own chunk
+            a = np.array(vals[j:j + 8192], dtype=str)
+            w = a.dtype.itemsize // 4
+            if w < 3: continue
+            c = a.view(np.uint32).reshape(len(a), w).astype(np.uint64)
+            r, k = (c[:, 2:] != 0).nonzero()  # positions with three characters (padding is NUL)
+            codes.append(c[r, k] << 42 | c[r, k + 1] << 21 | c[r, k + 2]); rows.append(labels[j + r])
+    if not codes: return {}
+    codes, rows = np.concatenate(codes), np.concatenate(rows)
+    order = np.argsort(codes); codes, rows = codes[order], rows[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    m = (1 << 21) - 1
+    return {chr(x >> 42) + chr(x >> 21 & m) + chr(x & m): set(rows[a:b].tolist()) for x, a, b in zip(codes[starts].tolist(), starts, np.r_[starts[1:], len(codes)])}
+
+
+class RosterIndex:
+    def __init__(self, df):
+        self.tickets, self.phones = {}, {}  # exact key -> set of row labels
+        self.grams = {}                     # trigram -> set of row labels
+        self.keys = {}                      # row label -> (name, ticket, phone) normalized
+        self.tokens = []                    # sorted (name token, row label)
+        if not len(df): return
+        # Bulk build (every load): normalize each row once, then group; _add / _remove patch single rows after
+        labels = df.index.to_numpy()
+        keys = list(zip(map(_clean, df['Name'].tolist()), map(_clean, df['Ticket_Number'].tolist()), map(norm_phone, df['Spot Phone'].tolist())))
+        self.keys = dict(zip(labels.tolist(), keys))
+        for i, (_, tk, ph) in self.keys.items():
+            if tk: self.tickets.setdefault(tk, set()).add(i)
+            if ph: self.phones.setdefault(ph, set()).add(i)
+        self.grams = _bulk_grams(labels, zip(*keys))
+        self.tokens = sorted((tok, i) for i, (name, _, _) in self.keys.items() for tok in set(name.split()))
+
+    def _add(self, i, name, ticket, phone):
+        name, tk, ph = self.keys[i] = (_clean(name), _clean(ticket), norm_phone(phone))
+        if tk: self.tickets.setdefault(tk, set()).add(i)
+        if ph: self.phones.setdefault(ph, set()).add(i)
+        for g in _grams(name) | _grams(tk) | _grams(ph): self.grams.setdefault(g, set()).add(i)
+        for tok in set(name.split()): insort(self.tokens, (tok, i))
+
+    def _remove(self, i):
+        name, tk, ph = self.keys.pop(i)
+        self.tickets.get(tk, set()).discard(i); self.phones.get(ph, set()).discard(i)
+        for g in _grams(name) | _grams(tk) | _grams(ph): self.grams.get(g, set()).discard(i)
+        for tok in set(name.split()):
+            j = bisect_left(self.tokens, (tok, i))
+            if j < len(self.tokens) and self.tokens[j] == (tok, i): del self.tokens[j]
+
+    def refresh(self, df, labels):
+        # Re-index edited or newly added rows
+        for i in labels:
+            if i in self.keys: self._remove(i)
+            if i in df.index: self._add(i, df.at[i, 'Name'], df.at[i, 'Ticket_Number'], df.at[i, 'Spot Phone'])
+
+    def ticket(self, q):
+        # Exact ticket lookup only (scanner input), no ranking
+        return self.tickets.get(_clean(q), set())
+
+    def _candidates(self, s):
+        posts = sorted((self.grams.get(g, set()) for g in _grams(s)), key=len)
+        if not posts: return set()
+        out = set(posts[0])
+        for p in posts[1:]: out &= p
+        return out
+
+    def search(self, q, limit=20):
+        """Ranked row labels for a ticket / phone / name query (best match first)."""
+        qt = _clean(q)
+        if not qt: return []
+        qp = norm_phone(q) if re.fullmatch(r'[\d\s+\-()]+', q) else ''
+        score = {}
+        def hit(labels, s):
+            for i in labels:
+                if score.get(i, 0) < s: score[i] = s
+        hit(self.tickets.get(qt, ()), 100)
+        if qp: hit(self.phones.get(qp, ()), 95)
+        if len(qt) >= 3:
+            cands = self._candidates(qt) | (self._candidates(qp) if len(qp) >= 3 else set())
+            for i in cands:
+                name, tk, ph = self.keys[i]
+                s = max(90 if name == qt else 0,
+                        70 if name.startswith(qt) or f' {qt}' in name else 0,
+                        60 if qt in tk else 0,
+                        55 if qp and qp in ph else 0,
+                        50 if qt in name else 0)
+                if s: hit([i], s)
+        else:
+            j = bisect_left(self.tokens, (qt,))
+            while j < len(self.tokens) and self.tokens[j][0].startswith(qt):
+                hit([self.tokens[j][1]], 70); j += 1
+        return sorted(score, key=lambda i: (-score[i], self.keys[i][0]))[:limit]
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+import pandas as pd
+
+# ==================== INSTRUMENTATION ====================
+# Cheap in-process timings for the System Health page. A span is a named
+# wall-clock duration kept in a rolling window (p50/p95 come from the last
+# WINDOW samples); calls, payload bytes and errors are plain counters.
+# app1 keeps one server-wide Metrics plus one per browser session.
+
+WINDOW = 500
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(int(p * len(xs)), len(xs) - 1)] if xs else 0.0
+
+def payload_size(x):
+    # Rough bytes on the wire for what we hand to / get from a backend
+    if x is None: return 0
+    if isinstance(x, pd.DataFrame): return int(x.memory_usage(deep=True, index=False).sum())
+    if isinstance(x, (tuple, list)) and any(isinstance(v, pd.DataFrame) for v in x): return sum(map(payload_size, x))
+    try: return len(json.dumps(x, default=str))
+    except (TypeError, ValueError): return 0
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}           # name -> deque of ms
+        self.calls = Counter()    # name -> count (all time)
+        self.errors = Counter()
+        self.bytes = Counter()
+        self.started = time.time()
+
+    def record(self, name, ms, error=False, nbytes=0):
+        with self.lock:
+            self.spans.setdefault(name, deque(maxlen=WINDOW)).append(ms)
+            self.calls[name] += 1
+            if error: self.errors[name] += 1
+            if nbytes: self.bytes[name] += nbytes
+
+    @contextmanager
+    def span(self, name, *also):
+        """Time a block into this registry and any extra ones (e.g. the session's)."""
+        t, err = time.perf_counter(), False
+        try: yield
+        except Exception:
+            err = True; raise
+        finally:
+            ms = (time.perf_counter() - t) * 1000
+            for m in (self, *also):
+                if m is not None: m.record(name, ms, err)
+
+    def add_bytes(self, name, n):
+        with self.lock: self.bytes[name] += n
+
+    def summary(self):
+        with self.lock:
+            rows = [{'span': k, 'calls': self.calls[k], 'errors': self.errors[k], 'bytes': self.bytes[k],
+                     'p50_ms': round(_pct(v, 0.5), 1), 'p95_ms': round(_pct(v, 0.95), 1), 'max_ms': round(max(v), 1)}
+                    for k, v in self.spans.items()]
+        return pd.DataFrame(rows, columns=['span', 'calls', 'errors', 'bytes', 'p50_ms', 'p95_ms', 'max_ms']).sort_values('span', ignore_index=True)
+
+    def text(self, prefix="event"):
+        """Prometheus text format, for a local scraper (or node_exporter's textfile collector)."""
+        out = [f"# TYPE {prefix}_span_ms summary", f"# TYPE {prefix}_calls_total counter",
+               f"# TYPE {prefix}_errors_total counter", f"# TYPE {prefix}_bytes_total counter"]
+        for r in self.summary().itertuples():
+            lbl = f'span="{r.span}"'
+            out += [f'{prefix}_span_ms{{{lbl},quantile="0.5"}} {r.p50_ms}', f'{prefix}_span_ms{{{lbl},quantile="0.95"}} {r.p95_ms}',
+                    f'{prefix}_calls_total{{{lbl}}} {r.calls}', f'{prefix}_errors_total{{{lbl}}} {r.errors}', f'{prefix}_bytes_total{{{lbl}}} {r.bytes}']
+        out.append(f"{prefix}_uptime_seconds {round(time.time() - self.started)}")
+        return '\n'.join(out) + '\n'
+
+    def export_every(self, path, interval=15.0, extra=None):
+        """Rewrite `path` with text() every `interval` seconds from a daemon thread.
+        `extra()` may return more metric lines (gauges the app owns)."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    with open(path + '.tmp', 'w') as f: f.write(self.text() + (extra() if extra else ''))
+                    os.replace(path + '.tmp', path)
+                except Exception: pass
+        threading.Thread(target=loop, daemon=True, name="metrics-export").start()
+
+
+class Timed:
+    """Storage backend wrapper: every I/O call is a span named `<prefix>.<method>`,
+    with its argument / result size counted as payload bytes."""
+    IO = {'read_roster', 'write_roster', 'upsert', 'read_stock', 'write_stock', 'revision', 'read_changes', 'find'}
+
+    def __init__(self, inner, metrics, prefix):
+        self.inner, self.metrics, self.prefix = inner, metrics, prefix
+
+    def __getattr__(self, attr):
+        fn = getattr(self.inner, attr)
+        if attr not in self.IO: return fn
+        name = f"{self.prefix}.{attr}"
+        def call(*a, **kw):
+            with self.metrics.span(name):
+                res = fn(*a, **kw)
+            self.metrics.add_bytes(name, sum(payload_size(x) for x in a) + payload_size(res))
+            return res
+        return call
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from schema import to_display
+
+# ==================== PAGED VIEWS ====================
+# Tables are filtered, sorted and sliced here, on the server; the browser
+# only ever gets one page of display text for the columns it shows.
+# app1 caches the pages per data version.
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _match(df, cols, q):
+    # Case-insensitive substring over the text / category columns
+    q, m = q.lower(), np.zeros(len(df), dtype=bool)
+    for c in cols:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            hit = np.flatnonzero(s.cat.categories.astype(str).str.lower().str.contains(q, regex=False))
+            m |= np.isin(s.cat.codes.to_numpy(), hit)
+        elif pd.api.types.is_string_dtype(s):
+            m |= s.str.lower().str.contains(q, regex=False).fillna(False).to_numpy(dtype=bool)
+    return df[m]
+
+
+def page_of(df, cols, q='', sort=None, asc=True, page=1, size=50):
+    """One page of `df[cols]` as display text.
+    Returns (page frame, matching rows, pages, the page actually shown)."""
+    if q: df = _match(df, cols, q)
+    if sort: df = df.sort_values(sort, ascending=asc, na_position='last', kind='stable')
+    n = len(df)
+    pages = max(1, -(-n // size))
+    page = min(max(page, 1), pages)
+    out = to_display(df.iloc[(page - 1) * size:page * size][cols])
+    return out, n, pages, page
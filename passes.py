@@ -0,0 +1,140 @@
+import hashlib
+import html
+import io
+import sqlite3
+import threading
+import time
+import zipfile
+
+# ==================== EVENT PASSES ====================
+# One pass = one card (front + fold-over back). The style block is written
+# once per file, the card template is a plain str.format compiled at import,
+# and passes are laid out PER_PAGE to a landscape A4 sheet.
+#
+# A card is one format call (a few microseconds), so a whole school renders
+# in well under a second in-process. PassCache keeps each rendered card with
+# a digest of its fields, so a regeneration only renders the rows that
+# changed, and PrintLog remembers which digest was last printed.
+# The event's own lines (title, date, venue, ...) come from events.Event,
+# escaped once per event by event_text().
+
+FIELDS = ['Name', 'Ticket_Number', 'Role', 'Class', 'Bus_Number', 'Spot Phone']
+PER_PAGE = 3
+
+CSS = """
+body { font-family: Arial, sans-serif; margin: 0; background-color: #f0f0f0; }
+.card-container { width: 320px; height: 640px; background: white; border: 1px solid #ccc; box-shadow: 0 0 10px rgba(0,0,0,0.1); }
+.front, .back { height: 320px; padding: 20px; box-sizing: border-box; }
+.back { border-top: 2px dashed #888; transform: rotate(180deg); display: flex; flex-direction: column; justify-content: flex-end; align-items: center; }
+.header { text-align: center; font-weight: bold; font-size: 16px; border-bottom: 2px solid #333; padding-bottom: 10px; margin-bottom: 15px; }
+.info-section { display: flex; gap: 15px; margin-bottom: 20px; }
+.photo-box { width: 80px; height: 95px; border: 1px solid #aaa; background-color: #eee; display: flex; align-items: center; justify-content: center; font-size: 12px; color: #666; }
+.details table { font-size: 13px; font-weight: bold; color: #333; width: 100%; }
+.details td { padding: 3px 0; }
+.details td:first-child { width: 50px; color: #666; font-weight: normal; }
+.footer-info { font-size: 12px; color: #444; margin-top: 10px; }
+.back-text { font-size: 11px; text-align: center; color: #333; line-height: 1.5; padding-bottom: 10px; }
+.single { display: flex; justify-content: center; padding-top: 20px; }
+.sheet { display: flex; gap: 16px; justify-content: center; page-break-after: always; padding-top: 10px; }
+@page { size: A4 landscape; margin: 8mm; }
+@media print { body { background: white; } .card-container { box-shadow: none; } }
+"""
+
+CARD = """<div class="card-container">
+<div class="front">
+<div class="header">{title} Event Pass</div>
+<div class="info-section">
+<div class="photo-box">Photo</div>
+<div class="details"><table cellspacing="0" cellpadding="0">
+<tr><td>Name</td><td>: {Name}</td></tr>
+<tr><td>Ticket</td><td>: {Ticket_Number}</td></tr>
+<tr><td>Role</td><td>: {Role}</td></tr>
+<tr><td>Class</td><td>: {Class}</td></tr>
+<tr><td>Bus</td><td>: {Bus_Number}</td></tr>
+</table></div>
+</div>
+<div class="footer-info"><b>Event Date:</b> {date}<br><b>Time:</b> {hours}<br><b>Venue:</b> {venue}</div>
+</div>
+<div class="back"><div class="back-text">
+<b>If this card is found, please return to:</b><br><br>{return_to}<br>Phone: {Phone}<br>{website}
+</div></div>
+</div>""".format
+
+def _head(title): return "<html><head><meta charset='utf-8'><title>" + html.escape(str(title)) + "</title><style>" + CSS + "</style></head><body>"
+PRINT = "<script>window.onload = function() { window.print(); }</script>"
+TAIL = "</body></html>"
+
+
+def digest(rec): return hashlib.blake2b('\x1f'.join(str(rec[f]) for f in FIELDS).encode(), digest_size=8).hexdigest()
+
+def event_text(event):
+    e = html.escape
+    return {'title': e(event.title), 'date': e(event.date_label), 'hours': e(event.hours), 'venue': e(event.venue),
+            'return_to': '<br>'.join(map(e, event.return_to)), 'website': e(event.website)}
+
+def card(rec, text):
+    """rec: display text per FIELDS (e.g. to_display(...) records); text: event_text(event)."""
+    e = {f.replace(' ', '_'): html.escape(str(rec[f])) for f in FIELDS}
+    return CARD(Phone=e.pop('Spot_Phone'), **text, **e)
+
+
+# --- finished files ---
+def single(rec, text):
+    # One pass that prints itself when opened (Search & Entry)
+    return (_head(rec['Ticket_Number']) + "<div class='single'>" + card(rec, text) + "</div>" + PRINT + TAIL).encode('utf-8')
+
+def sheets(cards, title="Event Passes"):
+    """Cards laid out PER_PAGE to a printed page, in one HTML file."""
+    pages = ("<div class='sheet'>" + ''.join(cards[i:i + PER_PAGE]) + "</div>" for i in range(0, len(cards), PER_PAGE))
+    return (_head(title) + ''.join(pages) + TAIL).encode('utf-8')
+
+def sheets_zip(groups):
+    """groups: (file title, cards) pairs -> zip with one sheet file per group."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for title, cards in groups:
+            if cards: zf.writestr(f"Passes_{str(title).replace(' ', '_')}.html", sheets(cards, f"Passes - {title}"))
+    return buf.getvalue()
+
+
+class PassCache:
+    """Rendered card per ticket of one event, reused while the row's digest is unchanged."""
+
+    def __init__(self, text):
+        self.text = text  # event_text(event)
+        self.lock = threading.Lock()
+        self.cards = {}  # ticket -> (digest, html)
+
+    def cards_for(self, recs):
+        """Cards for `recs` in order, rendering only new / changed rows. Returns (cards, rendered)."""
+        keys = [(r['Ticket_Number'], digest(r)) for r in recs]
+        with self.lock:
+            todo = [i for i, (t, d) in enumerate(keys) if self.cards.get(t, (None,))[0] != d]
+        fresh = [card(recs[i], self.text) for i in todo]
+        with self.lock:
+            for i, c in zip(todo, fresh): self.cards[keys[i][0]] = (keys[i][1], c)
+            out = [self.cards[t][1] if self.cards[t][0] == d else card(r, self.text) for (t, d), r in zip(keys, recs)]  # duplicate tickets: no sharing
+        return out, len(todo)
+
+
+class PrintLog:
+    """Which version (digest) of each ticket's pass went to the printer, kept across restarts."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS passes_printed (ticket TEXT PRIMARY KEY, digest TEXT, ts REAL)")
+        self.marked = 0  # bumped on every mark(), for callers that cache unprinted()
+
+    def unprinted(self, recs):
+        # New attendees, and anyone whose pass text changed since it was printed
+        with self.lock: done = dict(self.db.execute("SELECT ticket, digest FROM passes_printed").fetchall())
+        return [r for r in recs if done.get(str(r['Ticket_Number'])) != digest(r)]
+
+    def mark(self, recs):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR REPLACE INTO passes_printed VALUES (?, ?, ?)", [(str(r['Ticket_Number']), digest(r), now) for r in recs])
+            self.marked += 1
@@ -0,0 +1,426 @@
+import threading
+import time
+from collections import Counter, deque
+import numpy as np
+import pandas as pd
+from lookup import RosterIndex, INDEX_COLS, _clean
+from schema import normalize, coerce_row, align_categories, sheet_value, to_sheet
+from stats import RosterStats, STAT_COLS
+from inventory import kit_events, remaining
+
+# ==================== ROSTER ENGINE ====================
+# Every edit to the roster goes through set_cells / append_rows so we always
+# know which cells moved since the last sync and can push only those.
+#
+# Row labels are the sheet position of the row: label i lives on sheet row i+2
+# (row 1 is the header). conn.read keeps that labelling even when it drops
+# blank rows, so labels are never renumbered: a full rewrite leaves the rows a
+# store skips (blank_rows) blank, and the journal's ops stay valid across it.
+
+class RosterUnavailable(RuntimeError):
+    pass
+
+
+class ChangeLog:
+    def __init__(self, sheet_cols=None):
+        self.sheet_cols = list(sheet_cols) if sheet_cols is not None else None  # header as it is on the sheet
+        self.cells = {}     # row label -> set of changed columns
+        self.added = set()  # row labels that are not on the sheet yet
+        self.gone = {}      # row label -> (ticket, note) of rows removed since, to be blanked on the sheet
+
+    def __bool__(self): return bool(self.cells or self.added or self.gone)
+
+    def mark(self, idxs, cols):
+        for i in idxs: self.cells.setdefault(i, set()).update(cols)
+
+    def needs_full_write(self, df):
+        # A header we know and that differs (schema change): the only case that rewrites the sheet.
+        # An unknown header (the sheet was never read) never does: nothing is written until a read succeeds
+        return self.sheet_cols is not None and list(df.columns) != self.sheet_cols
+
+    def clear(self, df):
+        self.cells.clear(); self.added.clear(); self.gone.clear(); self.sheet_cols = list(df.columns)
+
+    def take(self):
+        # Hand the pending changes to a flush and start recording afresh
+        snap = ChangeLog(self.sheet_cols)
+        snap.cells, snap.added, snap.gone = self.cells, self.added, self.gone
+        self.cells, self.added, self.gone = {}, set(), {}
+        return snap
+
+    def restore(self, snap):
+        # A flush failed: put its changes back in front of anything newer
+        if not snap: return
+        for i, cols in snap.cells.items(): self.cells.setdefault(i, set()).update(cols)
+        self.added |= snap.added
+        for i, g in snap.gone.items(): self.gone.setdefault(i, g)
+
+
+def set_cells(df, log, idx, values):
+    """Write `values` ({col: value}) into row label(s) `idx`, logging only cells that really change.
+    Returns the set of row labels that changed."""
+    idxs = [idx] if pd.api.types.is_scalar(idx) else list(idx)
+    if not idxs: return set()
+    if len(idxs) == 1: return _set_one(df, log, idxs[0], values)
+    touched = set()
+    for col, v in coerce_row(values).items():
+        cur = df.loc[idxs, col]
+        hit = cur.index[cur.notna()] if _blank(v) else cur.index[~(cur == v).fillna(False).astype(bool)]
+        if len(hit):
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and v is not None and v not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([v])
+            df.loc[hit, col] = v; log.mark(hit, [col]); touched.update(hit)
+    return touched
+
+
+def _blank(v): return v is None or pd.isna(v)  # None / NA / NaT: an empty cell
+
+
+def _set_one(df, log, i, values):
+    # Same as set_cells for one row (a gate check-in) with scalar reads/writes: no frame is built
+    cols = []
+    for col, v in coerce_row(values).items():
+        cur = df.at[i, col]
+        if pd.isna(cur) if _blank(v) else (not pd.isna(cur) and cur == v): continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and v is not None and v not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([v])
+        df.at[i, col] = v; cols.append(col)
+    if cols: log.mark([i], cols)
+    return {i} if cols else set()
+
+
+def blank_rows(df):
+    """Rows that are nobody: no ticket and no name (left by RosterStore.remove, or typed on the sheet). Every store skips them."""
+    return (df['Ticket_Number'].isna() & df['Name'].isna()).to_numpy(dtype=bool)
+
+
+def append_rows(df, log, rows, start=None):
+    """Append new rows (list of dicts) after the last sheet row (or from label `start`) and return the new frame."""
+    if start is None: start = int(df.index.max()) + 1 if len(df) else 0
+    rows = [coerce_row({**dict.fromkeys(df.columns), **r}) for r in rows]  # unset columns get their typed default
+    new = pd.DataFrame(rows, index=range(start, start + len(rows)))
+    align_categories(df, new)
+    log.added.update(new.index)
+    return pd.concat([df, new]) if len(df) else new
+
+
+# ==================== SHARED ROSTER STORE ====================
+# One roster per server process, shared by every browser session (app1 keeps
+# it behind st.cache_resource). Every write bumps `version`, so sessions and
+# version-keyed caches know when what they rendered is stale.
+#
+# Other writers (a second server, someone typing in the sheet) are folded in
+# by merge(): only cells that differ are touched, and a cell we still have to
+# push keeps our value and is logged in `conflicts` instead of being lost.
+#
+# A partition store (`scope`, see events.py) keeps only the rows its scope
+# takes, whatever it is handed. Seats and shirts are event-wide, so for the
+# other rows it remembers just the bus seat / collected size they hold
+# (`outside`), and seats() / remaining() count those too. Ticket numbers are
+# event-wide as well, so it keeps the others' (`outside_tickets`) for tickets().
+# Blank rows (blank_rows: what remove() leaves) are outside every store.
+
+class RosterStore:
+    def __init__(self, scope=None, rows=None):
+        self.lock = threading.RLock()
+        self.scope = scope  # events.Scope, or None for the whole roster
+        self.rows = rows    # engine.SheetRows shared by the event's stores in this process: where new rows go
+        self.outside = {}   # label -> (bus, collected size) of rows outside the scope that hold either
+        self.outside_tickets = {}  # label -> cleaned ticket of every row outside the scope
+        self.version = 0
+        self.stock, self.stock_dirty = {}, False  # T-shirt allocation per size (the Stock sheet)
+        self.journal = None  # journal.Journal; when set, every write is logged before it is acknowledged
+        self.ledger = None   # inventory.KitLedger; when set, every collect/return is recorded
+        self.remote_rev, self.pulled_at = None, 0.0  # backend revision the roster matches (see journal.pull_remote)
+        self.seen_raw = None  # whole raw read (Sheets) the roster matches, diffed against the next one (journal.pull_remote)
+        self.conflicts = deque(maxlen=100)
+        self.load(normalize(pd.DataFrame()))
+
+    def load(self, df, stock=None):
+        # Fresh copy from the sheet; load_data leaves the sheet header in df.attrs
+        with self.lock:
+            self.changes = ChangeLog(df.attrs.pop('sheet_cols', None))  # pandas deep-copies attrs on every op, so don't keep them
+            outside, end = df.attrs.pop('outside', None), df.attrs.pop('rows_end', None)
+            if outside is None: df = self._scoped(df, full=True)
+            else: self.outside, self.outside_tickets = outside, df.attrs.pop('outside_tickets', {})  # a partition snapshot: already ours
+            if end is not None and self.rows: self.rows.seen(end)
+            self.df, self.seen_raw = df, None
+            self.index = RosterIndex(df)
+            self.stats = RosterStats(df)
+            if stock is not None: self.stock = stock
+            self.version += 1
+
+    def _scoped(self, remote, full):
+        # Keep the scope's rows of `remote`; note where the roster ends and what the others hold
+        if len(remote) and self.rows: self.rows.seen(int(remote.index.max()) + 1)
+        if full: self.outside, self.outside_tickets = {}, {}
+        keep = ~blank_rows(remote)
+        if self.scope is not None: keep &= self.scope.mask(remote)
+        if self.outside_tickets:
+            for i in remote.index[keep]: self.outside.pop(i, None); self.outside_tickets.pop(i, None)  # moved into the scope
+        if keep.all(): return remote
+        out = remote.loc[~keep]
+        self.outside_tickets.update(zip(out.index.tolist(), map(_clean, out['Ticket_Number'].tolist())))
+        bus = (out['Bus_Number'].notna() & (out['Bus_Number'] != 'Unassigned')).to_numpy(dtype=bool)
+        kit = out['T_Shirt_Collected'].to_numpy(dtype=bool) & out['T_Shirt_Size'].notna().to_numpy()
+        held = bus | kit
+        if not full:
+            for i in out.index[~held]: self.outside.pop(i, None)
+        b = np.where(bus[held], out['Bus_Number'].astype(object).to_numpy()[held], None)
+        k = np.where(kit[held], out['T_Shirt_Size'].astype(object).to_numpy()[held], None)
+        self.outside.update(zip(out.index[held].tolist(), zip(b.tolist(), k.tolist())))
+        return remote.loc[keep]
+
+    def elsewhere(self):
+        """(seats per bus, shirts per size) held by rows outside this store's scope."""
+        bus, kit = Counter(), Counter()
+        for b, s in self.outside.values():
+            if b is not None: bus[b] += 1
+            if s is not None: kit[s] += 1
+        return bus, kit
+
+    def tickets(self):
+        """Cleaned ticket numbers in use event-wide, as far as this process knows: this store's,
+        the other partitions' as of the last pull, and those the event's stores here claimed since."""
+        with self.lock:
+            taken = set(self.index.tickets)
+            taken.update(self.outside_tickets.values())
+        if self.rows: taken |= self.rows.claimed
+        return taken
+
+    def seats(self):
+        """Taken seats per bus, event-wide."""
+        return self.stats.bus + self.elsewhere()[0] if self.outside else self.stats.bus
+
+    @property
+    def loaded(self): return self.changes.sheet_cols is not None  # read from the backend at least once
+
+    def _writable(self):
+        # Labels and the header are unknown until a read succeeds: no write could be placed right
+        if not self.loaded: raise RosterUnavailable("The roster hasn't been read from storage yet; retrying in the background")
+
+    def edit(self, idx, values):
+        with self.lock:
+            self._writable()
+            counted = not set(STAT_COLS).isdisjoint(values)
+            one = pd.api.types.is_scalar(idx)
+            if counted: before = [self._stat_row(idx)] if one else self.df.loc[idx, STAT_COLS].copy()
+            touched = set_cells(self.df, self.changes, idx, values)
+            if touched:
+                if self.journal: self.journal.append('edit', {'idx': sorted(int(i) for i in touched), 'values': values})
+                if INDEX_COLS & values.keys(): self.index.refresh(self.df, touched)
+                if counted:
+                    rows = sorted(touched)
+                    if one: after = [self._stat_row(idx)]
+                    else: before, after = before.loc[rows], self.df.loc[rows, STAT_COLS]
+                    self.stats.remove(before); self.stats.add(after)
+                    if self.ledger and {'T_Shirt_Size', 'T_Shirt_Collected'} & values.keys(): self._ledger(kit_events(before, after))
+                self.version += 1
+            return touched
+
+    def _stat_row(self, i): return (i, *(self.df.at[i, c] for c in STAT_COLS))
+
+    def check_in(self, idx, when, gate=None):
+        # Test-and-set under the lock, so two gates scanning the same ticket can't both admit it
+        with self.lock:
+            if self.df.at[idx, 'Entry_Status']: return False
+            self.edit(idx, {'Entry_Status': True, 'Entry_Time': when, **({'Entry_Gate': gate} if gate else {})})
+            return True
+
+    def append(self, rows, start=None):
+        with self.lock:
+            self._writable()
+            if start is not None and self.rows: self.rows.seen(start + len(rows))
+            elif self.rows: start = self.rows.take(len(rows), int(self.df.index.max()) + 1 if len(self.df) else 0)
+            elif self.outside_tickets or self.changes.gone:  # blank rows may be the last ones
+                start = max(int(self.df.index.max()) + 1 if len(self.df) else 0, max([*self.outside_tickets, *self.changes.gone]) + 1)
+            self.df = append_rows(self.df, self.changes, rows, start)
+            start = int(self.df.index[-len(rows)])
+            if self.journal: self.journal.append('append', {'start': start, 'rows': rows})
+            self.index.refresh(self.df, self.df.index[-len(rows):])
+            self.stats.add(self.df.iloc[-len(rows):])
+            if self.ledger:
+                new = self.df.iloc[-len(rows):]
+                self._ledger([(int(i), s, 1) for i, s in new.loc[new['T_Shirt_Collected'], 'T_Shirt_Size'].items()])
+            self.version += 1
+
+    def remove(self, labels, note="Removed"):
+        # Drop rows (duplicate merges). On the sheet the row stays, blanked but for `note`,
+        # so no row below moves: a delta write like any edit (delta_batch)
+        with self.lock:
+            self._writable()
+            labels = [i for i in labels if i in self.df.index]
+            if not labels: return
+            if self.scope is not None: raise ValueError(f"Rows can only be removed from the whole roster, not from {self.scope.name}")
+            if self.journal: self.journal.append('remove', {'idx': [int(i) for i in labels], 'note': note})
+            gone = self._drop(labels)
+            for i, t in zip(labels, gone['Ticket_Number']):
+                self.changes.cells.pop(i, None); self.changes.added.discard(i)
+                self.changes.gone[i] = (t, note)
+            self.outside_tickets.update(dict.fromkeys(labels, ''))  # still sheet rows: appends go after them
+            self.version += 1
+
+    def _drop(self, labels):
+        # Take rows out of the store (not the sheet); returns them
+        gone = self.df.loc[labels]
+        if self.ledger: self._ledger([(int(i), s, -1) for i, s in gone.loc[gone['T_Shirt_Collected'], 'T_Shirt_Size'].items()])
+        self.stats.remove(gone[STAT_COLS])
+        self.df = self.df.drop(labels)
+        self.index.refresh(self.df, labels)
+        return gone
+
+    def adopt(self, remote):
+        """First successful read after the roster failed to load: take `remote`, then
+        replay the journal on it (open_store couldn't, with no rows to replay onto)."""
+        with self.lock:
+            self.load(remote)
+            if self.journal: self.replay(self.journal.pending())
+
+    def rebase(self, remote):
+        """Rows moved under our unsynced changes: reload from `remote` and redo each pending
+        edit / removal on the row that now has its ticket; rows we added go after its last row. An edit
+        whose ticket is gone or shared lands in `conflicts` instead of on someone else's row."""
+        with self.lock:
+            df, ch = self.df, self.changes
+            edits = [(df.at[i, 'Ticket_Number'], {c: df.at[i, c] for c in cols}) for i, cols in ch.cells.items() if i in df.index and i not in ch.added]
+            added = to_sheet(df.loc[sorted(i for i in ch.added if i in df.index)]).to_dict('records')
+            gone = list(ch.gone.values())
+            mark = self.journal.last_seq() if self.journal else 0
+            self.load(remote)
+            ledger, self.ledger = self.ledger, None  # already in the ledger
+            try:
+                for t, vals in edits:
+                    hits = self.index.ticket(t) if isinstance(t, str) else set()
+                    if len(hits) == 1: self.edit(next(iter(hits)), vals); continue
+                    self.conflicts.append({'time': time.strftime('%H:%M:%S'), 'ticket': t, 'column': ', '.join(vals),
+                                           'ours': ', '.join(sheet_value(c, v) or '—' for c, v in vals.items()),
+                                           'theirs': f"{len(hits)} rows with this ticket" if hits else "row gone"})
+                if added: self.append(added)
+                for t, note in gone:
+                    hits = self.index.ticket(t) if isinstance(t, str) else set()
+                    if len(hits) == 1: self.remove(list(hits), note)
+            finally: self.ledger = ledger
+            if self.journal: self.journal.done(mark, ('edit', 'append', 'remove'))  # redone above under the new labels
+
+    def merge(self, remote, full=True):
+        """Fold rows read back from the backend (typed, sheet labels) into the roster.
+        Their changed cells are applied without being marked for sync; rows past ours
+        are added. Returns the labels that changed, or None when rows moved under us
+        (deleted / inserted / re-ticketed on the sheet, new header): reload instead."""
+        with self.lock:
+            df = self.df
+            if list(remote.columns) != list(df.columns): return None
+            part = self._scoped(remote, full)
+            left = remote.index.difference(part.index)
+            left = left[left.isin(df.index)]  # rows of ours now blank (removed elsewhere) or outside the scope
+            if any(i in self.changes.cells or i in self.changes.added for i in left): return None
+            remote = part
+            if full and not df.index.difference(self.changes.added).difference(left).isin(remote.index).all(): return None
+            common = remote.index[remote.index.isin(df.index)]
+            diff = to_sheet(df.loc[common]).to_numpy() != to_sheet(remote.loc[common]).to_numpy()
+            if diff[:, df.columns.get_loc('Ticket_Number')].any(): return None
+            hits = {}
+            for j, c in enumerate(df.columns):
+                hit = common[diff[:, j]]
+                mine = [i for i in hit if c in self.changes.cells.get(i, ())]
+                for i in mine:  # unsynced local edit vs. a different value on the sheet: ours goes out next flush
+                    self.conflicts.append({'time': time.strftime('%H:%M:%S'), 'ticket': df.at[i, 'Ticket_Number'], 'column': c,
+                                           'ours': sheet_value(c, df.at[i, c]), 'theirs': sheet_value(c, remote.at[i, c])})
+                if mine: hit = hit.difference(mine)
+                if len(hit): hits[c] = hit
+            touched = sorted(set().union(*hits.values()))
+            before = df.loc[touched, STAT_COLS].copy()
+            for c, hit in hits.items():
+                v = remote.loc[hit, c]
+                if isinstance(df[c].dtype, pd.CategoricalDtype):
+                    extra = pd.Index(v.dropna().unique()).difference(df[c].cat.categories)
+                    if len(extra): df[c] = df[c].cat.add_categories(extra)
+                df.loc[hit, c] = v.to_numpy()
+            if touched:
+                self.stats.remove(before); self.stats.add(df.loc[touched, STAT_COLS])
+                if self.ledger: self._ledger(kit_events(before, df.loc[touched]))
+                self.index.refresh(df, touched)
+            if len(left): self._drop(left); df = self.df
+            new = remote.loc[~remote.index.isin(df.index) & ~remote.index.isin(list(self.changes.gone))].copy()  # not rows we removed
+            if len(new):
+                align_categories(df, new)
+                self.df = df = pd.concat([df, new]) if len(df) else new
+                if not df.index.is_monotonic_increasing: self.df = df = df.sort_index()
+                self.index.refresh(df, new.index); self.stats.add(new[STAT_COLS])
+                if self.ledger: self._ledger([(int(i), s, 1) for i, s in new.loc[new['T_Shirt_Collected'], 'T_Shirt_Size'].items()])
+            if touched or len(left) or len(new): self.version += 1
+            return set(touched) | set(left) | set(new.index)
+
+    def _ledger(self, events):
+        if events: self.ledger.record(events, {i: self.df.at[i, 'Ticket_Number'] for i, _, _ in events}, self.stats.kit)
+
+    def set_stock(self, allocation):
+        # Only the allocation is stored; handouts are counted from the roster
+        with self.lock:
+            self._writable()
+            self.stock = dict(allocation); self.stock_dirty = True
+            if self.journal: self.journal.append('stock', dict(self.stock))
+
+    def remaining(self): return remaining(self.stock, self.stats.kit + self.elsewhere()[1] if self.outside else self.stats.kit)
+
+    def replay(self, ops):
+        # Re-apply journal entries that never reached the sheet; they are already journaled (and ledgered), so don't log them again
+        with self.lock:
+            logs, self.journal, self.ledger = (self.journal, self.ledger), None, None
+            try: self._replay(ops)
+            finally: self.journal, self.ledger = logs
+
+    def _replay(self, ops):
+        for kind, p in ops:
+            if kind == 'edit': self.edit([i for i in p['idx'] if i in self.df.index], p['values'])  # rows gone = journal from another roster
+            elif kind == 'append':
+                for i, row in enumerate(p['rows'], p['start']):
+                    if i in self.df.index: self.edit(i, row)  # already made it to the sheet
+                    else: self.append([row], i)
+            elif kind == 'remove': self.remove(p['idx'], p.get('note', "Removed"))
+            elif kind == 'stock': self.stock, self.stock_dirty = p, True
+
+
+# ==================== DELTA WRITE PATH ====================
+def col_letter(n):
+    s = ''
+    while n: n, r = divmod(n - 1, 26); s = chr(65 + r) + s
+    return s
+
+def _runs(nums):
+    # [1,2,3,7,8] -> [(1,3),(7,8)]
+    out = []
+    for n in sorted(nums):
+        if out and n == out[-1][1] + 1: out[-1][1] = n
+        else: out.append([n, n])
+    return out
+
+def delta_batch(df, log):
+    """Build one Worksheet.batch_update payload for everything in `log`.
+    Returns (ranges, last sheet row touched)."""
+    pos = {c: i for i, c in enumerate(df.columns)}
+    last_col = col_letter(len(df.columns))
+    batch, last_row = [], 1
+    # New rows: one range per block of consecutive rows
+    for a, b in _runs(i for i in log.added if i in df.index):
+        vals = to_sheet(df.loc[a:b]).values.tolist()
+        batch.append({'range': f"A{a + 2}:{last_col}{b + 2}", 'values': vals})
+        last_row = max(last_row, b + 2)
+    # Edited rows: one range per block of adjacent changed cells; consecutive rows
+    # with the same changed columns (bulk bus moves) share one tall range
+    spans = {}
+    for i, cols in log.cells.items():
+        if i in log.added or i not in df.index: continue
+        for a, b in _runs(pos[c] for c in cols if c in pos): spans.setdefault((a, b), []).append(i)
+    for (a, b), rows in sorted(spans.items()):
+        cols = df.columns[a:b + 1]
+        for r0, r1 in _runs(rows):
+            if r0 == r1: vals = [[sheet_value(c, df.at[r0, c]) for c in cols]]
+            else: vals = to_sheet(df.loc[r0:r1, cols]).values.tolist()
+            batch.append({'range': f"{col_letter(a + 1)}{r0 + 2}:{col_letter(b + 1)}{r1 + 2}", 'values': vals})
+            last_row = max(last_row, r1 + 2)
+    # Removed rows: blanked where they are, but for their note
+    for i, (_, note) in sorted(log.gone.items()):
+        batch.append({'range': f"A{i + 2}:{last_col}{i + 2}", 'values': [[note if c == 'Notes' else '' for c in df.columns]]})
+        last_row = max(last_row, i + 2)
+    return batch, last_row
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# ==================== ROSTER SCHEMA ====================
+# In memory the roster is typed (categoricals, bools, timestamps, Arrow
+# strings); the sheet keeps its old text format. normalize() runs once per
+# load, to_sheet()/sheet_value() only when something is written back.
+# Entry times are event-local and tz-aware (TZ); the sheet keeps them with
+# their offset, screens show the bare clock time.
+
+REQ_COLS = ['Name', 'Role', 'Spot Phone', 'Guardian Phone', 'Ticket_Number', 'Class', 'Roll', 'Entry_Status', 'Entry_Time', 'Entry_Gate', 'Bus_Number', 'T_Shirt_Size', 'T_Shirt_Collected', 'Notes']
+SIZES = ["S", "M", "L", "XL", "XXL"]
+ROLES = ["Student", "Volunteer", "Teacher", "College Staff", "Organizer", "Principal", "College Head", "Guest"]
+CATEGORY_COLS = ['Role', 'Class', 'Bus_Number', 'T_Shirt_Size', 'Entry_Gate']
+FLAG_COLS = {'Entry_Status': ('Done', 'N/A'), 'T_Shirt_Collected': ('Yes', 'No')}  # sheet text for True / False
+TIME_COLS = ['Entry_Time']
+TIME_FMT = "%H:%M:%S"                    # screens
+SHEET_TIME_FMT = "%Y-%m-%d %H:%M:%S%z"   # sheet / database / API: 2026-02-03 09:14:05+0600
+TZ = "Asia/Dhaka"
+STRING = "string[pyarrow]"
+
+MISSING = ['', 'nan', 'None', 'N/A', '<NA>', 'NaT']
+TRUTHY = {'done', 'yes', 'true', '1'}
+
+
+def _text(s):
+    # Whole-number floats come from numeric sheet cells (phones, rolls); drop the ".0"
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all(): s = s.astype('Int64')
+    s = s.astype(STRING).str.strip().str.removesuffix('.0')
+    return s.mask(s.isin(MISSING))
+
+
+def _per_value(s, fn, na):
+    # Low-cardinality columns: clean each distinct value once, then fan out by code
+    codes, uniq = pd.factorize(s)
+    out = np.append(fn(_text(pd.Series(uniq))).astype(object).to_numpy(), na)
+    return out[codes]
+
+
+def _times(s, day):
+    # An offset is kept as written; naive ISO and bare HH:MM:SS (older sheets) are event-local
+    aware = s.str.contains(r'(?:[+-]\d\d:?\d\d|Z)$', na=False).to_numpy(dtype=bool)
+    local = pd.to_datetime(s.mask(aware), errors='coerce', format='ISO8601')
+    if day: local = local.fillna(pd.to_datetime(day + ' ' + s.mask(aware), errors='coerce', format='%Y-%m-%d ' + TIME_FMT))
+    v = local.dt.tz_localize(TZ)
+    if aware.any(): v = v.mask(aware, pd.to_datetime(s.where(aware), errors='coerce', format='ISO8601', utc=True).dt.tz_convert(TZ))
+    return v
+
+
+def now(): return pd.Timestamp.now(TZ).floor('s')
+
+
+def normalize(raw, day=None):
+    """Sheet frame -> typed roster. `day` (YYYY-MM-DD) dates the bare HH:MM:SS entry times."""
+    cols = {}
+    for c in list(raw.columns) + [c for c in REQ_COLS if c not in raw.columns]:
+        s = raw[c] if c in raw.columns else pd.Series(None, index=raw.index, dtype=object)
+        if c in FLAG_COLS: v = _per_value(s, lambda u: u.str.lower().isin(TRUTHY).fillna(False), False).astype(bool)
+        elif c in CATEGORY_COLS:
+            v = pd.Categorical(_per_value(s, lambda u: u.astype(object).where(u.notna(), None), None))
+            if c == 'Bus_Number': v = v.add_categories([] if 'Unassigned' in v.categories else ['Unassigned']).fillna('Unassigned')
+        elif c in TIME_COLS: v = _times(_text(s), day)
+        else: v = _text(s)
+        cols[c] = v
+    df = pd.DataFrame(cols, index=raw.index)
+    df.attrs['sheet_cols'] = list(raw.columns)
+    return df
+
+
+def coerce(col, v):
+    """Bring a value from the UI or the journal to the column's in-memory type."""
+    missing = v is None or (isinstance(v, str) and v.strip() in MISSING) or (not isinstance(v, (str, bool)) and pd.isna(v))
+    if col in FLAG_COLS: return False if missing else (v.strip().lower() in TRUTHY if isinstance(v, str) else bool(v))
+    if missing: return 'Unassigned' if col == 'Bus_Number' else None
+    if col in TIME_COLS:
+        t = pd.Timestamp(v)
+        return (t.tz_localize(TZ) if t.tzinfo is None else t.tz_convert(TZ)).floor('s')  # the sheet keeps whole seconds
+    return str(v).strip()
+
+
+def coerce_row(values): return {c: coerce(c, v) for c, v in values.items()}
+
+
+def sheet_value(col, v, na='', times=SHEET_TIME_FMT):
+    if col in FLAG_COLS: return FLAG_COLS[col][0 if v else 1]
+    if v is None or (not isinstance(v, str) and pd.isna(v)): return na
+    if col in TIME_COLS: return v.strftime(times)
+    return v.item() if hasattr(v, 'item') else v
+
+
+def to_sheet(df, na='', times=SHEET_TIME_FMT):
+    """Typed roster -> plain text frame as the sheet keeps it (screens: to_display)."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if c in FLAG_COLS: out[c] = np.where(s.astype(bool), *FLAG_COLS[c])
+        elif c in TIME_COLS: out[c] = s.dt.strftime(times).astype(object).fillna(na).to_numpy()
+        else: out[c] = s.astype(object).where(s.notna(), na).to_numpy()
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+
+def to_display(df): return to_sheet(df, na='N/A', times=TIME_FMT)
+
+
+def align_categories(df, new):
+    # pd.concat only keeps a categorical dtype when both sides share the categories
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) and c in new:
+            cats = df[c].cat.categories.union(pd.Index(new[c].dropna().unique()), sort=False)
+            df[c] = df[c].cat.set_categories(cats); new[c] = pd.Categorical(new[c], categories=cats)
+        elif c in new: new[c] = new[c].astype(df[c].dtype)
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+import pyarrow as pa
+from schema import REQ_COLS
+from events import EVERYONE
+
+# ==================== ROSTER SNAPSHOTS ====================
+# The typed roster and stock, saved as an Arrow IPC file next to the journal
+# and tagged with the backend revision they match. A restart memory-maps it
+# back (no sheet read, no normalize: milliseconds at 50k rows) and the
+# flusher's first round pulls whatever changed since that revision.
+#
+# Only saved when everything local has reached the backend (nothing pending
+# in the journal), so replaying the journal on top never applies an edit twice.
+# A partition's snapshot holds its rows plus what it knows of the others
+# (RosterStore.outside / outside_tickets, where the roster ends), and only loads as that partition.
+
+SNAPSHOT_EVERY = 30.0  # seconds between saves while the roster keeps changing
+FORMAT = 2
+META = b'event_snapshot'
+
+
+def path_for(journal_path): return os.path.splitext(journal_path)[0] + '.snapshot.arrow'
+
+
+def save(path, table, info):
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), META: json.dumps(info, default=str).encode()})
+    tmp = path + '.tmp'
+    with pa.OSFile(tmp, 'wb') as f, pa.ipc.new_file(f, table.schema) as w: w.write_table(table)
+    os.replace(tmp, path)  # readers see the old file or the new one, never half of one
+
+
+def info(path):
+    """The snapshot's tag (storage, rev, rows, saved_at, ...) without reading the data, or None."""
+    try: meta = pa.ipc.open_file(pa.memory_map(path)).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid): return None
+    return json.loads(meta[META]) if META in meta else None
+
+
+def load(path, storage, view=EVERYONE):
+    """(df, stock, rev) from the snapshot at `path`, as load_all returns them; None when
+    there is none, it belongs to another storage or view, or the schema moved on since."""
+    tag = info(path)
+    if not tag or tag.get('format') != FORMAT or tag.get('storage') != storage or tag.get('view', EVERYONE) != view: return None
+    df = pa.ipc.open_file(pa.memory_map(path)).read_all().to_pandas()
+    if not set(REQ_COLS) <= set(df.columns): return None
+    df.attrs['sheet_cols'] = tag['sheet_cols']
+    if view != EVERYONE:
+        df.attrs['outside'], df.attrs['rows_end'] = {i: (b, s) for i, b, s in tag['outside']}, tag['rows_end']
+        df.attrs['outside_tickets'] = dict(tag['outside_tickets'])
+    return df, tag['stock'], tag['rev']
+
+
+class Snapshots:
+    """Saves the store from the flusher thread: at most every `every` seconds, only when it changed."""
+
+    def __init__(self, path, storage, view=EVERYONE, every=SNAPSHOT_EVERY):
+        self.path, self.storage, self.view, self.every = path, storage, view, every
+        self.saved_version, self.saved_at = None, 0.0
+
+    def maybe_save(self, store, force=False):
+        if not force and time.time() - self.saved_at < self.every: return False
+        with store.lock:
+            # The backend has everything and we know its revision: the snapshot is exactly that revision
+            if (store.version == self.saved_version or store.changes or store.stock_dirty or store.remote_rev is None
+                    or not store.loaded or store.journal.pending_count()): return False
+            table, version = pa.Table.from_pandas(store.df, preserve_index=True), store.version  # a copy, taken under the lock
+            tag = {'format': FORMAT, 'storage': self.storage, 'view': self.view, 'rev': store.remote_rev, 'stock': dict(store.stock),
+                   'sheet_cols': store.changes.sheet_cols, 'rows': len(store.df), 'saved_at': time.time()}
+            if self.view != EVERYONE:
+                tag['outside'], tag['rows_end'] = [(i, b, s) for i, (b, s) in store.outside.items()], store.rows.end if store.rows else None
+                tag['outside_tickets'] = list(store.outside_tickets.items())
+        save(self.path, table, tag)
+        self.saved_version, self.saved_at = version, time.time()
+        return True
@@ -0,0 +1,68 @@
+from collections import Counter
+import pandas as pd
+
+# ==================== LIVE COUNTERS ====================
+# Everything the Dashboard / Bus Manager / View Lists show as a number.
+# Built once per load with value_counts, then patched by RosterStore.edit /
+# append from the rows they touch (old values out, new values in), so pages
+# read plain dict lookups instead of masking the whole roster on every rerun.
+# `arrivals` counts check-ins per (epoch minute, gate, class) the same way, for the
+# gate throughput views (throughput.py).
+
+STAT_COLS = ['Role', 'Class', 'Bus_Number', 'T_Shirt_Size', 'Entry_Status', 'T_Shirt_Collected', 'Entry_Time', 'Entry_Gate']
+
+
+MINUTE = 60 * 10**9  # ns
+
+
+def _key(v): return None if pd.isna(v) else v
+
+def minute_of(times):
+    # Arrival bucket: whole minutes since the epoch (UTC; the event's offset is whole minutes, so buckets line up)
+    return times.dt.tz_convert(None).astype('datetime64[ns]').astype('int64') // MINUTE
+
+def stat_tuples(rows):
+    # (label, *STAT_COLS) per row: from a frame, or already tuples (single-row gate edits skip the frame)
+    return zip(rows.index, *(rows[col] for col in STAT_COLS)) if isinstance(rows, pd.DataFrame) else rows
+
+
+class RosterStats:
+    def __init__(self, df):
+        self.total, self.entered = len(df), int(df['Entry_Status'].sum()) if len(df) else 0
+        ent, kit = (df['Entry_Status'], df['T_Shirt_Collected']) if len(df) else (None, None)
+        def counts(col, mask=None):
+            if not len(df): return Counter()
+            s = df[col] if mask is None else df.loc[mask, col]
+            return Counter({k: int(v) for k, v in s.value_counts().items() if v})
+        self.bus = counts('Bus_Number')
+        self.role, self.role_in = counts('Role'), counts('Role', ent)
+        self.cls, self.cls_in = counts('Class'), counts('Class', ent)
+        self.size, self.kit = counts('T_Shirt_Size'), counts('T_Shirt_Size', kit)
+        self.arrivals = Counter()
+        if len(df):
+            came = df.loc[ent & df['Entry_Time'].notna(), ['Entry_Time', 'Entry_Gate', 'Class']]
+            n = came.assign(Entry_Time=minute_of(came['Entry_Time'])).value_counts(dropna=False)
+            lv = [(l := n.index.get_level_values(i).astype(object)).where(l.notna(), None).tolist() for i in range(3)]
+            self.arrivals.update(dict(zip(zip(*lv), n.tolist())))
+
+    def _apply(self, rows, sign):
+        for _, r, c, b, s, e, k, t, g in stat_tuples(rows):
+            self.total += sign
+            r, c, b, s = _key(r), _key(c), _key(b), _key(s)
+            if b is not None: self.bus[b] += sign
+            if r is not None: self.role[r] += sign
+            if c is not None: self.cls[c] += sign
+            if s is not None: self.size[s] += sign
+            if e:
+                self.entered += sign
+                if r is not None: self.role_in[r] += sign
+                if c is not None: self.cls_in[c] += sign
+                if not pd.isna(t): self.arrivals[(t.value // MINUTE, _key(g), c)] += sign
+            if k and s is not None: self.kit[s] += sign
+
+    def add(self, rows): self._apply(rows, 1)
+    def remove(self, rows): self._apply(rows, -1)
+
+    # --- read helpers for the pages ---
+    def present(self, counter): return sorted(k for k, v in counter.items() if v > 0)
+    def in_group(self, roles): return sum(self.role[r] for r in roles)
@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import pandas as pd
+from roster import delta_batch, col_letter
+from schema import to_sheet
+
+# ==================== STORAGE BACKENDS ====================
+# Where the roster and stock live. app1 and the flusher only talk to this
+# interface:
+#   read_roster()        -> raw sheet-text DataFrame (schema.normalize types it)
+#   write_roster(df)     -> bulk update: replace the whole roster, each row at its label
+#   add_columns(cols, new) -> append the `new` columns to the header `cols`; no row moves
+#   prepare(df, changes) -> under the store lock: payload for the pending rows/cells
+#   upsert(payload)      -> outside the lock: send it
+#   read_stock() / write_stock(stock) -> T-shirt allocation per size (a Remaining from an older Stock sheet)
+#   revision()           -> cheap token that moves whenever anyone writes
+#   read_changes(since)  -> (raw rows written after revision `since`, whether that is all of them)
+#   find(col, value)     -> raw rows that may have `value` in `col` (the caller checks them)
+# The writes return (revision before, revision after) when the backend can tell
+# what its own write moved the revision from / to, else None (journal.push_pending).
+# Row labels mean the same thing in both: label i is sheet row i+2.
+
+
+class Remaining(dict):
+    """read_stock() of a Stock sheet written before the allocation was kept (an Allocation
+    column): its Quantity is the shirts left per size. engine.migrate_stock converts it."""
+
+
+class GSheetsBackend:
+    name = "Google Sheets"
+
+    def __init__(self, conn, worksheet="Data", stock_sheet="Stock"):
+        self.conn, self.sh, self.worksheet, self.stock_sheet = conn, None, worksheet, stock_sheet
+
+    def read_roster(self): return self.conn.read(worksheet=self.worksheet, ttl=0)
+
+    def revision(self):
+        # Drive's modifiedTime: one small metadata call, no cell data
+        if self.sh is None: self.sh = self.conn.client._open_spreadsheet()
+        return self.sh.get_lastUpdateTime()
+
+    def read_changes(self, since):
+        # Sheets can't say which rows moved, so the roster comes back whole and the store diffs it
+        return self.read_roster(), True
+
+    def find(self, col, value):
+        # No server-side filter either: the whole roster, the caller picks the rows
+        return self.read_roster()
+
+    def write_roster(self, df):
+        # Rows are written by position: labels the roster skips (blank rows) stay blank
+        self.conn.update(worksheet=self.worksheet, data=to_sheet(df).reindex(range(int(df.index.max()) + 1 if len(df) else 0)))
+
+    def add_columns(self, cols, new):
+        ws = self.conn.client._select_worksheet(worksheet=self.worksheet)
+        if len(cols) > ws.col_count: ws.add_cols(len(cols) - ws.col_count)
+        a = len(cols) - len(new) + 1
+        ws.batch_update([{'range': f"{col_letter(a)}1:{col_letter(len(cols))}1", 'values': [list(new)]}], value_input_option="USER_ENTERED")
+
+    def prepare(self, df, changes): return delta_batch(df, changes)
+
+    def upsert(self, payload):
+        batch, last_row = payload
+        if not batch: return
+        ws = self.conn.client._select_worksheet(worksheet=self.worksheet)
+        if last_row > ws.row_count: ws.add_rows(last_row - ws.row_count)
+        ws.batch_update(batch, value_input_option="USER_ENTERED")
+
+    def read_stock(self):
+        df_s = self.conn.read(worksheet=self.stock_sheet, ttl=0)
+        if 'Allocation' in df_s.columns: return dict(zip(df_s['Size'], df_s['Allocation']))
+        return Remaining(zip(df_s['Size'], df_s['Quantity']))
+
+    def write_stock(self, stock):
+        self.conn.update(worksheet=self.stock_sheet, data=pd.DataFrame([{"Size": k, "Allocation": v} for k, v in stock.items()]))
+
+
+class SQLiteBackend:
+    """Local database with the sheet's columns (as text) plus the row label,
+    indexed on the lookup / grouping columns. Every write bumps a revision
+    counter and stamps the rows it wrote (`_rev`), so changes are a range query."""
+    name = "Local SQLite"
+    INDEXED = ['Ticket_Number', 'Spot Phone', 'Class', 'Bus_Number']
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stock (Size TEXT PRIMARY KEY, Quantity INTEGER, Allocation INTEGER)")
+        if 'Allocation' not in [r[1] for r in self.db.execute("PRAGMA table_info(stock)")]: self.db.execute("ALTER TABLE stock ADD COLUMN Allocation INTEGER")  # older file: Quantity = shirts left
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER)")
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('rev', 0), ('layout', 0)")
+        if self._cols() and '_rev' not in self._cols(): self.db.execute("ALTER TABLE roster ADD COLUMN _rev INTEGER")  # older file
+
+    def _cols(self):
+        return [r[1] for r in self.db.execute("PRAGMA table_info(roster)")]
+
+    def _meta(self, k): return self.db.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()[0]
+
+    def _bump(self, *keys):
+        # Inside the write's transaction: the new revision
+        rev = self._meta('rev') + 1
+        self.db.executemany("UPDATE meta SET v = ? WHERE k = ?", [(rev, k) for k in ('rev', *keys)])
+        return rev
+
+    def _select(self, where='', params=()):
+        df = pd.read_sql_query(f'SELECT * FROM roster {where} ORDER BY _row', self.db, index_col='_row', params=params)
+        df.index.name = None
+        return df.drop(columns='_rev', errors='ignore')
+
+    def read_roster(self):
+        with self.lock: return self._select() if self._cols() else pd.DataFrame()
+
+    def revision(self):
+        with self.lock: return self._meta('rev')
+
+    def read_changes(self, since):
+        # Rows stamped after `since`; everything if the table was rewritten since (rows may have moved)
+        with self.lock:
+            if since is not None and self._meta('layout') <= since:
+                return self._select('WHERE _rev > ?', (since,)), False
+        return self.read_roster(), True
+
+    def find(self, col, value):
+        # Ticket / phone / class / bus are indexed: one lookup, not a roster read
+        with self.lock:
+            if col not in self._cols(): return pd.DataFrame()
+            return self._select(f'WHERE "{col}" = ?', (str(value),))
+
+    def write_roster(self, df):
+        cols = list(df.columns)
+        q = ', '.join(f'"{c}" TEXT' for c in cols)
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            before = self._meta('rev')
+            self.db.execute("DROP TABLE IF EXISTS roster")
+            self.db.execute(f"CREATE TABLE roster (_row INTEGER PRIMARY KEY, _rev INTEGER, {q})")
+            self.db.execute('CREATE INDEX "ix__rev" ON roster (_rev)')
+            for c in self.INDEXED:
+                if c in cols: self.db.execute(f'CREATE INDEX "ix_{c}" ON roster ("{c}")')
+            rev = self._bump('layout')
+            self._insert(to_sheet(df), cols, rev)
+            return before, rev
+
+    def add_columns(self, cols, new):
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            for c in new:
+                if c not in self._cols(): self.db.execute(f'ALTER TABLE roster ADD COLUMN "{c}" TEXT')
+            self._bump()
+
+    def _insert(self, t, cols, rev):
+        names = ', '.join(f'"{c}"' for c in ['_row', '_rev'] + cols)
+        self.db.executemany(f"INSERT OR REPLACE INTO roster ({names}) VALUES ({', '.join('?' * (len(cols) + 2))})",
+                            [(int(i), rev, *vals) for i, vals in zip(t.index, t.itertuples(index=False))])
+
+    def prepare(self, df, changes):
+        # New rows whole; edited rows only their changed cells (one frame per set of columns),
+        # so a cell someone else wrote since our last pull is left alone
+        added = sorted(i for i in changes.added if i in df.index)
+        groups = {}
+        for i, cols in changes.cells.items():
+            if i in df.index and i not in changes.added: groups.setdefault(tuple(c for c in df.columns if c in cols), []).append(i)
+        edits = [to_sheet(df.loc[sorted(rows), list(cols)]) for cols, rows in groups.items() if cols]
+        if changes.gone:  # removed rows: blank but for their note (RosterStore.remove)
+            gone = sorted(changes.gone)
+            edits.append(pd.DataFrame([[changes.gone[i][1] if c == 'Notes' else None for c in df.columns] for i in gone], index=gone, columns=df.columns))
+        return (to_sheet(df.loc[added]) if added else None, edits) if added or edits else None
+
+    def upsert(self, payload):
+        if payload is None: return None
+        new, edits = payload
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            before = self._meta('rev')
+            rev = self._bump()
+            if new is not None: self._insert(new, list(new.columns), rev)
+            for t in edits:
+                sets = ', '.join(f'"{c}" = ?' for c in t.columns)
+                self.db.executemany(f"UPDATE roster SET {sets}, _rev = ? WHERE _row = ?",
+                                    [(*vals, rev, int(i)) for i, vals in zip(t.index, t.itertuples(index=False))])
+            return before, rev
+
+    def read_stock(self):
+        with self.lock: rows = self.db.execute("SELECT Size, Quantity, Allocation FROM stock").fetchall()
+        if rows and all(a is None for _, _, a in rows): return Remaining((s, q) for s, q, _ in rows)
+        return {s: a for s, _, a in rows if a is not None}
+
+    def write_stock(self, stock):
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR REPLACE INTO stock (Size, Allocation) VALUES (?, ?)", [(k, int(v)) for k, v in stock.items()])
+            before = self._meta('rev')
+            return before, self._bump()
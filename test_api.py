@@ -0,0 +1,81 @@
+import threading
+import pytest
+from api import CheckinService
+from bench import synthetic_roster
+from engine import load_all, open_store, typed
+from metrics import Metrics
+from storage import SQLiteBackend
+
+# ==================== API TESTS ====================
+# CheckinService.handle() without the HTTP server: what a scanner sends, what it gets back.
+
+ROWS = 20
+
+
+class Flusher:
+    # Stands in for journal.SheetFlusher: the handlers only wake it
+    wake, failures = threading.Event(), 0
+
+
+@pytest.fixture
+def api(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    b.write_roster(typed(synthetic_roster(ROWS)))
+    s = open_store(load_all(b), str(tmp_path / "api.db"))
+    return CheckinService(s, Flusher(), Metrics(), journal_path=str(tmp_path / "api.db"))
+
+
+def waiting(api):
+    # A row that has a size and no kit yet
+    df = api.store.df
+    i = df.index[~df['T_Shirt_Collected'] & df['T_Shirt_Size'].notna()][0]
+    return i, df.at[i, 'Ticket_Number'], df.at[i, 'T_Shirt_Size']
+
+
+def post(api, route, body, rid=None): return api.handle('POST', route, body, rid)
+
+
+# --- /kit ---
+def test_kit_rejects_a_collected_that_is_not_a_bool(api):
+    i, t, _ = waiting(api)
+    status, body = post(api, '/kit', {'ticket': t, 'collected': "false"})
+    assert status == 400 and "true or false" in body['error']
+    assert not api.store.df.at[i, 'T_Shirt_Collected']
+
+
+def test_kit_refuses_when_the_size_is_out_of_stock(api):
+    i, t, size = waiting(api)
+    api.store.set_stock({**api.store.stock, size: int(api.store.stats.kit[size])})  # every one of them handed out
+    status, body = post(api, '/kit', {'ticket': t})
+    assert status == 409 and size in body['error'] and not api.store.df.at[i, 'T_Shirt_Collected']
+    api.store.set_stock({**api.store.stock, size: int(api.store.stats.kit[size]) + 1})
+    status, body = post(api, '/kit', {'ticket': t})
+    assert status == 200 and body['changed'] and body['remaining'][size] == 0
+    assert post(api, '/kit', {'ticket': t, 'collected': False})[1]['remaining'][size] == 1  # returning one needs no stock
+
+
+# --- idempotency ---
+def test_a_retried_request_is_answered_not_applied(api):
+    i, t, size = waiting(api)
+    api.store.set_stock({**api.store.stock, size: 100})
+    first = post(api, '/kit', {'ticket': t}, rid="r1")
+    post(api, '/kit', {'ticket': t, 'collected': False})
+    again = post(api, '/kit', {'ticket': t}, rid="r1")
+    assert again[1]['replayed'] and again[1]['changed'] == first[1]['changed']
+    assert not api.store.df.at[i, 'T_Shirt_Collected']  # the retry did not hand the kit out again
+
+
+def test_a_request_id_is_per_route(api):
+    df = api.store.df
+    i = df.index[~df['Entry_Status']][0]
+    _, t, size = waiting(api)
+    api.store.set_stock({**api.store.stock, size: 100})
+    assert post(api, '/kit', {'ticket': t}, rid="same")[0] == 200
+    status, body = post(api, '/checkin', {'ticket': df.at[i, 'Ticket_Number']}, rid="same")
+    assert status == 200 and body['admitted'] and 'replayed' not in body
+
+
+# --- /bus ---
+def test_bus_rejects_tickets_that_are_not_a_list_of_strings(api):
+    assert post(api, '/bus', {'tickets': "T1", 'bus': 'Unassigned'})[0] == 400
+    assert post(api, '/bus', {'tickets': [1, 2], 'bus': 'Unassigned'})[0] == 400
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+from bench import FLEET, synthetic_roster
+from bulk import BulkError, UndoLog, apply_plan, hand_kits, mark_entry, move_bus, revert, select
+from engine import load_all, open_store, typed
+from schema import to_sheet
+from storage import SQLiteBackend
+
+# ==================== BULK TESTS ====================
+# Apply a batch, undo it: the cells come back as they were, except on rows
+# someone changed in between, which undo leaves alone.
+
+ROWS = 20
+
+
+@pytest.fixture
+def store(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    b.write_roster(typed(synthetic_roster(ROWS)))
+    return open_store(load_all(b), str(tmp_path / "bulk.db"))
+
+
+@pytest.fixture
+def undo(tmp_path): return UndoLog(str(tmp_path / "undo.db"))
+
+
+COLS = ['Entry_Status', 'Entry_Time', 'Entry_Gate', 'Bus_Number', 'T_Shirt_Collected']
+
+
+# As the sheet has it: a batch leaves new categories behind even once undone
+def text(store, idx=None): return to_sheet(store.df.loc[store.df.index if idx is None else idx, COLS])
+
+
+# --- apply / revert ---
+def test_mark_entry_round_trip(store, undo):
+    before, was = store.df[COLS].copy(), text(store)
+    out = store.df.index[~store.df['Entry_Status']]
+    touched, bid = mark_entry(store, undo, store.df.index, "2026-10-17 09:00:00", "Gate 2")
+    assert touched == set(out) and store.df['Entry_Status'].all()
+    assert (store.df.loc[~before['Entry_Status'], 'Entry_Time'].astype(str) != before.loc[~before['Entry_Status'], 'Entry_Time'].astype(str)).all()
+    assert store.df.loc[before['Entry_Status'], 'Entry_Time'].equals(before.loc[before['Entry_Status'], 'Entry_Time'])  # never overwritten
+    assert revert(store, undo, bid) == (len(out), 0)
+    assert text(store).equals(was)
+
+
+def test_undo_skips_rows_changed_since(store, undo):
+    picked = select(store, 'Class', [store.df.at[0, 'Class']])
+    was = text(store, picked)
+    touched, bid = move_bus(store, undo, picked, "Bus 2", FLEET)
+    assert touched == set(picked) and (store.df.loc[picked, 'Bus_Number'] == "Bus 2").all()
+    i = picked[0]
+    store.edit([i], {'Bus_Number': "Bus 3"})
+    assert revert(store, undo, bid) == (len(picked) - 1, 1)
+    assert store.df.at[i, 'Bus_Number'] == "Bus 3"
+    assert text(store, picked[1:]).equals(was.loc[picked[1:]])
+
+
+def test_a_batch_is_undone_once(store, undo):
+    _, bid = move_bus(store, undo, select(store, 'Tickets', [store.df.at[0, 'Ticket_Number']]), "Bus 1", FLEET)
+    revert(store, undo, bid)
+    with pytest.raises(BulkError, match="already undone"): revert(store, undo, bid)
+    with pytest.raises(BulkError, match="No batch"): revert(store, undo, bid + 1)
+    assert undo.recent().at[0, 'Undone'] != ''
+
+
+# --- checks before anything is written ---
+def test_hand_kits_short_writes_nothing(store, undo):
+    df = store.df
+    todo = df.index[~df['T_Shirt_Collected'] & df['T_Shirt_Size'].notna()]
+    size = df.at[todo[0], 'T_Shirt_Size']
+    store.set_stock({**store.stock, size: int(store.stats.kit[size])})  # none left of that size
+    before = df['T_Shirt_Collected'].copy()
+    with pytest.raises(BulkError, match=f"{size} short by"): hand_kits(store, undo, todo)
+    assert store.df['T_Shirt_Collected'].equals(before) and undo.recent().empty
+
+
+def test_move_bus_checks_seats(store, undo):
+    with pytest.raises(BulkError, match="seat"): move_bus(store, undo, store.df.index, "Bus 1", {"Bus 1": 3})
+    with pytest.raises(BulkError, match="No such bus"): move_bus(store, undo, store.df.index[:1], "Bus 9", FLEET)
+    assert (store.df['Bus_Number'] == 'Unassigned').all()
+
+
+def test_apply_plan_refuses_a_stale_preview(store, undo):
+    plan = pd.Series("Bus 1", index=store.df.index[:4], dtype=object)
+    store.edit([plan.index[0]], {'Bus_Number': "Bus 2"})
+    with pytest.raises(BulkError, match="1 of them"): apply_plan(store, undo, plan, FLEET)
+    touched, bid = apply_plan(store, undo, plan[1:], FLEET)
+    assert touched == set(plan.index[1:]) and revert(store, undo, bid) == (3, 0)
@@ -0,0 +1,92 @@
+import io
+import pytest
+import importer
+from bench import synthetic_roster
+from engine import load_all, open_store, typed
+from importer import check_file, commit, next_tickets
+from lookup import _clean
+from storage import SQLiteBackend
+
+# ==================== IMPORT TESTS ====================
+# check_file() on small CSVs: which lines it refuses and why, across chunk
+# boundaries too; then commit() issuing tickets under the store lock.
+
+HEAD = "Name,Role,Phone,Ticket,Class,Roll,Size\n"
+
+
+def csv(*lines): return io.StringIO(HEAD + "".join(line + "\n" for line in lines))
+
+
+def problems(errors): return [(r.Line, r.Column, r.Problem.split(' (')[0]) for r in errors.itertuples()]
+
+
+@pytest.fixture
+def store(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    b.write_roster(typed(synthetic_roster(20)))
+    return open_store(load_all(b), str(tmp_path / "imp.db"))
+
+
+# --- check_file ---
+def test_errors_carry_the_file_line_and_column():
+    rows, errors, read = check_file(csv(
+        "Asha,student,01711000001,,5,12,m",       # line 2: fine, role / size any case
+        ",Student,01711000002,,5,,M",             # 3: no name
+        "Bilal,Pilot,01711000003,,,,",            # 4: unknown role
+        "Chandra,Student,12,,5,,",                # 5: bad phone
+        "Dipa,Student,01711000005,,,,",           # 6: student without a class
+        "Esha,Teacher,01711000006,,,1x,XS",       # 7: bad roll and size
+        ",,,,,,",                                 # 8: blank, skipped
+    ), "late.csv", set())
+    assert read == 7 and [r['Name'] for r in rows] == ["Asha"]
+    assert rows[0]['Role'] == "Student" and rows[0]['T_Shirt_Size'] == "M" and rows[0]['Spot Phone'] == "01711000001"
+    assert problems(errors) == [(3, 'Name', "missing"), (4, 'Role', "unknown role"), (5, 'Spot Phone', "not a phone number"),
+                                (6, 'Class', "students need a class"), (7, 'T_Shirt_Size', "size must be one of S/M/L/XL/XXL"),
+                                (7, 'Roll', "not a roll number")]
+
+
+def test_default_size_and_tickets_already_used():
+    rows, errors, _ = check_file(csv(
+        "Asha,Guest,01711000001,W26-000003,,,",   # in the roster
+        "Bilal,Guest,01711000002,NEW-1,,,",
+        "Chandra,Guest,01711000003, new-1 ,,,",   # earlier in this file
+        "Dipa,Guest,01711000004,,,,",
+    ), "late.csv", {"w26-000003"}, default_size="XL")
+    assert [r['Name'] for r in rows] == ["Bilal", "Dipa"] and {r['T_Shirt_Size'] for r in rows} == {"XL"}
+    assert problems(errors) == [(2, 'Ticket_Number', "ticket already used"), (4, 'Ticket_Number', "ticket already used")]
+
+
+def test_chunks_keep_line_numbers_and_seen_tickets(monkeypatch):
+    read = importer.read_chunks
+    monkeypatch.setattr(importer, 'read_chunks', lambda f, name: read(f, name, 2))
+    rows, errors, n = check_file(csv(
+        "Asha,Guest,01711000001,T-1,,,",
+        "Bilal,Guest,01711000002,T-2,,,",
+        "Chandra,Guest,,T-3,,,",                  # line 4, second chunk
+        "Dipa,Guest,01711000004,t-1,,,",          # 5: T-1 was in the first chunk
+        "Esha,Guest,01711000005,T-3,,,",          # 6: T-3's row was refused, so it is free
+    ), "late.csv", set())
+    assert n == 5 and [r['Name'] for r in rows] == ["Asha", "Bilal", "Esha"]
+    assert problems(errors) == [(4, 'Spot Phone', "missing"), (5, 'Ticket_Number', "ticket already used")]
+
+
+# --- commit ---
+def test_next_tickets_count_past_the_highest():
+    assert next_tickets({"imp-00007", "imp-00002", "w26-000100", "imp-x"}, 2, "IMP") == ["IMP-00008", "IMP-00009"]
+    assert next_tickets(set(), 1, "LATE") == ["LATE-00001"]
+
+
+def test_commit_issues_tickets_in_one_append(store):
+    rows, _, _ = check_file(csv("Asha,Guest,01711000001,,,,", "Bilal,Guest,01711000002,OWN-9,,,"), "late.csv", store.tickets())
+    before = len(store.df)
+    assert commit(store, rows) == 2 and len(store.df) == before + 2
+    new = store.df.iloc[-2:]
+    assert list(new['Ticket_Number']) == ["IMP-00001", "OWN-9"] and set(new['Bus_Number']) == {"Unassigned"}
+    assert {"imp-00001", "own-9"} <= store.tickets() and store.journal.pending_count() == 1  # one journal entry
+
+
+def test_commit_refuses_a_ticket_taken_since_the_check(store):
+    rows, _, _ = check_file(csv("Asha,Guest,01711000001,W26-000004,,,"), "late.csv", set())
+    before = store.df.copy()
+    with pytest.raises(ValueError, match="taken since"): commit(store, rows)
+    assert store.df.equals(before) and _clean("W26-000004") in store.tickets()
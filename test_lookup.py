@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from lookup import RosterIndex, _bulk_grams, _clean, _grams, norm_phone
+
+# ==================== SEARCH INDEX TESTS ====================
+# The bulk build (every load) must give the same index as adding the rows one
+# by one (every edit), and search() must rank the way the gate expects.
+
+
+def people(rows):
+    return pd.DataFrame(rows, columns=['Name', 'Ticket_Number', 'Spot Phone'])
+
+
+ROSTER = people([
+    ("Rahim Uddin", "W26-000101", "01711000001"),
+    ("Rahima Khatun", "W26-000102", "01711000002"),
+    ("Abdur Rahim", "W26-000103", "01811000003"),
+    ("Karim", "RAHIM-7", "01911000004"),
+    ("Bo", "W26-000105", None),
+    ("রহিম মিয়া", "W26-000106", "+8801711000006"),
+    (None, None, None),
+])
+
+
+def one_by_one(df):
+    ix = RosterIndex(df.iloc[:0])
+    ix.refresh(df, df.index)
+    return ix
+
+
+def same(a, b):
+    assert a.keys == b.keys and a.tokens == b.tokens
+    for d1, d2 in [(a.tickets, b.tickets), (a.phones, b.phones), (a.grams, b.grams)]:
+        assert {k: v for k, v in d1.items() if v} == {k: v for k, v in d2.items() if v}
+
+
+# --- the bulk build ---
+def test_bulk_build_matches_row_by_row():
+    same(RosterIndex(ROSTER), one_by_one(ROSTER))
+
+
+def test_bulk_grams_across_chunks():
+    # Past one 8192-row chunk, with a long name that pads only its own chunk
+    vals = [f"name {i} {'x' * (i % 7)}" for i in range(9000)]
+    vals[8500] = "a much longer name than any other " * 3
+    labels = np.arange(100, 9100)
+    want = {}
+    for i, v in zip(labels.tolist(), vals):
+        for g in _grams(v): want.setdefault(g, set()).add(i)
+    assert _bulk_grams(labels, [vals]) == want
+
+
+def test_edits_patch_the_index():
+    df = ROSTER.copy()
+    ix = RosterIndex(df)
+    df.loc[0, 'Ticket_Number'] = "NEW-1"
+    ix.refresh(df, [0])
+    assert ix.ticket("new-1") == {0} and not ix.ticket("W26-000101")
+    df = df.drop(index=[1])
+    ix.refresh(df, [1])
+    assert 1 not in ix.search("rahima")
+    same(ix, one_by_one(df))
+
+
+# --- ranking ---
+def test_exact_ticket_and_phone_come_first():
+    ix = RosterIndex(ROSTER)
+    assert ix.search(" w26-000102 ")[0] == 1
+    assert ix.search("+880 1711-000006")[0] == ix.search("01711000006")[0] == 5
+    assert norm_phone("8801711000006") == norm_phone("01711000006")
+
+
+def test_name_ranking():
+    ix = RosterIndex(ROSTER)
+    hits = ix.search("rahim")
+    # name / word prefixes (70, ties by name), then ticket substring (60)
+    assert hits[:4] == [2, 0, 1, 3]
+    assert ix.search("rahim uddin") == [0]
+    df = pd.concat([ROSTER, people([("Rahim", "W26-000108", None)])], ignore_index=True)
+    assert RosterIndex(df).search("rahim")[0] == 7  # an exact name beats every prefix
+
+
+def test_short_queries_match_word_prefixes():
+    ix = RosterIndex(ROSTER)
+    assert set(ix.search("ra")) == {0, 1, 2}  # "rahim", "rahima", "abdur rahim"; not a substring match
+    assert ix.search("bo") == [4]
+    assert ix.search("রহ") == [5]
+
+
+def test_blank_rows_and_queries():
+    ix = RosterIndex(ROSTER)
+    assert ix.search("") == [] and ix.search("n/a") == []
+    assert _clean(None) == '' and 6 not in ix.search("none")
@@ -0,0 +1,78 @@
+import pytest
+import snapshot
+from bench import CLASSES, synthetic_roster
+from engine import EVENT, SheetRows, load_all, open_store, typed, warm_load
+from events import EVERYONE, Scope
+from journal import pull_remote, sync
+from schema import to_sheet
+from snapshot import Snapshots, path_for
+from storage import SQLiteBackend
+
+# ==================== SNAPSHOT TESTS ====================
+# A restart from the snapshot plus the journal must give the store it left
+# behind: nothing pending is lost, nothing already pushed is applied twice.
+
+ROWS = 20
+JUNIORS = Scope('Juniors', 'Class', CLASSES[:5])
+
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    b.write_roster(typed(synthetic_roster(ROWS)))
+    return b
+
+
+def rnd(s, backend): sync(s, backend, lambda: pull_remote(s, backend, typed), True)
+
+
+def restart(backend, journal, scope=None, rows=None):
+    # What app1 does on start: the snapshot when there is one, then the journal on top
+    return open_store(warm_load(backend, path_for(journal), EVENT, scope.name if scope else EVERYONE), journal, scope, rows)
+
+
+# --- when it saves ---
+def test_no_save_while_the_journal_has_pending_edits(backend, tmp_path):
+    j = str(tmp_path / "s.db")
+    s, snaps = open_store(load_all(backend), j), Snapshots(path_for(j), EVENT.storage)
+    s.edit([0], {'Notes': "pending"})
+    assert not snaps.maybe_save(s, force=True) and snapshot.info(path_for(j)) is None
+    rnd(s, backend)
+    assert snaps.maybe_save(s, force=True) and snapshot.info(path_for(j))['rev'] == s.remote_rev
+    assert not snaps.maybe_save(s, force=True)  # nothing changed since
+
+
+def test_restart_replays_the_journal_on_the_snapshot(backend, tmp_path):
+    j = str(tmp_path / "s.db")
+    s, snaps = open_store(load_all(backend), j), Snapshots(path_for(j), EVENT.storage)
+    s.edit([1], {'Notes': "pushed"}); rnd(s, backend)
+    assert snaps.maybe_save(s, force=True)
+    s.edit([2], {'Notes': "pending"}); s.edit([1], {'Notes': "pushed, then edited"})
+    left = to_sheet(s.df)
+    other = open_store(load_all(backend), str(tmp_path / "other.db"))
+    other.edit([5], {'Notes': "from another server"}); rnd(other, backend)
+
+    again = restart(backend, j)
+    assert to_sheet(again.df).equals(left) and again.journal.pending_count() == 2  # the snapshot, not a backend read
+    rnd(again, backend)
+    assert again.journal.pending_count() == 0 and again.df.at[5, 'Notes'] == "from another server"
+    assert list(typed(backend.read_roster()).loc[[1, 2], 'Notes']) == ["pushed, then edited", "pending"]
+
+
+def test_a_snapshot_only_loads_as_its_storage_and_view(backend, tmp_path):
+    j = str(tmp_path / "s.db")
+    s = open_store(load_all(backend), j)
+    assert Snapshots(path_for(j), EVENT.storage).maybe_save(s, force=True)
+    assert snapshot.load(path_for(j), EVENT.storage) is not None
+    assert snapshot.load(path_for(j), "sqlite:other.db") is None
+    assert snapshot.load(path_for(j), EVENT.storage, "Juniors") is None
+
+
+def test_a_partition_snapshot_keeps_the_rest_of_the_event(backend, tmp_path):
+    j = str(tmp_path / "juniors.db")
+    s = open_store(load_all(backend), j, JUNIORS, SheetRows(EVENT, backend))
+    assert Snapshots(path_for(j), EVENT.storage, JUNIORS.name).maybe_save(s, force=True)
+    assert snapshot.load(path_for(j), EVENT.storage, JUNIORS.name) is not None
+    again = restart(backend, j, JUNIORS, SheetRows(EVENT, backend))
+    assert again.outside == s.outside and again.outside_tickets == s.outside_tickets and again.outside_tickets
+    assert again.tickets() == s.tickets() and to_sheet(again.df).equals(to_sheet(s.df))
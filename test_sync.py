@@ -0,0 +1,269 @@
+import pandas as pd
+import pytest
+from bench import CLASSES, synthetic_roster
+from engine import EVENT, SheetRows, load_all, open_store, typed
+from events import Scope
+from importer import commit
+from journal import push_pending, pull_remote, sync
+from lookup import _clean
+from roster import ChangeLog, RosterUnavailable, delta_batch
+from schema import now
+from storage import SQLiteBackend
+
+# ==================== SYNC TESTS ====================
+# Two stores on one SQLite backend stand in for two processes (app1 + api.py,
+# or two servers). Each round is what the flusher does: pull, then push.
+
+ROWS = 20
+
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    b.write_roster(typed(synthetic_roster(ROWS)))
+    return b
+
+
+def store(backend, tmp_path, name):
+    return open_store(load_all(backend), str(tmp_path / f"{name}.db"))
+
+
+def partitions(backend, tmp_path, run=""):
+    # Juniors and Seniors of one event in one process: what app1 opens for two devices
+    rows = SheetRows(EVENT, backend)
+    return [open_store(load_all(backend), str(tmp_path / f"{run}{sc.name}.db"), sc, rows)
+            for sc in (Scope('Juniors', 'Class', CLASSES[:5]), Scope('Seniors', 'Class', CLASSES[5:]))]
+
+
+def rnd(s, backend): sync(s, backend, lambda: pull_remote(s, backend, typed), True)
+
+
+def on_backend(backend): return typed(backend.read_roster())
+
+
+class Flaky(SQLiteBackend):
+    # read_roster fails until `down` is cleared
+    down = True
+
+    def read_roster(self):
+        if self.down: raise ConnectionError("backend unreachable")
+        return super().read_roster()
+
+
+class Whole(SQLiteBackend):
+    # Like Sheets: every read is the whole roster, and writes can't say which revision they made
+    def read_changes(self, since): return self.read_roster(), True
+    def upsert(self, payload): super().upsert(payload)
+
+
+# --- delta_batch ---
+def test_delta_batch_groups_ranges():
+    df = typed(synthetic_roster(10))
+    log = ChangeLog(df.columns)
+    log.mark([2, 3, 4], ['Bus_Number'])
+    log.mark([7], ['Notes', 'Entry_Status'])
+    log.added.update([8, 9])
+    batch, last = delta_batch(df, log)
+    ranges = [b['range'] for b in batch]
+    assert ranges[0] == "A10:N11"                  # rows 8-9: sheet rows 10-11, every column
+    assert "K4:K6" in ranges                        # one tall range for the bus moves
+    assert "H9:H9" in ranges and "N9:N9" in ranges  # non-adjacent columns: one range each
+    assert last == 11
+
+
+def test_delta_batch_empty():
+    df = typed(synthetic_roster(3))
+    assert delta_batch(df, ChangeLog(df.columns)) == ([], 1)
+
+
+def test_blank_over_blank_is_no_change(backend, tmp_path):
+    a = store(backend, tmp_path, "a")
+    blank = list(a.df.index[a.df['Notes'].isna() & a.df['Entry_Time'].isna()][:3])
+    assert not a.edit(blank[0], {'Notes': None}) and not a.edit(blank, {'Notes': None, 'Entry_Time': pd.NaT})
+    assert not a.changes and a.journal.pending_count() == 0
+
+
+# --- push_pending ---
+def test_push_sends_only_changed_cells(backend, tmp_path):
+    a = store(backend, tmp_path, "a")
+    a.edit(4, {'Notes': "hi"})
+    assert push_pending(a, backend)
+    r = on_backend(backend)
+    assert r.at[4, 'Notes'] == "hi" and len(r) == ROWS
+    assert not push_pending(a, backend)  # nothing left
+    assert a.journal.pending_count() == 0
+
+
+def test_failed_push_is_retried(backend, tmp_path, monkeypatch):
+    a = store(backend, tmp_path, "a")
+    a.edit(1, {'Notes': "retry me"})
+    def down(payload): raise ConnectionError("backend unreachable")
+    monkeypatch.setattr(backend, 'upsert', down)
+    with pytest.raises(ConnectionError): push_pending(a, backend)
+    monkeypatch.undo()
+    assert a.journal.pending_count() and push_pending(a, backend)
+    assert on_backend(backend).at[1, 'Notes'] == "retry me"
+
+
+# --- two stores, one backend ---
+def test_edits_from_two_stores_meet(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    a.edit(3, {'Notes': "from a"}); rnd(a, backend)
+    b.check_in(3, now(), "North"); rnd(b, backend)
+    rnd(a, backend)
+    r = on_backend(backend)
+    assert r.at[3, 'Notes'] == "from a" and r.at[3, 'Entry_Status']
+    assert b.df.at[3, 'Notes'] == "from a" and a.df.at[3, 'Entry_Status']
+
+
+def test_write_between_pull_and_push_is_not_skipped(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    def pull_then_b_writes():
+        n = pull_remote(a, backend, typed)
+        b.edit(5, {'Notes': "b wrote"}); rnd(b, backend)
+        return n
+    a.edit(2, {'Notes': "a wrote"}); sync(a, backend, pull_then_b_writes, True)
+    a.check_in(5, now()); rnd(a, backend)
+    r = on_backend(backend)
+    assert r.at[5, 'Notes'] == "b wrote" and r.at[5, 'Entry_Status']  # a's row write didn't take b's cell back
+    assert a.df.at[5, 'Notes'] == "b wrote"
+    assert a.remote_rev == backend.revision()
+
+
+def test_conflict_keeps_ours_and_is_logged(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    b.edit(6, {'Notes': "theirs"}); rnd(b, backend)
+    a.edit(6, {'Notes': "ours"}); rnd(a, backend)
+    assert on_backend(backend).at[6, 'Notes'] == "ours"
+    assert [(c['column'], c['ours'], c['theirs']) for c in a.conflicts] == [('Notes', "ours", "theirs")]
+
+
+def test_appends_from_two_stores_both_land(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    a.append([{'Name': "Staff A", 'Ticket_Number': "SA"}])
+    b.append([{'Name': "Staff B", 'Ticket_Number': "SB"}])  # same label as a's row
+    rnd(a, backend); rnd(b, backend); rnd(a, backend)
+    r = on_backend(backend)
+    assert sorted(r['Ticket_Number'].iloc[ROWS:]) == ["SA", "SB"] and len(r) == ROWS + 2
+    assert len(a.df) == len(b.df) == ROWS + 2
+
+
+def test_whole_reads_merge_only_rows_that_changed(backend, tmp_path, monkeypatch):
+    wb = Whole(str(tmp_path / "roster.db"))
+    a, b = store(wb, tmp_path, "a"), store(wb, tmp_path, "b")
+    b.edit(1, {'Notes': "first"}); rnd(b, wb); rnd(a, wb)  # a's first whole read: merged whole, kept to diff against
+    merged = []
+    merge = a.merge
+    monkeypatch.setattr(a, 'merge', lambda remote, full=True: merged.append((len(remote), full)) or merge(remote, full))
+    a.edit(3, {'Bus_Number': "Bus 2"}); rnd(a, wb)
+    b.edit(5, {'Notes': "from b"}); rnd(b, wb)
+    assert pull_remote(a, wb, typed) == 1  # b's row; our own edit came back unchanged
+    assert merged == [(2, False)] and a.df.at[5, 'Notes'] == "from b"
+
+
+# --- remove ---
+def test_remove_blanks_the_row_in_place(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    a.remove([3, ROWS - 1], "Merged into X"); rnd(a, backend)
+    r = on_backend(backend)
+    assert len(r) == ROWS and pd.isna(r.at[3, 'Ticket_Number']) and r.at[3, 'Notes'] == "Merged into X"  # no row below moved
+    rnd(b, backend)
+    assert 3 not in b.df.index and a.df.index.equals(b.df.index) and a.journal.pending_count() == 0
+    a.append([{'Name': "Late", 'Ticket_Number': "L1"}]); rnd(a, backend)
+    assert on_backend(backend).at[ROWS, 'Ticket_Number'] == "L1"  # after the blank last row, not on it
+
+
+def test_remove_moves_other_stores_edits_to_their_tickets(backend, tmp_path):
+    a, b = store(backend, tmp_path, "a"), store(backend, tmp_path, "b")
+    t8, t1 = b.df.at[8, 'Ticket_Number'], b.df.at[1, 'Ticket_Number']
+    b.check_in(8, now()); b.edit(1, {'Notes': "on a removed row"})
+    b.append([{'Name': "Late", 'Ticket_Number': "L1"}])
+    a.remove([1]); rnd(a, backend)
+    rnd(b, backend)
+    r = on_backend(backend)
+    assert (r['Ticket_Number'] == t8).sum() == 1 and r.loc[r['Ticket_Number'] == t8, 'Entry_Status'].all()
+    assert "L1" in set(r['Ticket_Number']) and len(r) == ROWS + 1  # the removed row stays, blank
+    assert [(c['ticket'], c['theirs']) for c in b.conflicts] == [(t1, "row gone")]
+    assert b.journal.pending_count() == 0
+
+
+def test_crash_after_a_rewrite_replays_onto_the_same_rows(tmp_path, monkeypatch):
+    b = SQLiteBackend(str(tmp_path / "roster.db"))
+    df = typed(synthetic_roster(ROWS)).drop(columns='Entry_Gate')  # a sheet from before Entry_Gate: the first push rewrites it
+    df.loc[2, ['Name', 'Ticket_Number']] = None                     # and a removed row above the rest
+    b.write_roster(df)
+    a = store(b, tmp_path, "a")
+    t5, t7, t8 = a.df.loc[[5, 7, 8], 'Ticket_Number']
+    a.edit(5, {'Notes': "kept"}); a.remove([7], "Merged into X")
+    def crash(upto, kinds): raise RuntimeError("process killed")
+    monkeypatch.setattr(a.journal, 'done', crash)
+    with pytest.raises(RuntimeError): rnd(a, b)  # rewrite landed, journal not cleared
+    restarted = store(b, tmp_path, "a")
+    assert restarted.df.at[5, 'Ticket_Number'] == t5 and restarted.df.at[5, 'Notes'] == "kept"
+    rnd(restarted, b)
+    r = on_backend(b)
+    assert r.at[5, 'Ticket_Number'] == t5 and r.at[8, 'Ticket_Number'] == t8 and t7 not in set(r['Ticket_Number'])
+    assert len(restarted.df) == ROWS - 2 and restarted.journal.pending_count() == 0
+
+
+# --- stock ---
+def test_an_older_stock_table_is_migrated(backend, tmp_path):
+    backend.db.executemany("INSERT INTO stock (Size, Quantity) VALUES (?, 5)", [(sz,) for sz in EVENT.sizes])  # shirts left, as it used to be kept
+    a = store(backend, tmp_path, "a")
+    assert all(a.remaining()[sz] == 5 for sz in EVENT.sizes)
+    assert backend.read_stock() == a.stock and sum(a.stock.values()) == 5 * len(EVENT.sizes) + a.stats.kit.total()
+
+
+# --- failed load ---
+def test_failed_load_blocks_writes_then_adopts(backend, tmp_path):
+    fb = Flaky(str(tmp_path / "roster.db"))
+    a = store(fb, tmp_path, "a")
+    assert not a.loaded and len(a.df) == 0
+    with pytest.raises(RosterUnavailable): a.append([{'Name': "Staff", 'Ticket_Number': "S1"}])
+    with pytest.raises(ConnectionError): rnd(a, fb)
+    assert not push_pending(a, fb)
+    assert len(on_backend(backend)) == ROWS
+    fb.down = False
+    rnd(a, fb)
+    assert a.loaded and len(a.df) == ROWS
+    a.append([{'Name': "Staff", 'Ticket_Number': "S1"}]); rnd(a, fb)
+    r = on_backend(fb)
+    assert len(r) == ROWS + 1 and r.at[ROWS, 'Ticket_Number'] == "S1"
+
+
+def test_failed_load_replays_the_journal_once_read(backend, tmp_path):
+    a = store(backend, tmp_path, "a")
+    a.check_in(4, now())  # never pushed: the process stops here
+    fb = Flaky(str(tmp_path / "roster.db"))
+    restarted = store(fb, tmp_path, "a")
+    assert not restarted.loaded
+    fb.down = False
+    rnd(restarted, fb)
+    assert on_backend(backend).at[4, 'Entry_Status'] and restarted.journal.pending_count() == 0
+
+
+def test_restart_replays_unsynced_edits(backend, tmp_path):
+    a = store(backend, tmp_path, "a")
+    a.edit(2, {'Notes': "before the crash"})
+    restarted = store(backend, tmp_path, "a")
+    assert restarted.df.at[2, 'Notes'] == "before the crash"
+    rnd(restarted, backend)
+    assert on_backend(backend).at[2, 'Notes'] == "before the crash"
+
+
+# --- partitions ---
+def test_two_partitions_issue_different_tickets(backend, tmp_path):
+    j, s = partitions(backend, tmp_path)
+    assert 0 < len(j.df) < ROWS and 0 < len(s.df) < ROWS
+    commit(j, [{'Name': "Junior", 'Role': 'Student', 'Class': CLASSES[0], 'Spot Phone': "01711000001"}])
+    commit(s, [{'Name': "Senior", 'Role': 'Student', 'Class': CLASSES[-1], 'Spot Phone': "01711000002"}])
+    assert j.df['Ticket_Number'].iloc[-1] == "IMP-00001" and s.df['Ticket_Number'].iloc[-1] == "IMP-00002"
+    theirs = s.df['Ticket_Number'].iloc[0]
+    with pytest.raises(ValueError): commit(j, [{'Name': "Copy", 'Ticket_Number': theirs}])  # another partition's ticket
+    rnd(j, backend); rnd(s, backend)
+    r = on_backend(backend)
+    assert len(r) == ROWS + 2 and r['Ticket_Number'].is_unique
+    later, _ = partitions(backend, tmp_path, "later-")  # another process, after both pushed
+    assert {"imp-00001", "imp-00002", _clean(theirs)} <= later.tickets()
+    commit(later, [{'Name': "Late", 'Role': 'Teacher'}])
+    assert later.df['Ticket_Number'].iloc[-1] == "IMP-00003"
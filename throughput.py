@@ -0,0 +1,78 @@
+import pandas as pd
+from schema import TZ
+from stats import MINUTE
+
+# ==================== GATE THROUGHPUT ====================
+# Rolling-window views over RosterStats.arrivals: check-ins per (minute,
+# gate, class), kept current by every edit. Nothing here reads the roster,
+# so a refresh is one pass over a few hundred counter keys and the
+# Dashboard can redraw it every few seconds.
+# Rates use the last WINDOW *finished* minutes, so they don't dip at :00.
+
+WINDOW = 10  # minutes
+NO_GATE, NO_CLASS = "Unrecorded", "No class"
+
+
+def _frame(arrivals):
+    live = [(k, n) for k, n in arrivals.items() if n > 0]
+    m, g, c = zip(*(k for k, _ in live)) if live else ((), (), ())
+    return pd.DataFrame({'minute': pd.array(m, dtype='int64'), 'gate': pd.array(g, dtype='string').fillna(NO_GATE),
+                         'class': pd.array(c, dtype='string').fillna(NO_CLASS), 'n': pd.array([n for _, n in live], dtype='int64')})
+
+
+def _clock(minutes): return pd.to_datetime(minutes * MINUTE, utc=True).tz_convert(TZ)
+
+
+def _window(f, now, window):
+    end = now.value // MINUTE
+    return f[(f['minute'] >= end - window) & (f['minute'] < end)]
+
+
+def per_minute(arrivals, by=None):
+    """Check-ins per minute (gap minutes as 0): one column per gate / class with by='gate' / 'class', else 'All'."""
+    f = _frame(arrivals)
+    if f.empty: return pd.DataFrame()
+    t = f.pivot_table(index='minute', columns=by, values='n', aggfunc='sum', fill_value=0) if by else f.groupby('minute')[['n']].sum().rename(columns={'n': 'All'})
+    t = t.reindex(range(t.index.min(), t.index.max() + 1), fill_value=0)
+    t.index = _clock(t.index)
+    return t
+
+
+def class_curves(arrivals):
+    """Cumulative arrivals per class over the day."""
+    t = per_minute(arrivals, 'class')
+    return t.cumsum() if len(t) else t
+
+
+def summary(stats, now, window=WINDOW):
+    """Gate-wide numbers: rate (per minute), people still out, and when the queue clears at that rate."""
+    f = _frame(stats.arrivals)
+    recent = int(_window(f, now, window)['n'].sum()) if len(f) else 0
+    rate, left = recent / window, stats.total - stats.entered
+    eta = left / rate if rate and left else (0.0 if not left else None)
+    return {'rate': rate, 'recent': recent, 'left': left, 'eta_min': eta,
+            'clear_at': (now + pd.Timedelta(minutes=eta)).floor('min') if eta is not None else None,
+            'last': _clock(pd.Index([f['minute'].max()]))[0] if len(f) else None}
+
+
+def by_gate(stats, now, window=WINDOW):
+    """Per gate: check-ins in the window, rate per minute, day total, last active minute."""
+    f = _frame(stats.arrivals)
+    if f.empty: return pd.DataFrame(columns=['Gate', 'Last window', 'Per min', 'Total', 'Last active'])
+    w = _window(f, now, window).groupby('gate')['n'].sum()
+    g = f.groupby('gate').agg(Total=('n', 'sum'), last=('minute', 'max'))
+    out = pd.DataFrame({'Gate': g.index, 'Last window': w.reindex(g.index, fill_value=0).to_numpy(), 'Total': g['Total'].to_numpy(),
+                        'Last active': _clock(pd.Index(g['last'])).strftime('%H:%M')})
+    out.insert(2, 'Per min', (out['Last window'] / window).round(1))
+    return out.sort_values('Total', ascending=False, ignore_index=True)
+
+
+def by_class(stats, now, window=WINDOW):
+    """Per class: in / registered, current rate, and minutes until the rest are in at that rate."""
+    f = _frame(stats.arrivals)
+    w = _window(f, now, window).groupby('class')['n'].sum() if len(f) else pd.Series(dtype=int)
+    rows = []
+    for c in stats.present(stats.cls):
+        left, rate = stats.cls[c] - stats.cls_in[c], w.get(c, 0) / window
+        rows.append((c, stats.cls_in[c], stats.cls[c], left, round(rate, 1), round(left / rate) if rate and left else None))
+    return pd.DataFrame(rows, columns=['Class', 'In', 'Registered', 'Left', 'Per min', 'Clear in (min)'])